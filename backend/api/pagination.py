@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination for the teacher records endpoints.
+
+Instead of OFFSET, each page continues from the sort key of the last row
+the client saw. The key is handed out as an opaque signed token, so the
+cost of a page does not depend on how deep into the result set it is.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token is malformed or was not issued for this ordering"""
+
+
+def estimated_count(queryset):
+    """
+    Row count estimate for a queryset.
+
+    On PostgreSQL this reads the planner's row estimate for the filtered
+    query instead of running COUNT(*); other backends fall back to an
+    exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _resolve(obj, path):
+    for attr in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    return obj
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its sort key.
+
+    Args:
+        ordering: order_by() style field list; 'id' is appended as a
+            tie-breaker when missing so that every row has a unique key
+        page_size: Rows per page
+        salt: Namespace for the signed cursor tokens of one endpoint
+    """
+
+    def __init__(self, ordering, page_size=50, salt='keyset'):
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('id')
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.ordering = ordering
+        self.page_size = page_size
+        self.salt = f'{salt}:{",".join(ordering)}'
+
+    def _encode(self, obj, direction):
+        key = [_encode_value(_resolve(obj, name)) for name, _ in self.fields]
+        return signing.dumps({'k': key, 'd': direction}, salt=self.salt, compress=True)
+
+    def _decode(self, token):
+        try:
+            payload = signing.loads(token, salt=self.salt)
+            key, direction = payload['k'], payload['d']
+        except (signing.BadSignature, KeyError, TypeError) as exc:
+            raise InvalidCursor('Invalid cursor') from exc
+        if direction not in ('next', 'prev') or len(key) != len(self.fields):
+            raise InvalidCursor('Invalid cursor')
+        return key, direction
+
+    def _seek(self, key, reverse):
+        """Rows strictly after `key` in the (optionally reversed) sort order"""
+        after = Q()
+        equal = {}
+        for (name, descending), value in zip(self.fields, key):
+            lookup = 'lt' if descending != reverse else 'gt'
+            after |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        # Redundant bound on the leading column lets the planner range-scan its index
+        name, descending = self.fields[0]
+        bound = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{bound}': key[0]}) & after
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Return one page of rows and the pagination block for the response.
+
+        Raises:
+            InvalidCursor: If the cursor token cannot be decoded
+        """
+        direction = 'next'
+        if cursor:
+            key, direction = self._decode(cursor)
+        reverse = direction == 'prev'
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek(key, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = bool(cursor), has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        return rows, {
+            'page_size': self.page_size,
+            'has_next': has_next,
+            'has_previous': has_previous,
+            'next_cursor': self._encode(rows[-1], 'next') if rows and has_next else None,
+            'previous_cursor': self._encode(rows[0], 'prev') if rows and has_previous else None,
+        }
@@ -1,12 +1,12 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Count, Avg
+from django.db.models import Count, Sum
 from drf_spectacular.utils import extend_schema
 from apps.users.models import User
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
-from apps.performance.models import Grade, PerformancePrediction
+from apps.performance.models import Grade, GradeSummary, PerformancePrediction
 from apps.attendance.models import AttendanceRecord
 
 
@@ -152,12 +152,13 @@ def dashboard_stats(request):
                 is_active=True
             )
             
-            # Calculate average grade
-            grades = Grade.objects.filter(
-                student=student_profile,
-                is_published=True
+            # Calculate average grade from the per-course grade summaries
+            grade_totals = GradeSummary.objects.filter(student=student_profile).aggregate(
+                count=Sum('published_count'),
+                marks=Sum('published_marks_sum')
             )
-            avg_grade = grades.aggregate(avg=Avg('marks_obtained'))['avg'] or 0
+            completed_assessments = grade_totals['count'] or 0
+            avg_grade = grade_totals['marks'] / completed_assessments if completed_assessments else 0
             
             # Check if at risk
             at_risk_courses = PerformancePrediction.objects.filter(
@@ -175,7 +176,7 @@ def dashboard_stats(request):
             
             stats = {
                 'enrolled_courses': active_enrollments.count(),
-                'completed_assessments': grades.count(),
+                'completed_assessments': completed_assessments,
                 'average_grade': round(avg_grade, 2),
                 'current_gpa': float(student_profile.gpa or 0),
                 'at_risk_courses': at_risk_courses,
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['date', 'id'], name='attendance__date_f81417_idx'),
+        ),
+    ]
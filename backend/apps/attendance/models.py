@@ -40,6 +40,9 @@ class AttendanceRecord(models.Model):
         db_table = 'attendance_records'
         unique_together = ['student', 'course', 'date']
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.course.code} - {self.date} - {self.status}"
@@ -1,11 +1,12 @@
 # Create your tests here.
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
 from apps.students.models import StudentProfile
 from apps.courses.models import Course
 from .models import AttendanceRecord, AttendanceSession, AttendanceSummary
 from .serializers import AttendanceRecordSerializer
-from datetime import date, time
+from datetime import date, time, timedelta
 
 User = get_user_model()
 
@@ -115,3 +116,57 @@ class AttendanceModelTest(TestCase):
         self.assertEqual(summary.total_classes, 1)
         self.assertEqual(summary.classes_attended, 1)
         self.assertEqual(summary.attendance_percentage, 100.0)
+
+
+class TeacherAttendanceRecordsCursorTest(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='teacher1',
+            email='teacher@example.com',
+            role='teacher'
+        )
+        self.course = Course.objects.create(
+            code='CS101',
+            name='Introduction to Computer Science',
+            description='Basic concepts',
+            credits=3,
+            difficulty_level='beginner',
+            instructor=self.instructor,
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 1, 14)
+        )
+        students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@example.com',
+                role='student'
+            ).student_profile
+            for i in range(3)
+        ]
+        for day in range(3):
+            for student in students:
+                AttendanceRecord.objects.create(
+                    student=student,
+                    course=self.course,
+                    date=date(2026, 1, 5) + timedelta(days=day),
+                    status='present',
+                    marked_by=self.instructor
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.instructor)
+
+    def test_cursor_pages_cover_all_records_in_order(self):
+        url = '/api/attendance/teacher/records/'
+        expected = [record['id'] for record in self.client.get(url, {'page_size': 100}).data['records']]
+
+        seen = []
+        params = {'pagination': 'cursor', 'page_size': 4}
+        while True:
+            data = self.client.get(url, params).data
+            seen.extend(record['id'] for record in data['records'])
+            if not data['pagination']['has_next']:
+                break
+            params['cursor'] = data['pagination']['next_cursor']
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 9)
@@ -15,6 +15,10 @@ from .serializers import (
 )
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
+from api.pagination import InvalidCursor, KeysetPaginator, estimated_count
+
+
+ATTENDANCE_RECORDS_ORDERING = ['-date', 'course__name', 'student__user__last_name', 'id']
 
 
 class AttendanceRecordListCreateView(generics.ListCreateAPIView):
@@ -554,7 +558,9 @@ def teacher_attendance_records(request):
     if status_filter:
         queryset = queryset.filter(status=status_filter)
     
-    queryset = queryset.select_related('student__user', 'course').order_by('-date', 'course__name', 'student__user__last_name')
+    queryset = queryset.select_related(
+        'student__user', 'course', 'marked_by'
+    ).order_by(*ATTENDANCE_RECORDS_ORDERING)
     
     # If export is requested, return CSV data
     if export_format == 'csv':
@@ -582,13 +588,31 @@ def teacher_attendance_records(request):
     
     # Regular JSON response
     page_size = int(request.query_params.get('page_size', 50))
-    page = int(request.query_params.get('page', 1))
-    
-    start = (page - 1) * page_size
-    end = start + page_size
     
-    records = queryset[start:end]
-    total_count = queryset.count()
+    if request.query_params.get('pagination') == 'cursor':
+        paginator = KeysetPaginator(ATTENDANCE_RECORDS_ORDERING, page_size, salt='attendance-records')
+        try:
+            records, pagination = paginator.paginate(queryset, request.query_params.get('cursor'))
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('include_total') == 'true':
+            pagination['estimated_total'] = estimated_count(queryset)
+    else:
+        page = int(request.query_params.get('page', 1))
+        
+        start = (page - 1) * page_size
+        end = start + page_size
+        
+        records = queryset[start:end]
+        total_count = queryset.count()
+        pagination = {
+            'current_page': page,
+            'page_size': page_size,
+            'total_records': total_count,
+            'total_pages': (total_count + page_size - 1) // page_size,
+            'has_next': end < total_count,
+            'has_previous': page > 1
+        }
     
     data = []
     for record in records:
@@ -614,14 +638,7 @@ def teacher_attendance_records(request):
     
     return Response({
         'records': data,
-        'pagination': {
-            'current_page': page,
-            'page_size': page_size,
-            'total_records': total_count,
-            'total_pages': (total_count + page_size - 1) // page_size,
-            'has_next': end < total_count,
-            'has_previous': page > 1
-        }
+        'pagination': pagination
     })
 
 
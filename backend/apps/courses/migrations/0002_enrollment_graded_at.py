@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-17 08:26
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def backfill_graded_at(apps, schema_editor):
+    # Old online checkpoints hold a completion_date, which graded_at continues
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Enrollment.objects.filter(
+        status__in=['completed', 'failed'], final_grade__isnull=False, graded_at__isnull=True
+    ).update(graded_at=Coalesce('completion_date', Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_graded_at, migrations.RunPython.noop),
+    ]
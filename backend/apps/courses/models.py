@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from apps.students.models import StudentProfile
 
 
@@ -84,11 +85,28 @@ class Enrollment(models.Model):
     final_grade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     completion_date = models.DateTimeField(null=True, blank=True)
+    # When the enrollment became usable as a training row (finished and graded).
+    # Stamped by save(); rows finished with update()/bulk_update() get it from
+    # performance.online.stamp_graded_at on the next online model update.
+    graded_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     class Meta:
         db_table = 'enrollments'
         unique_together = ['student', 'course']
 
+    def save(self, *args, **kwargs):
+        stamped = []
+        if self.status in ('completed', 'failed') and self.completion_date is None:
+            self.completion_date = timezone.now()
+            stamped.append('completion_date')
+        # Online model updates consume finished enrollments in graded_at order
+        if self.status in ('completed', 'failed') and self.final_grade is not None and self.graded_at is None:
+            self.graded_at = timezone.now()
+            stamped.append('graded_at')
+        if stamped and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *stamped}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.course.code}"
 
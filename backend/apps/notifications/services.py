@@ -1,6 +1,7 @@
 """
 Notification service utilities for creating and sending notifications
 """
+from decimal import Decimal
 from django.db import transaction
 from .models import Notification, NotificationPreference
 from .views import create_notification
@@ -86,6 +87,35 @@ class NotificationService:
         except Exception as e:
             print(f"Error creating grade notification: {e}")
     
+    @staticmethod
+    def bulk_notify_grades_posted(grades, assessment):
+        """Notify each student of a newly posted grade with a single insert"""
+        total_marks = Decimal(str(assessment.total_marks))
+        notifications = [
+            Notification(
+                recipient_id=grade.student.user_id,
+                title="New Grade Posted",
+                message=f"Your grade for '{assessment.title}' in {assessment.course.name} has been posted: {grade.marks_obtained}/{total_marks}",
+                notification_type='grade',
+                course=assessment.course,
+                student=grade.student,
+                priority='medium',
+                data={
+                    'grade_id': grade.id,
+                    'assessment_id': assessment.id,
+                    'marks_obtained': float(grade.marks_obtained),
+                    'total_marks': float(total_marks),
+                    'percentage': float((grade.marks_obtained / total_marks) * 100) if total_marks > 0 else 0.0
+                }
+            )
+            for grade in grades
+        ]
+        
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+        
+        return len(notifications)
+    
     @staticmethod
     def notify_attendance_marked(student, attendance_record):
         """Notify student when attendance is marked"""
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Assessment, Grade, PerformancePrediction, StudyGoal
+from .models import Assessment, Grade, GradeSummary, PerformancePrediction, StudyGoal
 
 
 @admin.register(Assessment)
@@ -18,6 +18,14 @@ class GradeAdmin(admin.ModelAdmin):
     readonly_fields = ['percentage', 'letter_grade', 'graded_at']
 
 
+@admin.register(GradeSummary)
+class GradeSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'course', 'grade_count', 'published_count', 'average_percentage', 'last_graded_at', 'last_updated']
+    list_filter = ['course', 'last_updated']
+    search_fields = ['student__user__first_name', 'student__user__last_name', 'course__code']
+    readonly_fields = ['average_marks', 'average_percentage', 'last_updated']
+
+
 @admin.register(PerformancePrediction)
 class PerformancePredictionAdmin(admin.ModelAdmin):
     list_display = ['student', 'course', 'predicted_grade', 'confidence_score', 'at_risk', 'prediction_date']
@@ -0,0 +1,67 @@
+"""
+SQL-side statistics over grade percentages.
+
+Each grade's percentage is computed per row as marks_obtained over its own
+assessment's total_marks, so grades from assessments with different maxima
+are comparable.
+"""
+import numpy as np
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, FloatField, StdDev
+
+from .models import GRADE_PERCENTAGE
+
+
+# Percentiles reported alongside the mean, keyed by result name
+PERCENTILES = {
+    'p10_percentage': 0.1,
+    'median_percentage': 0.5,
+    'p90_percentage': 0.9,
+}
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL ordered-set aggregate: percentile_cont(fraction) WITHIN GROUP (ORDER BY expression)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    output_field = FloatField()
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction, **extra):
+        if not 0 <= fraction <= 1:
+            raise ValueError('fraction must be between 0 and 1')
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def percentage_statistics(grades):
+    """
+    Count, mean score and percentage distribution for a Grade queryset.
+
+    On PostgreSQL everything comes from a single aggregate query using
+    percentile_cont. Other backends lack ordered-set aggregates, so the
+    percentiles are taken from the percentage column with NumPy (same
+    linear interpolation) in a second query.
+    """
+    aggregates = {
+        'total_grades': Count('id'),
+        'avg_score': Avg('marks_obtained'),
+        'avg_percentage': Avg(GRADE_PERCENTAGE),
+        'stddev_percentage': StdDev(GRADE_PERCENTAGE),
+    }
+    postgres = connections[grades.db].vendor == 'postgresql'
+    if postgres:
+        aggregates.update({
+            name: PercentileCont(GRADE_PERCENTAGE, fraction)
+            for name, fraction in PERCENTILES.items()
+        })
+
+    stats = grades.aggregate(**aggregates)
+
+    if not postgres:
+        percentages = np.fromiter(
+            grades.order_by().annotate(pct=GRADE_PERCENTAGE).values_list('pct', flat=True),
+            dtype=float,
+        )
+        for name, fraction in PERCENTILES.items():
+            stats[name] = float(np.percentile(percentages, fraction * 100)) if len(percentages) else None
+    return stats
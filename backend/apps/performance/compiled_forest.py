@@ -0,0 +1,109 @@
+"""
+Compiled inference for the RandomForest performance model.
+
+A fitted forest and its StandardScaler are flattened into a handful of
+contiguous NumPy arrays (node features, thresholds, children and leaf
+values for every tree, back to back) that are evaluated without pandas or
+sklearn at request time. All trees are walked together, one vectorised step
+per level, so a prediction costs max_depth small array operations instead
+of sklearn's per-call validation and per-tree dispatch.
+
+Inputs are scaled and rounded to float32 exactly as sklearn does before
+comparing against the split thresholds, so predictions match
+RandomForestRegressor.predict up to the order the tree outputs are summed.
+"""
+import numpy as np
+from sklearn.tree import DecisionTreeRegressor
+
+
+class CompiledForest:
+    """Flattened regression forest with its input scaling"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, mean, scale):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.mean = mean
+        self.scale = scale
+
+    @property
+    def n_features(self):
+        return len(self.mean)
+
+    def tree_predictions(self, X):
+        """
+        Every tree's prediction for a batch of unscaled feature rows.
+
+        Args:
+            X: Array of shape (n_rows, n_features)
+
+        Returns:
+            Array of shape (n_trees, n_rows)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        # sklearn evaluates trees on float32 inputs
+        scaled = ((X - self.mean) / self.scale).astype(np.float32)
+        rows = np.arange(len(scaled))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(scaled), len(self.roots)))
+        # Leaves loop back to themselves, so every walk can take max_depth steps
+        for _ in range(self.max_depth):
+            go_left = scaled[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes.T]
+
+    def predict(self, X):
+        """Forest prediction (mean over trees) for a batch of unscaled feature rows"""
+        return self.tree_predictions(X).mean(axis=0)
+
+    def predict_one(self, row):
+        """Predict a single unscaled feature row"""
+        return float(self.predict(np.asarray(row, dtype=np.float64)[np.newaxis, :])[0])
+
+
+def compile_forest(model, scaler):
+    """
+    Flatten a fitted forest and scaler for compiled inference.
+
+    Returns:
+        CompiledForest, or None if the model is not a forest of single-output
+        regression trees
+    """
+    trees = getattr(model, 'estimators_', None)
+    if not trees or not all(isinstance(tree, DecisionTreeRegressor) for tree in trees):
+        return None
+    if trees[0].tree_.n_outputs != 1:
+        return None
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in trees:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+
+    n_features = trees[0].n_features_in_
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    return CompiledForest(
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.intp),
+        right=np.concatenate(right).astype(np.intp),
+        value=np.concatenate(value).astype(np.float64),
+        roots=np.array(roots, dtype=np.intp),
+        max_depth=max(estimator.tree_.max_depth for estimator in trees),
+        mean=np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64),
+        scale=np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64),
+    )
@@ -0,0 +1,68 @@
+"""
+Estimators available to the performance predictor.
+
+Each entry maps a configuration name to a factory returning an unfitted
+regressor. The PERFORMANCE_ESTIMATOR setting selects the one trained by
+PerformancePredictor; the name is recorded in each published model
+version's metadata.
+"""
+from django.conf import settings
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge, SGDRegressor
+
+
+ESTIMATORS = {
+    'random_forest': lambda: RandomForestRegressor(n_estimators=100, random_state=42),
+    'hist_gradient_boosting': lambda: HistGradientBoostingRegressor(random_state=42),
+    'ridge': lambda: Ridge(alpha=1.0),
+    # Supports partial_fit, for online updates (see online.py)
+    'sgd': lambda: SGDRegressor(alpha=1e-4, learning_rate='invscaling', eta0=0.01, random_state=42),
+}
+
+DEFAULT_ESTIMATOR = 'random_forest'
+
+# Hyperparameter distributions sampled by search.hyperparameter_search
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 300],
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'hist_gradient_boosting': {
+        'learning_rate': [0.02, 0.05, 0.1, 0.2],
+        'max_iter': [100, 200, 400],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [10, 20, 40],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    },
+    'ridge': {
+        'alpha': [0.001, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0],
+    },
+    'sgd': {
+        'alpha': [1e-5, 1e-4, 1e-3, 1e-2],
+        'eta0': [0.001, 0.005, 0.01, 0.05],
+        'power_t': [0.15, 0.25, 0.35],
+    },
+}
+
+
+def estimator_name(name=None):
+    """Validated estimator name, defaulting to the PERFORMANCE_ESTIMATOR setting"""
+    name = name or getattr(settings, 'PERFORMANCE_ESTIMATOR', None) or DEFAULT_ESTIMATOR
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown estimator '{name}'; choose from {', '.join(ESTIMATORS)}")
+    return name
+
+
+def make_estimator(name=None):
+    """Unfitted regressor for an estimator name"""
+    return ESTIMATORS[estimator_name(name)]()
+
+
+def name_for_model(model):
+    """Registry name matching a fitted model's class, for versions saved without metadata"""
+    for name, factory in ESTIMATORS.items():
+        if type(factory()) is type(model):
+            return name
+    return type(model).__name__
@@ -2,18 +2,57 @@
 Gemini AI-powered student performance prediction.
 Uses Google's Gemini API to analyze student data and predict performance risks.
 """
+import functools
+import hashlib
 import json
 import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
 from google import genai
-from django.db.models import Avg, Count, Q
+from django.conf import settings
+from django.db import connections
+from django.db.models import Avg, Count, Q, Sum
 from django.utils import timezone
 
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
 from apps.attendance.models import AttendanceRecord
-from .models import Assessment, Grade, PerformancePrediction
+from . import provider_guard
+from .ml_utils import PerformancePredictor
+from .models import Assessment, Grade, GradeSummary, PerformancePrediction
+
+
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+# Course predictions are requested a chunk of students at a time: small
+# prompts answer faster, and a truncated or malformed response only costs
+# that chunk (which is retried, then falls back) rather than the course.
+CHUNK_MAX_STUDENTS = 20
+CHUNK_MAX_CHARS = 30000
+CHUNK_RETRIES = 1
+CHUNK_RETRY_DELAY = 1.5
+DEFAULT_CHUNK_CONCURRENCY = 4
+# Seconds between quota checks while a chunk waits out the rate limit
+QUOTA_POLL_INTERVAL = 2
+
+# Seconds a request waits for Gemini before answering without it (see
+# _call_within_budget); the AI_LATENCY_BUDGETS setting overrides these.
+DEFAULT_LATENCY_BUDGETS = {
+    'student_prediction': 8,
+    'chat': 12,
+}
+# Threads running budgeted Gemini calls, and so the most calls in flight;
+# a request finding them all busy answers without Gemini
+BACKGROUND_LLM_THREADS = 4
+# Seconds a single-student prediction may run past its budget to store its
+# answer for next time; the request is then abandoned
+LATE_ANSWER_TIMEOUT = 60
+
+_background = None
+_background_slots = None
+_background_lock = threading.Lock()
 
 
 def _get_gemini_client():
@@ -42,7 +81,7 @@ def _collect_student_data(student, course):
         student=student,
         assessment__course=course,
         is_published=True,
-    ).select_related('assessment')
+    ).select_related('assessment').order_by('assessment__due_date', 'assessment_id')
 
     grade_details = []
     for g in current_grades:
@@ -65,22 +104,15 @@ def _collect_student_data(student, course):
     data['assessments_completed'] = len(grade_details)
 
     # --- Historical performance (other courses) ---
-    historical = Grade.objects.filter(
-        student=student,
-        is_published=True,
-    ).exclude(assessment__course=course)
-
-    if historical.exists():
-        hist_percentages = []
-        for g in historical.select_related('assessment'):
-            if g.assessment.total_marks > 0:
-                hist_percentages.append(
-                    float(g.marks_obtained) / float(g.assessment.total_marks) * 100
-                )
-        data['historical_avg_percentage'] = (
-            round(sum(hist_percentages) / len(hist_percentages), 1) if hist_percentages else None
-        )
-        data['historical_assessments_count'] = len(hist_percentages)
+    historical = GradeSummary.objects.filter(student=student).exclude(course=course).aggregate(
+        count=Sum('published_count'),
+        percentage_sum=Sum('percentage_sum'),
+    )
+    historical_count = historical['count'] or 0
+
+    if historical_count:
+        data['historical_avg_percentage'] = round(float(historical['percentage_sum']) / historical_count, 1)
+        data['historical_assessments_count'] = historical_count
     else:
         data['historical_avg_percentage'] = None
         data['historical_assessments_count'] = 0
@@ -107,10 +139,9 @@ def _collect_student_data(student, course):
     return data
 
 
-def _build_prompt(course, students_data):
-    """Build the Gemini prompt for batch prediction."""
-
-    prompt = f"""You are an expert educational data analyst. Analyze the following student data for the course "{course.name}" (Code: {course.code}, Difficulty: {course.difficulty_level}, Credits: {course.credits}).
+def _prompt_header(course):
+    """Opening instructions of the batch prediction prompt."""
+    return f"""You are an expert educational data analyst. Analyze the following student data for the course "{course.name}" (Code: {course.code}, Difficulty: {course.difficulty_level}, Credits: {course.credits}).
 
 For each student, I will provide:
 - Their academic profile (year of study, GPA, major)
@@ -129,39 +160,44 @@ Based on this data, for EACH student provide:
 Here is the student data:
 
 """
-    for i, sd in enumerate(students_data, 1):
-        prompt += f"\n--- Student {i} ---\n"
-        prompt += f"Name: {sd['student_name']}\n"
-        prompt += f"Student ID: {sd['student_id']}\n"
-        prompt += f"Year of Study: {sd['year_of_study']}\n"
-        prompt += f"Major: {sd['major']}\n"
-        prompt += f"Overall GPA: {sd['gpa'] if sd['gpa'] else 'Not available'}\n"
-        
-        prompt += f"\nCurrent Course Performance:\n"
-        if sd['current_course_grades']:
-            prompt += f"  Average: {sd['current_course_avg_percentage']}%\n"
-            prompt += f"  Assessments completed: {sd['assessments_completed']}\n"
-            for g in sd['current_course_grades']:
-                prompt += f"  - {g['assessment']} ({g['type']}): {g['marks_obtained']}/{g['total_marks']} = {g['percentage']}% (weight: {g['weight']}%)\n"
-        else:
-            prompt += "  No grades recorded yet\n"
-        
-        prompt += f"\nHistorical Performance (other courses):\n"
-        if sd['historical_avg_percentage'] is not None:
-            prompt += f"  Average across {sd['historical_assessments_count']} assessments: {sd['historical_avg_percentage']}%\n"
-        else:
-            prompt += "  No historical data available\n"
-        
-        prompt += f"\nAttendance in this course:\n"
-        if sd['attendance']:
-            att = sd['attendance']
-            prompt += f"  Total classes: {att['total_classes']}\n"
-            prompt += f"  Present: {att['present']}, Late: {att['late']}, Absent: {att['absent']}, Excused: {att['excused']}\n"
-            prompt += f"  Attendance rate: {att['attendance_rate']}%\n"
-        else:
-            prompt += "  No attendance records\n"
 
-    prompt += """
+
+def _student_prompt_block(i, sd):
+    """Prompt section describing one student."""
+    block = f"\n--- Student {i} ---\n"
+    block += f"Name: {sd['student_name']}\n"
+    block += f"Student ID: {sd['student_id']}\n"
+    block += f"Year of Study: {sd['year_of_study']}\n"
+    block += f"Major: {sd['major']}\n"
+    block += f"Overall GPA: {sd['gpa'] if sd['gpa'] else 'Not available'}\n"
+    
+    block += f"\nCurrent Course Performance:\n"
+    if sd['current_course_grades']:
+        block += f"  Average: {sd['current_course_avg_percentage']}%\n"
+        block += f"  Assessments completed: {sd['assessments_completed']}\n"
+        for g in sd['current_course_grades']:
+            block += f"  - {g['assessment']} ({g['type']}): {g['marks_obtained']}/{g['total_marks']} = {g['percentage']}% (weight: {g['weight']}%)\n"
+    else:
+        block += "  No grades recorded yet\n"
+    
+    block += f"\nHistorical Performance (other courses):\n"
+    if sd['historical_avg_percentage'] is not None:
+        block += f"  Average across {sd['historical_assessments_count']} assessments: {sd['historical_avg_percentage']}%\n"
+    else:
+        block += "  No historical data available\n"
+    
+    block += f"\nAttendance in this course:\n"
+    if sd['attendance']:
+        att = sd['attendance']
+        block += f"  Total classes: {att['total_classes']}\n"
+        block += f"  Present: {att['present']}, Late: {att['late']}, Absent: {att['absent']}, Excused: {att['excused']}\n"
+        block += f"  Attendance rate: {att['attendance_rate']}%\n"
+    else:
+        block += "  No attendance records\n"
+    return block
+
+
+PROMPT_FOOTER = """
 
 IMPORTANT: Respond ONLY with a valid JSON array. Each element should be an object with these exact keys:
 - "student_id" (string): The student's ID
@@ -174,7 +210,14 @@ IMPORTANT: Respond ONLY with a valid JSON array. Each element should be an objec
 
 Do NOT include any markdown formatting, code blocks, or extra text. Only return the raw JSON array.
 """
-    return prompt
+
+
+def _build_prompt(course, students_data):
+    """Build the Gemini prompt for batch prediction."""
+    prompt = _prompt_header(course)
+    for i, sd in enumerate(students_data, 1):
+        prompt += _student_prompt_block(i, sd)
+    return prompt + PROMPT_FOOTER
 
 
 def _compute_fallback_predicted_grade(student_data):
@@ -319,11 +362,255 @@ def _build_fallback_course_predictions(course, students_data, reason='provider u
     }
 
 
-def predict_course_performance(course_id, teacher_user):
+def _data_fingerprint(course, sd):
+    """
+    Hash of everything a course prediction for one student is based on: the
+    model, the course details in the prompt and the student's collected data.
+    """
+    payload = {
+        'model': GEMINI_MODEL,
+        'course': [course.name, course.code, course.difficulty_level, course.credits],
+        'student': sd,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _save_ai_prediction(student, course, sd, pred):
+    """Store a Gemini prediction with the fingerprint of the data it was made from."""
+    risk_level = pred.get('risk_level', 'low')
+    PerformancePrediction.objects.update_or_create(
+        student=student,
+        course=course,
+        defaults={
+            'predicted_grade': pred.get('predicted_grade', 0),
+            'confidence_score': 0.85,  # Gemini-based
+            'at_risk': risk_level in ('high', 'medium'),
+            'risk_factors': pred.get('risk_factors', []),
+            'recommendations': pred.get('recommendations', []),
+            'features_used': {
+                'current_avg': sd['current_course_avg_percentage'],
+                'attendance_rate': sd['attendance']['attendance_rate'] if sd['attendance'] else None,
+                'historical_avg': sd['historical_avg_percentage'],
+                # The rest of the AI response, so the prediction can be reused
+                'ai_prediction': {
+                    'risk_level': risk_level,
+                    'strengths': pred.get('strengths', []),
+                    'summary': pred.get('summary', ''),
+                },
+            },
+            'model_version': GEMINI_MODEL,
+            'data_fingerprint': _data_fingerprint(course, sd),
+        }
+    )
+
+
+def _reusable_predictions(course, students_data):
+    """
+    Stored Gemini predictions whose student data has not changed since they
+    were made, keyed by student ID in the shape of a Gemini response entry.
+    """
+    fingerprints = {sd['student_id']: _data_fingerprint(course, sd) for sd in students_data}
+    stored = PerformancePrediction.objects.filter(
+        course=course,
+        model_version=GEMINI_MODEL,
+        student__student_id__in=list(fingerprints),
+    ).values_list(
+        'student__student_id', 'data_fingerprint', 'predicted_grade',
+        'risk_factors', 'recommendations', 'features_used',
+    )
+
+    reusable = {}
+    for student_id, fingerprint, predicted_grade, risk_factors, recommendations, features_used in stored:
+        ai_prediction = (features_used or {}).get('ai_prediction')
+        if fingerprint != fingerprints[student_id] or not ai_prediction:
+            continue
+        reusable[student_id] = {
+            'student_id': student_id,
+            'predicted_grade': float(predicted_grade),
+            'risk_level': ai_prediction['risk_level'],
+            'risk_factors': risk_factors,
+            'strengths': ai_prediction['strengths'],
+            'recommendations': recommendations,
+            'summary': ai_prediction['summary'],
+        }
+    return reusable
+
+
+def _chunk_students(students_data, max_students, max_chars):
+    """
+    Split students into prompt chunks of at most max_students students and
+    roughly max_chars characters of student data (a student with more data
+    than max_chars gets a chunk of their own).
+    """
+    chunks, chunk, size = [], [], 0
+    for sd in students_data:
+        block_size = len(_student_prompt_block(len(chunk) + 1, sd))
+        if chunk and (len(chunk) >= max_students or size + block_size > max_chars):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(sd)
+        size += block_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _parse_predictions(raw_text):
+    """Parse the JSON array of predictions in a Gemini response."""
+    raw_text = raw_text.strip()
+
+    # Clean potential markdown wrappers
+    if raw_text.startswith('```'):
+        lines = raw_text.split('\n')
+        # Remove first and last lines (```json and ```)
+        lines = [l for l in lines if not l.strip().startswith('```')]
+        raw_text = '\n'.join(lines)
+
+    predictions_list = json.loads(raw_text)
+    if not isinstance(predictions_list, list):
+        raise json.JSONDecodeError('Expected a JSON array', raw_text, 0)
+    return predictions_list
+
+
+def _fallback_reason(exc):
+    """Short reason shown to teachers when a Gemini request fails."""
+    if isinstance(exc, provider_guard.ProviderUnavailable):
+        return exc.reason
+    if isinstance(exc, json.JSONDecodeError):
+        return 'AI response parse error'
+    error_msg = str(exc)
+    if '429' in error_msg or 'RESOURCE_EXHAUSTED' in error_msg:
+        return 'rate limit'
+    if '503' in error_msg or 'UNAVAILABLE' in error_msg:
+        return 'service unavailable'
+    return 'provider error'
+
+
+def _request_chunk(client, course, chunk):
+    """Raw Gemini response text for one chunk of students."""
+    response = client.models.generate_content(
+        model=GEMINI_MODEL,
+        contents=_build_prompt(course, chunk),
+    )
+    return response.text
+
+
+def _chunk_predictions(raw_text, chunk):
+    """Predictions in a chunk's response for that chunk's students, keyed by student ID."""
+    wanted = {sd['student_id'] for sd in chunk}
+    return {
+        str(p.get('student_id')): p
+        for p in _parse_predictions(raw_text)
+        if isinstance(p, dict) and str(p.get('student_id')) in wanted
+    }
+
+
+def _acquire_waiting(max_wait, on_wait):
+    """
+    Take a provider guard token, waiting up to max_wait seconds while the
+    rate limit refuses. An open circuit is not waited for.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        try:
+            return provider_guard.acquire()
+        except provider_guard.ProviderUnavailable as e:
+            remaining = deadline - time.monotonic()
+            if e.reason != 'rate limit' or remaining <= 0:
+                raise
+            on_wait()
+            time.sleep(min(QUOTA_POLL_INTERVAL, remaining))
+
+
+def _predict_in_chunks(course, students_data, progress, quota_wait=0):
+    """
+    Predict students in size-bounded chunks, CHUNK_CONCURRENCY at a time.
+
+    A chunk that fails, or whose response leaves out some of its students, is
+    retried (only for the missing students) up to CHUNK_RETRIES times. A chunk
+    the rate limit refuses waits up to quota_wait seconds for quota, reporting
+    progress meanwhile; chunks still refused, or refused by an open circuit,
+    are not sent, and not retried.
+
+    Returns:
+        Tuple of (predictions keyed by student ID, fallback reason keyed by
+        the ID of each student still without a prediction)
+    """
+    try:
+        client = _get_gemini_client()
+    except Exception as e:
+        return {}, {sd['student_id']: _fallback_reason(e) for sd in students_data}
+
+    concurrency = getattr(settings, 'GEMINI_CHUNK_CONCURRENCY', DEFAULT_CHUNK_CONCURRENCY)
+    pred_map, fallback_reasons = {}, {}
+    pending = _chunk_students(students_data, CHUNK_MAX_STUDENTS, CHUNK_MAX_CHARS)
+    total = len(pending)
+    done = 0
+    progress(50, f'Waiting for the AI model (0 of {total} batches)')
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, total))) as executor:
+        for attempt in range(CHUNK_RETRIES + 1):
+            if attempt:
+                time.sleep(CHUNK_RETRY_DELAY)
+            # The guard's state is in the database: acquire and record from
+            # this thread, the pool threads only wait on the network
+            futures = {}
+            for sent, chunk in enumerate(pending):
+                def on_wait():
+                    progress(50 + int(35 * done / total), f'Waiting for AI quota ({sent} of {len(pending)} batches sent)')
+
+                try:
+                    _acquire_waiting(quota_wait, on_wait)
+                except provider_guard.ProviderUnavailable as e:
+                    for sd in chunk:
+                        fallback_reasons[sd['student_id']] = e.reason
+                    continue
+                futures[executor.submit(_request_chunk, client, course, chunk)] = chunk
+
+            retry = []
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    raw_text = future.result()
+                except Exception as e:
+                    provider_guard.record_failure(error=e)
+                    predictions, reason = {}, _fallback_reason(e)
+                else:
+                    provider_guard.record_success()
+                    try:
+                        predictions, reason = _chunk_predictions(raw_text, chunk), 'incomplete AI response'
+                    except json.JSONDecodeError as e:
+                        predictions, reason = {}, _fallback_reason(e)
+                pred_map.update(predictions)
+
+                missing = [sd for sd in chunk if sd['student_id'] not in predictions]
+                for sd in chunk:
+                    fallback_reasons.pop(sd['student_id'], None)
+                for sd in missing:
+                    fallback_reasons[sd['student_id']] = reason
+                if missing:
+                    retry.append(missing)
+                else:
+                    done += 1
+                    progress(50 + int(35 * done / total), f'Waiting for the AI model ({done} of {total} batches)')
+            pending = retry
+            if not pending:
+                break
+
+    return pred_map, fallback_reasons
+
+
+def predict_course_performance(course_id, teacher_user, progress=None, quota_wait=0):
     """
     Generate Gemini AI predictions for all students in a course.
     Returns a dict with course info and per-student predictions.
+
+    progress, if given, is called as progress(percent, message) as the
+    prediction advances (used by background prediction jobs). quota_wait is
+    how long each Gemini request may wait for rate-limit quota before its
+    students fall back to heuristic predictions.
     """
+    progress = progress or (lambda percent, message: None)
     course = Course.objects.get(id=course_id, instructor=teacher_user)
 
     # Get all active enrollments
@@ -341,58 +628,27 @@ def predict_course_performance(course_id, teacher_user):
 
     # Collect data for each student
     students_data = []
-    for enrollment in enrollments:
+    total = len(enrollments)
+    for i, enrollment in enumerate(enrollments, start=1):
         sd = _collect_student_data(enrollment.student, course)
         students_data.append(sd)
-
-    # Call Gemini
-    try:
-        client = _get_gemini_client()
-        prompt = _build_prompt(course, students_data)
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt,
-        )
-        raw_text = response.text.strip()
-
-        # Clean potential markdown wrappers
-        if raw_text.startswith('```'):
-            lines = raw_text.split('\n')
-            # Remove first and last lines (```json and ```)
-            lines = [l for l in lines if not l.strip().startswith('```')]
-            raw_text = '\n'.join(lines)
-
-        predictions_list = json.loads(raw_text)
-    except json.JSONDecodeError:
-        return _build_fallback_course_predictions(course, students_data, reason='AI response parse error')
-    except Exception as e:
-        error_msg = str(e)
-        if '429' in error_msg or 'RESOURCE_EXHAUSTED' in error_msg:
-            return _build_fallback_course_predictions(course, students_data, reason='rate limit')
-        if '503' in error_msg or 'UNAVAILABLE' in error_msg:
-            return _build_fallback_course_predictions(course, students_data, reason='service unavailable')
-        return _build_fallback_course_predictions(course, students_data, reason='provider error')
-
-    # Map predictions back to student data
-    pred_map = {p['student_id']: p for p in predictions_list}
+        progress(int(40 * i / total), f'Collected data for {i} of {total} students')
+
+    # Reuse stored predictions for students whose data is unchanged, and
+    # send only the rest to Gemini, a few students per request
+    reused = _reusable_predictions(course, students_data)
+    changed = [sd for sd in students_data if sd['student_id'] not in reused]
+    pred_map, fallback_reasons = _predict_in_chunks(course, changed, progress, quota_wait) if changed else ({}, {})
+    pred_map.update(reused)
+    gemini_students = [sd for sd in students_data if sd['student_id'] in pred_map]
+    if not gemini_students:
+        reasons = ', '.join(sorted(set(fallback_reasons.values())))
+        return _build_fallback_course_predictions(course, students_data, reason=reasons)
 
     results = []
-    high_risk = 0
-    medium_risk = 0
-    low_risk = 0
-
-    for sd in students_data:
-        pred = pred_map.get(sd['student_id'], {})
-        risk_level = pred.get('risk_level', 'low')
-
-        if risk_level == 'high':
-            high_risk += 1
-        elif risk_level == 'medium':
-            medium_risk += 1
-        else:
-            low_risk += 1
-
-        result = {
+    for sd in gemini_students:
+        pred = pred_map[sd['student_id']]
+        results.append({
             'student_name': sd['student_name'],
             'student_id': sd['student_id'],
             'year_of_study': sd['year_of_study'],
@@ -403,37 +659,30 @@ def predict_course_performance(course_id, teacher_user):
             'historical_avg': sd['historical_avg_percentage'],
             'attendance': sd['attendance'],
             'predicted_grade': pred.get('predicted_grade'),
-            'risk_level': risk_level,
+            'risk_level': pred.get('risk_level', 'low'),
             'risk_factors': pred.get('risk_factors', []),
             'strengths': pred.get('strengths', []),
             'recommendations': pred.get('recommendations', []),
             'summary': pred.get('summary', ''),
-        }
-        results.append(result)
+        })
 
-    # Also persist predictions to database
-    for sd in students_data:
-        pred = pred_map.get(sd['student_id'], {})
+    # Students whose chunk still failed get fallback estimates, grouped by the reason
+    for reason in sorted(set(fallback_reasons.values())):
+        failed = [sd for sd in students_data if fallback_reasons.get(sd['student_id']) == reason]
+        results.extend(_build_fallback_course_predictions(course, failed, reason=reason)['predictions'])
+
+    high_risk = sum(1 for r in results if r['risk_level'] == 'high')
+    medium_risk = sum(1 for r in results if r['risk_level'] == 'medium')
+    low_risk = len(results) - high_risk - medium_risk
+
+    # Also persist new predictions to database
+    progress(90, 'Saving predictions')
+    for sd in gemini_students:
+        if sd['student_id'] in reused:
+            continue
         try:
             student = StudentProfile.objects.get(student_id=sd['student_id'])
-            risk_level = pred.get('risk_level', 'low')
-            PerformancePrediction.objects.update_or_create(
-                student=student,
-                course=course,
-                defaults={
-                    'predicted_grade': pred.get('predicted_grade', 0),
-                    'confidence_score': 0.85,  # Gemini-based
-                    'at_risk': risk_level in ('high', 'medium'),
-                    'risk_factors': pred.get('risk_factors', []),
-                    'recommendations': pred.get('recommendations', []),
-                    'features_used': {
-                        'current_avg': sd['current_course_avg_percentage'],
-                        'attendance_rate': sd['attendance']['attendance_rate'] if sd['attendance'] else None,
-                        'historical_avg': sd['historical_avg_percentage'],
-                    },
-                    'model_version': 'gemini-2.0-flash',
-                }
-            )
+            _save_ai_prediction(student, course, sd, pred_map[sd['student_id']])
         except Exception:
             pass  # Don't block on persistence errors
 
@@ -441,7 +690,7 @@ def predict_course_performance(course_id, teacher_user):
     risk_order = {'high': 0, 'medium': 1, 'low': 2}
     results.sort(key=lambda r: (risk_order.get(r['risk_level'], 3), -(r['predicted_grade'] or 0)))
 
-    return {
+    result = {
         'course': {
             'id': course.id,
             'name': course.name,
@@ -461,74 +710,173 @@ def predict_course_performance(course_id, teacher_user):
             ),
         },
         'generated_at': timezone.now().isoformat(),
-        'model': 'gemini-2.0-flash',
+        'model': GEMINI_MODEL,
+        'reused_predictions': len(reused),
         'error': None,
     }
+    if fallback_reasons:
+        result['warning'] = (
+            f'AI service unavailable for {len(fallback_reasons)} of {len(students_data)} students '
+            f"({', '.join(sorted(set(fallback_reasons.values())))}). Showing fallback predictions for them."
+        )
+    return result
 
 
-def predict_single_student(student_id, course_id, teacher_user):
-    """
-    Generate prediction for a single student in a course.
-    """
-    course = Course.objects.get(id=course_id, instructor=teacher_user)
-    student = StudentProfile.objects.get(id=student_id)
+def _latency_budget(endpoint):
+    """Seconds an AI endpoint waits for Gemini (None: no budget, call inline)."""
+    budgets = getattr(settings, 'AI_LATENCY_BUDGETS', DEFAULT_LATENCY_BUDGETS)
+    return budgets.get(endpoint) or None
 
-    sd = _collect_student_data(student, course)
 
+def _background_executor():
+    """The background pool and the semaphore counting its free threads"""
+    global _background, _background_slots
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=BACKGROUND_LLM_THREADS, thread_name_prefix='llm-background')
+            _background_slots = threading.BoundedSemaphore(BACKGROUND_LLM_THREADS)
+    return _background, _background_slots
+
+
+def _in_background(slots, func, *args):
     try:
-        client = _get_gemini_client()
-        prompt = _build_prompt(course, [sd])
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt,
-        )
-        raw_text = response.text.strip()
+        return func(*args)
+    finally:
+        slots.release()
+        # Pool threads outlive requests; don't leave their connections open
+        connections.close_all()
 
-        if raw_text.startswith('```'):
-            lines = raw_text.split('\n')
-            lines = [l for l in lines if not l.strip().startswith('```')]
-            raw_text = '\n'.join(lines)
 
-        predictions_list = json.loads(raw_text)
-        pred = predictions_list[0] if predictions_list else {}
-    except Exception as e:
-        return {'error': str(e)}
+def _http_options(seconds):
+    """Per-request http_options making Gemini give up after seconds (None: no deadline)"""
+    return {'timeout': int(seconds * 1000)} if seconds else None
 
-    risk_level = pred.get('risk_level', 'low')
+
+def _call_within_budget(endpoint, func, *args):
+    """
+    Run func(*args) and return its result, waiting at most the endpoint's
+    latency budget.
+
+    The call runs on a background thread and keeps it until func returns,
+    so func must bound its own Gemini request (see _http_options). Calls are
+    never queued behind others: with every background thread busy, this
+    gives up at once.
+
+    Raises:
+        concurrent.futures.TimeoutError: if the budget runs out first, or no
+            background thread is free
+    """
+    budget = _latency_budget(endpoint)
+    if budget is None:
+        return func(*args)
+
+    executor, slots = _background_executor()
+    if not slots.acquire(blocking=False):
+        raise FutureTimeoutError()
+    return executor.submit(_in_background, slots, func, *args).result(timeout=budget)
+
+
+def _request_student_prediction(client, course, student, sd):
+    """Ask Gemini about one student and store the answer."""
+    response = provider_guard.guarded_call(
+        client.models.generate_content,
+        model=GEMINI_MODEL,
+        contents=_build_prompt(course, [sd]),
+        # Past the budget the answer is only stored, so allow it a while longer
+        config={'http_options': _http_options(LATE_ANSWER_TIMEOUT)},
+    )
+    predictions_list = _parse_predictions(response.text)
+    pred = predictions_list[0] if predictions_list else {}
 
     # Persist
     try:
-        PerformancePrediction.objects.update_or_create(
-            student=student,
-            course=course,
-            defaults={
-                'predicted_grade': pred.get('predicted_grade', 0),
-                'confidence_score': 0.85,
-                'at_risk': risk_level in ('high', 'medium'),
-                'risk_factors': pred.get('risk_factors', []),
-                'recommendations': pred.get('recommendations', []),
-                'features_used': {
-                    'current_avg': sd['current_course_avg_percentage'],
-                    'attendance_rate': sd['attendance']['attendance_rate'] if sd['attendance'] else None,
-                    'historical_avg': sd['historical_avg_percentage'],
-                },
-                'model_version': 'gemini-2.0-flash',
-            }
-        )
+        _save_ai_prediction(student, course, sd, pred)
     except Exception:
         pass
+    return pred
+
+
+def _local_student_prediction(course, student, sd, reason):
+    """
+    Stand-in for a Gemini answer: the local performance model's prediction,
+    or the fallback heuristic when no model is trained.
+    """
+    local = PerformancePredictor().predict(student.id, course.id)
+    if local is None:
+        fallback = _build_fallback_course_predictions(course, [sd], reason=reason)
+        return {**fallback['predictions'][0], 'source': 'fallback-heuristic', 'warning': fallback['warning'], 'error': None}
+
+    predicted_grade = local['predicted_grade']
+    if predicted_grade < 55:
+        risk_level = 'high'
+    elif local['at_risk'] or predicted_grade < 72:
+        risk_level = 'medium'
+    else:
+        risk_level = 'low'
 
     return {
         'student_name': sd['student_name'],
         'student_id': sd['student_id'],
         'current_avg': sd['current_course_avg_percentage'],
         'attendance': sd['attendance'],
-        'predicted_grade': pred.get('predicted_grade'),
+        'predicted_grade': predicted_grade,
+        'confidence_score': local['confidence_score'],
         'risk_level': risk_level,
+        'risk_factors': local['risk_factors'],
+        'strengths': [],
+        'recommendations': local['recommendations'],
+        'summary': (
+            f"Local model estimate: predicted around {predicted_grade}% with {risk_level} risk "
+            f"(generated because {reason})."
+        ),
+        'source': 'local-model',
+        'model_version': local['model_version'],
+        'warning': f'AI service unavailable ({reason}). Showing the local model prediction.',
+        'error': None,
+    }
+
+
+def predict_single_student(student_id, course_id, teacher_user):
+    """
+    Generate prediction for a single student in a course.
+
+    A stored Gemini prediction made from the same student data is returned
+    as is. If Gemini does not answer within the 'student_prediction' latency
+    budget (or every background thread is busy), the local model answers
+    instead; the Gemini call carries on in the background for up to
+    LATE_ANSWER_TIMEOUT seconds and stores its prediction for next time.
+    """
+    course = Course.objects.get(id=course_id, instructor=teacher_user)
+    student = StudentProfile.objects.get(id=student_id)
+
+    sd = _collect_student_data(student, course)
+
+    pred = _reusable_predictions(course, [sd]).get(sd['student_id'])
+    source = 'stored'
+    if pred is None:
+        source = 'gemini'
+        try:
+            client = _get_gemini_client()
+            pred = _call_within_budget('student_prediction', _request_student_prediction, client, course, student, sd)
+        except FutureTimeoutError:
+            return _local_student_prediction(course, student, sd, reason='AI response too slow')
+        except provider_guard.ProviderUnavailable as e:
+            return _local_student_prediction(course, student, sd, reason=e.reason)
+        except Exception as e:
+            return {'error': str(e)}
+
+    return {
+        'student_name': sd['student_name'],
+        'student_id': sd['student_id'],
+        'current_avg': sd['current_course_avg_percentage'],
+        'attendance': sd['attendance'],
+        'predicted_grade': pred.get('predicted_grade'),
+        'risk_level': pred.get('risk_level', 'low'),
         'risk_factors': pred.get('risk_factors', []),
         'strengths': pred.get('strengths', []),
         'recommendations': pred.get('recommendations', []),
         'summary': pred.get('summary', ''),
+        'source': source,
         'error': None,
     }
 
@@ -863,50 +1211,33 @@ GUIDELINES:
         'parts': [{'text': message}],
     })
 
-    last_error = None
     try:
         client = _get_gemini_client()
-        response = None
-        for attempt in range(2):
-            try:
-                response = client.models.generate_content(
-                    model='gemini-2.0-flash',
-                    contents=contents,
-                    config={
-                        'system_instruction': system_context,
-                        'temperature': 0.7,
-                        'max_output_tokens': 1024,
-                    },
-                )
-                break
-            except Exception as e:
-                last_error = e
-                error_text = str(e)
-                if attempt == 0 and ('429' in error_text or 'RESOURCE_EXHAUSTED' in error_text or '503' in error_text or 'UNAVAILABLE' in error_text):
-                    time.sleep(1.5)
-                    continue
-                raise
-
-        if response is None:
-            raise last_error if last_error else RuntimeError('Gemini did not return a response.')
+        # No retry here: the provider guard fails fast while Gemini is
+        # rate limited or down, and a slow answer is cut off by the 'chat'
+        # latency budget; the fallback below answers instead
+        response = _call_within_budget('chat', functools.partial(
+            provider_guard.guarded_call,
+            client.models.generate_content,
+            model=GEMINI_MODEL,
+            contents=contents,
+            config={
+                'system_instruction': system_context,
+                'temperature': 0.7,
+                'max_output_tokens': 1024,
+                # A late answer is of no use: stop the request with the budget
+                'http_options': _http_options(_latency_budget('chat')),
+            },
+        ))
 
         return {
             'response': response.text.strip(),
+            'source': 'gemini',
             'error': None,
         }
-    except Exception as e:
-        error_msg = str(e)
-        if '429' in error_msg or 'RESOURCE_EXHAUSTED' in error_msg:
-            return {
-                'response': _build_fallback_chat_response(student_data, message, conversation_history),
-                'error': None,
-            }
-        if '503' in error_msg or 'UNAVAILABLE' in error_msg:
-            return {
-                'response': _build_fallback_chat_response(student_data, message, conversation_history),
-                'error': None,
-            }
+    except Exception:
         return {
             'response': _build_fallback_chat_response(student_data, message, conversation_history),
+            'source': 'fallback',
             'error': None,
         }
@@ -0,0 +1,157 @@
+"""
+In-memory gradebook for a single course.
+
+Loads a course's enrollments, assessments and grades in three queries and
+computes per-student and per-assessment statistics with NumPy arrays
+indexed by student and assessment.
+"""
+import numpy as np
+
+from apps.courses.models import Enrollment
+from .grading import letter_grades
+from .models import Assessment, Grade
+
+
+def _full_name(first_name, last_name):
+    """Mirror User.get_full_name() for values() rows."""
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+class CourseGradebook:
+    """Student x assessment grade matrix for one course"""
+
+    def __init__(self, course):
+        self.course = course
+        self._load()
+        self._compute()
+
+    def _load(self):
+        enrollments = list(
+            Enrollment.objects.filter(course=self.course, is_active=True)
+            .values(
+                'student_id', 'student__student_id',
+                'student__user__first_name', 'student__user__last_name',
+                'student__user__email',
+            )
+        )
+        self.assessments = list(
+            Assessment.objects.filter(course=self.course)
+            .order_by('-created_at')
+            .values('id', 'title', 'assessment_type', 'total_marks', 'due_date', 'created_at')
+        )
+        self.grades = list(
+            Grade.objects.filter(assessment__course=self.course)
+            .order_by('id')
+            .values(
+                'student_id', 'assessment_id', 'marks_obtained', 'feedback',
+                'student__student_id', 'student__user__first_name', 'student__user__last_name',
+            )
+        )
+
+        # Enrolled students come first (in enrollment order); students who
+        # still hold grades without an active enrollment are appended so that
+        # every grade has a row in the matrix.
+        self.enrollments = enrollments
+        self.student_index = {}
+        for row in enrollments:
+            self.student_index.setdefault(row['student_id'], len(self.student_index))
+        for row in self.grades:
+            self.student_index.setdefault(row['student_id'], len(self.student_index))
+        self.assessment_index = {row['id']: i for i, row in enumerate(self.assessments)}
+
+    def _compute(self):
+        n_students = len(self.student_index)
+        n_assessments = len(self.assessment_index)
+
+        self.total_marks = np.array(
+            [float(row['total_marks']) for row in self.assessments], dtype=float
+        )
+        rows = np.fromiter(
+            (self.student_index[g['student_id']] for g in self.grades), dtype=np.intp, count=len(self.grades)
+        )
+        cols = np.fromiter(
+            (self.assessment_index[g['assessment_id']] for g in self.grades), dtype=np.intp, count=len(self.grades)
+        )
+        marks = np.fromiter(
+            (float(g['marks_obtained']) for g in self.grades), dtype=float, count=len(self.grades)
+        )
+
+        matrix = np.full((n_students, n_assessments), np.nan)
+        matrix[rows, cols] = marks
+        graded = ~np.isnan(matrix)
+        filled = np.where(graded, matrix, 0.0)
+
+        self.student_counts = graded.sum(axis=1)
+        self.student_averages = np.divide(
+            filled.sum(axis=1), self.student_counts,
+            out=np.zeros(n_students), where=self.student_counts > 0,
+        )
+        self.assessment_counts = graded.sum(axis=0)
+        self.assessment_averages = np.divide(
+            filled.sum(axis=0), self.assessment_counts,
+            out=np.zeros(n_assessments), where=self.assessment_counts > 0,
+        )
+
+        # Per-grade percentage and letter, aligned with self.grades
+        row_totals = self.total_marks[cols]
+        self.grade_percentages = np.divide(
+            marks * 100, row_totals, out=np.zeros(len(marks)), where=row_totals > 0,
+        )
+        self.grade_letters = letter_grades(self.grade_percentages)
+
+    def student_rows(self):
+        """Per-student summary for every actively enrolled student"""
+        students = []
+        for row in self.enrollments:
+            i = self.student_index[row['student_id']]
+            students.append({
+                'id': row['student_id'],
+                'name': _full_name(row['student__user__first_name'], row['student__user__last_name']),
+                'student_id': row['student__student_id'],
+                'email': row['student__user__email'],
+                'total_assessments': int(self.student_counts[i]),
+                'average_score': round(float(self.student_averages[i]), 2),
+            })
+        return students
+
+    def assessment_rows(self, assessment_type=None, limit=50):
+        """Per-assessment results, newest first, optionally filtered by type"""
+        selected = [
+            row for row in self.assessments
+            if not assessment_type or row['assessment_type'] == assessment_type
+        ][:limit]
+
+        performance = {row['id']: [] for row in selected}
+        for k, grade in enumerate(self.grades):
+            entries = performance.get(grade['assessment_id'])
+            if entries is None:
+                continue
+            entries.append({
+                'student_id': grade['student__student_id'],
+                'student_name': _full_name(grade['student__user__first_name'], grade['student__user__last_name']),
+                'marks_obtained': float(grade['marks_obtained']),
+                'percentage': round(float(self.grade_percentages[k]), 1),
+                'grade': self.grade_letters[k],
+                'comments': grade['feedback'] or '',
+            })
+
+        total_students = len(self.enrollments)
+        assessments = []
+        for row in selected:
+            j = self.assessment_index[row['id']]
+            avg_score = float(self.assessment_averages[j])
+            total_marks = float(self.total_marks[j])
+            assessments.append({
+                'id': row['id'],
+                'assessment_name': row['title'],
+                'assessment_type': row['assessment_type'],
+                'total_marks': total_marks,
+                'due_date': row['due_date'],
+                'created_at': row['created_at'],
+                'performance': performance[row['id']],
+                'total_students': total_students,
+                'graded_count': len(performance[row['id']]),
+                'average_score': round(avg_score, 2),
+                'average_percentage': round((avg_score / total_marks * 100) if total_marks > 0 else 0, 1),
+            })
+        return assessments
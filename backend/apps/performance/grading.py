@@ -0,0 +1,61 @@
+"""
+Letter grade scale shared by the Grade model, SQL annotations, course
+reports and the ML utilities.
+
+The scale is a list of (lower percentage bound, letter) pairs. Percentages
+below the lowest bound map to FAIL_LETTER. Deployments can replace the
+default with a LETTER_GRADE_SCALE setting in the same format.
+"""
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, CharField, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+
+
+DEFAULT_LETTER_GRADE_SCALE = [
+    (90, 'A+'),
+    (85, 'A'),
+    (80, 'A-'),
+    (75, 'B+'),
+    (70, 'B'),
+    (65, 'B-'),
+    (60, 'C+'),
+    (55, 'C'),
+    (50, 'C-'),
+]
+
+FAIL_LETTER = 'F'
+
+
+def letter_grade_scale():
+    """Active scale, highest bound first"""
+    scale = getattr(settings, 'LETTER_GRADE_SCALE', None) if settings.configured else None
+    return sorted(scale or DEFAULT_LETTER_GRADE_SCALE, reverse=True)
+
+
+def letter_grade_for(percentage, scale=None):
+    """Letter grade for a single percentage"""
+    for bound, letter in scale or letter_grade_scale():
+        if percentage >= bound:
+            return letter
+    return FAIL_LETTER
+
+
+def letter_grades(percentages, scale=None):
+    """Vectorised percentage -> letter grade lookup"""
+    ordered = sorted(scale or letter_grade_scale())
+    thresholds = np.array([bound for bound, _ in ordered], dtype=float)
+    labels = np.array([FAIL_LETTER] + [letter for _, letter in ordered], dtype=object)
+    return labels[np.searchsorted(thresholds, np.asarray(percentages, dtype=float), side='right')]
+
+
+def letter_grade_expression(percentage, scale=None):
+    """Case/When expression mapping a percentage expression to its letter grade in SQL"""
+    return Case(
+        *[
+            When(GreaterThanOrEqual(percentage, bound), then=Value(letter))
+            for bound, letter in scale or letter_grade_scale()
+        ],
+        default=Value(FAIL_LETTER),
+        output_field=CharField(),
+    )
@@ -0,0 +1,197 @@
+"""
+Background AI course prediction jobs.
+
+A Gemini course prediction can take up to a couple of minutes, far too long
+to hold one of the few gunicorn workers. The API instead records a
+PredictionJob row and returns its id; the job table itself is the queue.
+
+Jobs are claimed with a conditional UPDATE (status and heartbeat must still
+match what was read), so any number of threads and processes can work the
+queue without a broker and each job runs once at a time:
+
+- Every web process keeps a small thread pool (PREDICTION_JOB_THREADS,
+  default 2; 0 disables it) that is woken when a job is committed.
+- The run_prediction_jobs command works the same queue from a dedicated
+  process (the Procfile's worker and the compose prediction-worker
+  service). It polls, so it also picks up jobs nobody woke a thread for.
+
+Running jobs refresh heartbeat_at as they report progress. A job whose
+worker died (e.g. a recycled gunicorn worker) goes stale and is retried, up
+to MAX_JOB_ATTEMPTS attempts.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.courses.models import Course
+from .models import PredictionJob
+
+
+JOB_STALE_AFTER = timedelta(minutes=5)
+MAX_JOB_ATTEMPTS = 3
+# Longest a job waits for Gemini quota per request; progress reports keep
+# its heartbeat fresh meanwhile
+JOB_QUOTA_WAIT = timedelta(minutes=2)
+DEFAULT_JOB_THREADS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def enqueue_course_prediction(course, user):
+    """
+    Queue an AI prediction for a course.
+
+    A job already queued or running for the course is returned instead of
+    starting a duplicate, and the job threads are woken in case the worker
+    meant to run it is gone. A running job whose heartbeat went stale no
+    longer counts: it is failed and replaced by a new job.
+
+    Returns:
+        Tuple of (job, created)
+    """
+    stale_before = timezone.now() - JOB_STALE_AFTER
+    with transaction.atomic():
+        # Lock the course row so simultaneous requests check and create one at a time
+        Course.objects.select_for_update().get(pk=course.pk)
+        job = (
+            PredictionJob.objects.filter(
+                Q(status='queued') | Q(status='running', heartbeat_at__gte=stale_before), course=course
+            )
+            .order_by('-created_at')
+            .first()
+        )
+        created = job is None
+        if created:
+            _fail_abandoned_jobs(stale_before, course=course)
+            job = PredictionJob.objects.create(course=course, requested_by=user)
+        transaction.on_commit(wake_workers)
+    return job, created
+
+
+def _fail_abandoned_jobs(stale_before, course=None):
+    """Fail stale running jobs: out of attempts, or (for course) all of them"""
+    abandoned = PredictionJob.objects.filter(status='running', heartbeat_at__lt=stale_before)
+    if course is None:
+        abandoned = abandoned.filter(attempts__gte=MAX_JOB_ATTEMPTS)
+    else:
+        abandoned = abandoned.filter(course=course)
+    abandoned.update(
+        status='failed',
+        error='Prediction worker stopped responding',
+        finished_at=timezone.now(),
+    )
+
+
+def claim_next_job():
+    """
+    Atomically take the oldest queued (or stale running) job.
+
+    Returns:
+        The claimed PredictionJob, or None if there is nothing to run
+    """
+    now = timezone.now()
+    stale_before = now - JOB_STALE_AFTER
+    _fail_abandoned_jobs(stale_before)
+
+    candidates = (
+        PredictionJob.objects.filter(
+            Q(status='queued')
+            | Q(status='running', heartbeat_at__lt=stale_before, attempts__lt=MAX_JOB_ATTEMPTS)
+        )
+        .order_by('created_at')
+        .values_list('pk', 'status', 'heartbeat_at')[:10]
+    )
+    for pk, job_status, heartbeat_at in candidates:
+        claimed = PredictionJob.objects.filter(
+            pk=pk, status=job_status, heartbeat_at=heartbeat_at
+        ).update(
+            status='running',
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return PredictionJob.objects.select_related('requested_by').get(pk=pk)
+    return None
+
+
+def _progress_reporter(job_id):
+    def report(percent, message):
+        PredictionJob.objects.filter(pk=job_id, status='running').update(
+            progress=percent,
+            progress_message=message[:200],
+            heartbeat_at=timezone.now(),
+        )
+    return report
+
+
+def run_job(job):
+    """Run a claimed job and record its result or error"""
+    from .gemini_predictor import predict_course_performance
+
+    try:
+        result = predict_course_performance(
+            job.course_id, job.requested_by,
+            progress=_progress_reporter(job.pk), quota_wait=JOB_QUOTA_WAIT.total_seconds(),
+        )
+    except Exception as e:
+        PredictionJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e), finished_at=timezone.now(),
+        )
+        return
+
+    PredictionJob.objects.filter(pk=job.pk).update(
+        status='failed' if result.get('error') else 'succeeded',
+        progress=100,
+        progress_message='Done',
+        result=result,
+        error=result.get('error') or '',
+        finished_at=timezone.now(),
+    )
+
+
+def run_pending_jobs(max_jobs=None):
+    """
+    Run queued jobs in this thread until the queue is empty.
+
+    Returns:
+        Number of jobs run
+    """
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def _drain_queue():
+    try:
+        run_pending_jobs()
+    finally:
+        # Pool threads outlive requests; don't leave their connections open
+        connections.close_all()
+
+
+def job_threads():
+    return getattr(settings, 'PREDICTION_JOB_THREADS', DEFAULT_JOB_THREADS)
+
+
+def wake_workers():
+    """Have this process's job threads drain the queue"""
+    global _executor
+    threads = job_threads()
+    if not threads:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='prediction-job')
+    _executor.submit(_drain_queue)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.performance.models import GradeSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-student, per-course grade summaries from the grades table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-id', type=int, help='Only rebuild summaries for this course')
+
+    def handle(self, *args, **options):
+        course_id = options.get('course_id')
+        self.stdout.write('Rebuilding grade summaries...')
+
+        count = GradeSummary.rebuild(course=course_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} grade summaries'))
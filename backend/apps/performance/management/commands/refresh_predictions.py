@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.performance.refresh import refresh_predictions
+
+
+class Command(BaseCommand):
+    help = 'Refresh performance predictions for all active enrollments across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count, 0 runs in-process)')
+        parser.add_argument('--shards', type=int, help='Number of course shards (default: 4 per worker)')
+        parser.add_argument('--checkpoint', help='Checkpoint file recording refreshed courses')
+        parser.add_argument('--resume', action='store_true', help='Skip courses recorded in the checkpoint')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per upsert statement')
+
+    def handle(self, *args, **options):
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume requires --checkpoint')
+
+        self.stdout.write('Refreshing predictions...')
+        try:
+            totals = refresh_predictions(
+                workers=options['workers'],
+                shards=options['shards'],
+                checkpoint=options['checkpoint'],
+                resume=options['resume'],
+                chunk_size=options['chunk_size'],
+                progress=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        summary = (
+            f"Refreshed {totals['rows']} predictions over {totals['courses']} courses "
+            f"in {totals['seconds']:.2f}s ({totals['rows_per_second']:.1f} rows/sec)"
+        )
+        if totals['failed_courses']:
+            raise CommandError(f"{summary}; {len(totals['failed_courses'])} courses failed, rerun with --resume")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.performance.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued AI course prediction jobs (an alternative or addition to the '
+        'in-process job threads; see PREDICTION_JOB_THREADS)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Jobs run concurrently')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue checks')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        threads = max(1, options['threads'])
+        self.stdout.write(f'Running prediction jobs with {threads} threads...')
+
+        def drain():
+            try:
+                return run_pending_jobs()
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                ran = sum(future.result() for future in [executor.submit(drain) for _ in range(threads)])
+                if ran:
+                    self.stdout.write(f'Finished {ran} jobs')
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Prediction job queue is empty'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.performance.snapshots import capture_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Snapshot the model features of all active enrollments (run periodically, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-id', type=int, action='append', help='Only snapshot this course (repeatable)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Capturing feature snapshots...')
+
+        count = capture_snapshots(course_ids=options.get('course_id'))
+
+        self.stdout.write(self.style.SUCCESS(f'Captured {count} feature snapshots'))
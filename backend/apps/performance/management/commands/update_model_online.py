@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.performance.online import incremental_update
+
+
+class Command(BaseCommand):
+    help = (
+        'Update the prediction model with enrollments finished since its last checkpoint '
+        '(partial_fit; safe to run periodically, e.g. from cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=256, help='Enrollments per partial_fit call')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Updating prediction model...')
+
+        try:
+            stats = incremental_update(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                progress=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if stats['version'] is None:
+            self.stdout.write(self.style.SUCCESS('No newly finished enrollments; model unchanged'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Published {stats['version']} after {stats['rows']} enrollments "
+                f"in {stats['batches']} batches ({stats['seconds']:.2f}s)"
+            ))
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:16
+
+from django.db import migrations, models
+from django.db.models import Case, Count, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast
+import django.db.models.deletion
+
+
+def backfill_grade_summaries(apps, schema_editor):
+    Grade = apps.get_model('performance', 'Grade')
+    GradeSummary = apps.get_model('performance', 'GradeSummary')
+
+    published = Q(is_published=True)
+    percentage = Case(
+        When(
+            assessment__total_marks__gt=0,
+            then=Cast('marks_obtained', FloatField()) * 100 / Cast('assessment__total_marks', FloatField()),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = Grade.objects.values('student_id', 'assessment__course_id').order_by().annotate(
+        grade_count=Count('id'),
+        marks_sum=Sum('marks_obtained'),
+        published_count=Count('id', filter=published),
+        published_marks_sum=Sum('marks_obtained', filter=published),
+        percentage_sum=Sum(percentage, filter=published),
+        weighted_score=Sum(
+            percentage * Cast('assessment__weight_percentage', FloatField()) / 100,
+            filter=published,
+        ),
+        last_graded_at=Max('graded_at'),
+    )
+
+    GradeSummary.objects.bulk_create(
+        [
+            GradeSummary(
+                student_id=row['student_id'],
+                course_id=row['assessment__course_id'],
+                grade_count=row['grade_count'],
+                marks_sum=row['marks_sum'] or 0,
+                published_count=row['published_count'],
+                published_marks_sum=row['published_marks_sum'] or 0,
+                percentage_sum=row['percentage_sum'] or 0,
+                weighted_score=row['weighted_score'] or 0,
+                last_graded_at=row['last_graded_at'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+def reverse_noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('students', '0002_auto_create_student_profiles'),
+        ('performance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade_count', models.PositiveIntegerField(default=0)),
+                ('marks_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('published_count', models.PositiveIntegerField(default=0)),
+                ('published_marks_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('percentage_sum', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('weighted_score', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('last_graded_at', models.DateTimeField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to='courses.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to='students.studentprofile')),
+            ],
+            options={
+                'db_table': 'grade_summaries',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(backfill_grade_summaries, reverse_noop),
+    ]
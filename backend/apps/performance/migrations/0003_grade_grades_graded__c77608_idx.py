@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0002_gradesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['graded_at', 'id'], name='grades_graded__c77608_idx'),
+        ),
+    ]
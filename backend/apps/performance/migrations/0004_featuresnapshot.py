@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_auto_create_student_profiles'),
+        ('courses', '0001_initial'),
+        ('performance', '0003_grade_grades_graded__c77608_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('captured_at', models.DateTimeField()),
+                ('year_of_study', models.SmallIntegerField()),
+                ('current_gpa', models.FloatField()),
+                ('course_difficulty', models.SmallIntegerField()),
+                ('course_credits', models.SmallIntegerField()),
+                ('avg_historical_performance', models.FloatField()),
+                ('total_assessments_taken', models.IntegerField()),
+                ('current_course_avg', models.FloatField()),
+                ('assessments_completed', models.IntegerField()),
+                ('attendance_rate', models.FloatField()),
+                ('days_enrolled', models.IntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_snapshots', to='courses.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_snapshots', to='students.studentprofile')),
+            ],
+            options={
+                'db_table': 'feature_snapshots',
+                'unique_together': {('student', 'course', 'captured_at')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0005_predictionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performanceprediction',
+            name='data_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-17 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0006_performanceprediction_data_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderGuardState',
+            fields=[
+                ('provider', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.DateTimeField()),
+                ('circuit', models.CharField(choices=[('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half open')], default='closed', max_length=10)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('opened_at', models.DateTimeField(blank=True, null=True)),
+                ('probe_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'db_table': 'provider_guard_state',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-17 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0007_providerguardstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceSummaryVersion',
+            fields=[
+                ('student_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'performance_summary_versions',
+            },
+        ),
+    ]
@@ -3,26 +3,87 @@ Machine Learning utilities for performance prediction
 """
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
-import joblib
+from decimal import Decimal
 from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+import math
 import os
-from .models import Grade, Assessment, PerformancePrediction
+import time
+from .models import Grade, GradeSummary, Assessment, PerformancePrediction
+from .compiled_forest import compile_forest
+from .estimators import estimator_name, make_estimator, name_for_model
+from .model_registry import get_registry
+from .online import latest_checkpoint
+from .search import hyperparameter_search
+from .snapshots import enrollment_features, snapshot_features
+from .summary import invalidate_performance_summary
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
 from apps.attendance.models import AttendanceRecord
 
 
+# Model input columns, in the order extract_features produces them
+FEATURE_COLUMNS = [
+    'year_of_study',
+    'current_gpa',
+    'course_difficulty',
+    'course_credits',
+    'avg_historical_performance',
+    'total_assessments_taken',
+    'current_course_avg',
+    'assessments_completed',
+    'attendance_rate',
+    'days_enrolled',
+]
+
+DIFFICULTY_SCORES = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
+
+# Risk factor raised when a feature falls below its threshold, with the
+# recommendation it triggers (if any), in reporting order
+RISK_RULES = [
+    ('Low attendance rate', 'attendance_rate', 70, 'Improve class attendance to at least 80%'),
+    ('Poor current performance', 'current_course_avg', 60, 'Seek additional help from instructors or tutors'),
+    ('Weak academic history', 'avg_historical_performance', 60, 'Consider enrolling in academic support programs'),
+    ('Limited assessment data', 'assessments_completed', 2, None),
+]
+ADVANCED_COURSE_RECOMMENDATION = 'Allocate extra study time for this advanced course'
+DEFAULT_RECOMMENDATION = 'Continue with current study approach'
+
+# Central prediction interval reported from the spread of the forest's trees,
+# and the tolerance (in grade points) whose coverage is the confidence score
+PREDICTION_INTERVAL_LEVEL = 0.95
+PREDICTION_INTERVAL_Z = 1.959964
+CONFIDENCE_TOLERANCE = 10
+
+PREDICTION_UPDATE_FIELDS = [
+    'predicted_grade', 'confidence_score', 'at_risk', 'risk_factors',
+    'recommendations', 'features_used', 'model_version',
+]
+
+
+# Element-wise error function, without depending on scipy
+_erf = np.vectorize(math.erf, otypes=[float])
+
+
 class PerformancePredictor:
     """ML model for predicting student performance"""
     
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, estimator=None):
+        # Estimator to train (default: the PERFORMANCE_ESTIMATOR setting);
+        # load_model replaces it with the one the active version was trained with
+        self.estimator = estimator_name(estimator)
+        self.model = make_estimator(self.estimator)
         self.scaler = StandardScaler()
         self.model_path = os.path.join(settings.BASE_DIR, 'ml', 'models')
+        self.model_version = None
+        self.compiled = None
+        self.holdout = None
+        self.search_trace = None
+        self.online_state = None
         
     def extract_features(self, student_id, course_id):
         """Extract features for a student-course pair"""
@@ -40,31 +101,26 @@ class PerformancePredictor:
             }
             
             # Historical performance features
-            historical_grades = Grade.objects.filter(student=student).exclude(
-                assessment__course=course
+            historical = GradeSummary.objects.filter(student=student).exclude(
+                course=course
+            ).aggregate(
+                count=models.Sum('grade_count'),
+                marks=models.Sum('marks_sum')
             )
             
-            if historical_grades.exists():
-                avg_performance = historical_grades.aggregate(
-                    avg_percentage=models.Avg('marks_obtained')
-                )['avg_percentage'] or 0
-                features['avg_historical_performance'] = float(avg_performance)
-                features['total_assessments_taken'] = historical_grades.count()
+            if historical['count']:
+                features['avg_historical_performance'] = float(historical['marks'] / historical['count'])
+                features['total_assessments_taken'] = historical['count']
             else:
                 features['avg_historical_performance'] = 0
                 features['total_assessments_taken'] = 0
             
             # Current course performance
-            current_grades = Grade.objects.filter(
-                student=student,
-                assessment__course=course,
-                is_published=True
-            )
+            current = GradeSummary.objects.filter(student=student, course=course).first()
             
-            if current_grades.exists():
-                current_avg = sum(g.percentage for g in current_grades) / len(current_grades)
-                features['current_course_avg'] = current_avg
-                features['assessments_completed'] = current_grades.count()
+            if current and current.published_count:
+                features['current_course_avg'] = float(current.average_percentage)
+                features['assessments_completed'] = current.published_count
             else:
                 features['current_course_avg'] = 0
                 features['assessments_completed'] = 0
@@ -95,30 +151,145 @@ class PerformancePredictor:
     
     def _get_difficulty_score(self, difficulty_level):
         """Convert difficulty level to numeric score"""
-        mapping = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
-        return mapping.get(difficulty_level, 2)
-    
-    def prepare_training_data(self):
-        """Prepare training data from existing grades"""
-        data = []
-        
-        # Get all completed enrollments with final grades
-        completed_enrollments = Enrollment.objects.filter(
-            status__in=['completed', 'failed'],
-            final_grade__isnull=False
+        return DIFFICULTY_SCORES.get(difficulty_level, 2)
+
+    def extract_features_batch(self, enrollments):
+        """
+        Extract features for many enrollments with a fixed number of grouped queries.
+
+        Produces the same values as extract_features for each student-course
+        pair, as a DataFrame indexed by (student_id, course_id) with
+        FEATURE_COLUMNS. Pairs that extract_features would reject (a
+        non-numeric year of study) are left out.
+
+        Args:
+            enrollments: Enrollment queryset
+
+        Returns:
+            DataFrame of features, one row per enrollment in queryset order
+        """
+        rows = pd.DataFrame.from_records(
+            enrollments.values_list(
+                'student_id', 'course_id', 'enrollment_date', 'student__year_of_study',
+                'student__gpa', 'course__difficulty_level', 'course__credits',
+            ),
+            columns=['student_id', 'course_id', 'enrollment_date', 'year_of_study',
+                     'gpa', 'difficulty_level', 'credits'],
+        )
+        rows['year_of_study'] = pd.to_numeric(rows['year_of_study'], errors='coerce')
+        rows = rows[rows['year_of_study'].notna()]
+        if rows.empty:
+            index = pd.MultiIndex.from_arrays([[], []], names=['student_id', 'course_id'])
+            return pd.DataFrame(columns=FEATURE_COLUMNS, index=index)
+
+        student_ids = enrollments.values('student_id')
+        course_ids = enrollments.values('course_id')
+        pair = ['student_id', 'course_id']
+
+        # Historical performance: all of the student's summaries minus this course's one.
+        # Marks stay Decimal until the final division, as in extract_features.
+        summaries = pd.DataFrame.from_records(
+            GradeSummary.objects.filter(student_id__in=student_ids).values_list(
+                'student_id', 'course_id', 'grade_count', 'marks_sum', 'published_count', 'percentage_sum'
+            ),
+            columns=pair + ['grade_count', 'marks_sum', 'published_count', 'percentage_sum'],
+        )
+        totals = summaries.groupby('student_id').agg(
+            total_count=('grade_count', 'sum'),
+            total_marks=('marks_sum', lambda marks: sum(marks, Decimal('0'))),
+        )
+        rows = rows.merge(totals, how='left', left_on='student_id', right_index=True)
+        rows = rows.merge(summaries, how='left', on=pair)
+
+        own_count = rows['grade_count'].fillna(0).astype(int)
+        own_marks = rows['marks_sum'].where(rows['marks_sum'].notna(), Decimal('0'))
+        history_count = rows['total_count'].fillna(0).astype(int) - own_count
+        history_marks = rows['total_marks'].where(rows['total_marks'].notna(), Decimal('0')) - own_marks
+        published = rows['published_count'].fillna(0).astype(int)
+
+        attendance = pd.DataFrame.from_records(
+            AttendanceRecord.objects.filter(student_id__in=student_ids, course_id__in=course_ids)
+            .values('student_id', 'course_id')
+            .annotate(total=models.Count('id'), present=models.Count('id', filter=models.Q(status='present')))
+            .values_list('student_id', 'course_id', 'total', 'present'),
+            columns=pair + ['attendance_total', 'attendance_present'],
         )
+        rows = rows.merge(attendance, how='left', on=pair)
+        attendance_total = rows['attendance_total'].fillna(0).to_numpy(dtype=float)
+        attendance_present = rows['attendance_present'].fillna(0).to_numpy(dtype=float)
+
+        today = pd.Timestamp(timezone.now().date())
+        enrolled_on = pd.to_datetime(rows['enrollment_date'], utc=True).dt.tz_convert(None).dt.normalize()
+
+        features = pd.DataFrame({
+            'year_of_study': rows['year_of_study'].astype(int),
+            'current_gpa': rows['gpa'].map(lambda gpa: float(gpa or 0)),
+            'course_difficulty': rows['difficulty_level'].map(lambda level: DIFFICULTY_SCORES.get(level, 2)),
+            'course_credits': rows['credits'].astype(int),
+            'avg_historical_performance': [
+                float(marks / count) if count else 0.0
+                for marks, count in zip(history_marks, history_count)
+            ],
+            'total_assessments_taken': history_count,
+            'current_course_avg': [
+                float(percentage_sum / count) if count else 0.0
+                for percentage_sum, count in zip(rows['percentage_sum'], published)
+            ],
+            'assessments_completed': published,
+            'attendance_rate': np.divide(
+                attendance_present, attendance_total,
+                out=np.zeros(len(rows)), where=attendance_total > 0,
+            ) * 100,
+            'days_enrolled': (today - enrolled_on).dt.days,
+        })
+        features.index = pd.MultiIndex.from_frame(rows[pair])
+        return features[FEATURE_COLUMNS]
+    
+    def prepare_training_data(self, completed_enrollments=None):
+        """Prepare training data from existing grades, oldest enrollment first"""
+        # Get all completed enrollments with final grades; chronological order
+        # lets hyperparameter search validate on newer rows than it trains on
+        if completed_enrollments is None:
+            completed_enrollments = Enrollment.objects.filter(
+                status__in=['completed', 'failed'],
+                final_grade__isnull=False
+            ).order_by('enrollment_date', 'id')
         
-        for enrollment in completed_enrollments:
-            features = self.extract_features(enrollment.student.id, enrollment.course.id)
-            if features:
-                features['final_grade'] = float(enrollment.final_grade)
-                data.append(features)
+        df = self.extract_features_batch(completed_enrollments)
+        final_grades = pd.DataFrame.from_records(
+            completed_enrollments.values_list('student_id', 'course_id', 'final_grade'),
+            columns=['student_id', 'course_id', 'final_grade'],
+        ).set_index(['student_id', 'course_id'])['final_grade']
+        df['final_grade'] = final_grades.reindex(df.index).astype(float)
         
-        return pd.DataFrame(data)
+        return df.reset_index(drop=True)
     
-    def train_model(self):
-        """Train the ML model"""
-        df = self.prepare_training_data()
+    def train_model(self, df=None, search=None, checkpoint=None):
+        """
+        Train the ML model.
+
+        Args:
+            df: Training frame of FEATURE_COLUMNS plus final_grade in
+                chronological order (default: the database's completed enrollments)
+            search: Options for search.hyperparameter_search (strategy,
+                n_candidates, budget_seconds, n_jobs, ...). When given, the
+                newest 20% of rows are held out, hyperparameters are searched
+                on the rest with time-series folds, and the trace is saved
+                with the model. Without it the estimator's defaults are fit
+                on a random split.
+            checkpoint: Online update checkpoint taken before df was built,
+                recorded for models with partial_fit (default: taken here
+                when df is computed here)
+
+        The scaled held-out split is kept on self.holdout as (X_test, y_test)
+        for evaluation reports.
+        """
+        if df is None:
+            # Rows finished after this point are left to online updates
+            checkpoint = latest_checkpoint()
+            df = self.prepare_training_data()
+        if checkpoint is not None and hasattr(self.model, 'partial_fit'):
+            self.online_state = {'checkpoint': checkpoint, 'rows_seen': len(df)}
         
         if df.empty or len(df) < 10:  # Need minimum data points
             print("Insufficient data for training")
@@ -133,9 +304,17 @@ class PerformancePredictor:
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+            X, y, test_size=0.2, random_state=42, shuffle=search is None
         )
         
+        if search is not None:
+            params, self.search_trace = hyperparameter_search(
+                X_train, y_train, estimator=self.estimator, **search
+            )
+            print(f"Search: {len(self.search_trace['candidates'])} candidates in "
+                  f"{self.search_trace['elapsed_seconds']:.1f}s, best {params}")
+            self.model = make_estimator(self.estimator).set_params(**params)
+        
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
@@ -149,35 +328,32 @@ class PerformancePredictor:
         r2 = r2_score(y_test, y_pred)
         
         print(f"Model Performance - MSE: {mse:.2f}, R²: {r2:.2f}")
+        self.holdout = (X_test_scaled, y_test)
         
         # Save model
         self.save_model()
         
         return True
     
-    def predict(self, student_id, course_id):
-        """Predict performance for a student-course pair"""
+    def predict(self, student_id, course_id, features=None):
+        """Predict performance for a student-course pair, optionally from precomputed features"""
         try:
-            # Load model if not already loaded
-            self.load_model()
+            # Fetch the active model from the process-wide registry
+            if not self.load_model():
+                return None
             
-            # Extract features
-            features = self.extract_features(student_id, course_id)
+            # Extract features, reusing a fresh snapshot when there is one
+            if features is None:
+                features = snapshot_features(student_id, course_id) or self.extract_features(student_id, course_id)
             if not features:
                 return None
             
-            # Prepare features for prediction
-            feature_df = pd.DataFrame([features])
-            feature_df = feature_df.fillna(0)  # Handle missing values
-            
-            # Scale features
-            features_scaled = self.scaler.transform(feature_df)
-            
             # Make prediction
-            predicted_grade = self.model.predict(features_scaled)[0]
-            
-            # Calculate confidence (simplified approach)
-            confidence = min(0.9, max(0.1, 1.0 - (abs(predicted_grade - 75) / 100)))
+            if self.compiled is not None:
+                X = self._feature_row(features)[np.newaxis, :]
+            else:
+                X = pd.DataFrame([features]).fillna(0)  # Handle missing values
+            predicted_grade, confidence, lower, upper = (float(values[0]) for values in self._score(X))
             
             # Determine risk factors
             risk_factors = self._identify_risk_factors(features)
@@ -192,110 +368,245 @@ class PerformancePredictor:
                 'at_risk': at_risk,
                 'risk_factors': risk_factors,
                 'recommendations': recommendations,
-                'features_used': features
+                'features_used': self._features_used(features, lower, upper),
+                'model_version': self.model_version
             }
             
         except Exception as e:
             print(f"Prediction error: {e}")
             return None
     
+    def _score(self, X):
+        """
+        Predicted grades, confidence scores and prediction interval bounds.
+
+        With a compiled forest the per-tree predictions for the whole batch
+        form one (n_trees x n_rows) matrix; the prediction is its column mean
+        and the interval is mean +/- z * std across trees. Confidence is the
+        probability, under that spread, that the grade lands within
+        CONFIDENCE_TOLERANCE points of the prediction. Models without tree
+        spread keep the distance-from-75 heuristic and have NaN bounds.
+
+        Returns:
+            Tuple of arrays (predicted, confidence, lower, upper)
+        """
+        if self.compiled is None:
+            predicted = self.model.predict(self.scaler.transform(X))
+            confidence = np.clip(1.0 - np.abs(predicted - 75) / 100, 0.1, 0.9)
+            missing = np.full(len(predicted), np.nan)
+            return predicted, confidence, missing, missing
+        
+        per_tree = self.compiled.tree_predictions(X)
+        predicted = per_tree.mean(axis=0)
+        spread = per_tree.std(axis=0)
+        with np.errstate(divide='ignore'):
+            confidence = _erf(CONFIDENCE_TOLERANCE / (spread * np.sqrt(2)))
+        margin = PREDICTION_INTERVAL_Z * spread
+        return predicted, confidence, predicted - margin, predicted + margin
+    
+    def _features_used(self, features, lower, upper):
+        """Features to persist with a prediction, with its interval when one was computed"""
+        if np.isnan(lower):
+            return features
+        return {
+            **features,
+            'prediction_interval': {
+                'lower': round(float(lower), 2),
+                'upper': round(float(upper), 2),
+                'level': PREDICTION_INTERVAL_LEVEL,
+            },
+        }
+    
+    def _feature_row(self, features):
+        """Feature dict as a float array, missing values as 0"""
+        row = np.array([np.nan if value is None else value for value in features.values()], dtype=np.float64)
+        row[np.isnan(row)] = 0
+        return row
+    
     def _identify_risk_factors(self, features):
         """Identify risk factors based on features"""
-        risk_factors = []
-        
-        if features.get('attendance_rate', 0) < 70:
-            risk_factors.append('Low attendance rate')
-        
-        if features.get('current_course_avg', 0) < 60:
-            risk_factors.append('Poor current performance')
-        
-        if features.get('avg_historical_performance', 0) < 60:
-            risk_factors.append('Weak academic history')
-        
-        if features.get('assessments_completed', 0) < 2:
-            risk_factors.append('Limited assessment data')
-        
-        return risk_factors
+        return [
+            factor for factor, column, threshold, _ in RISK_RULES
+            if features.get(column, 0) < threshold
+        ]
     
     def _generate_recommendations(self, features, risk_factors):
         """Generate recommendations based on analysis"""
-        recommendations = []
-        
-        if 'Low attendance rate' in risk_factors:
-            recommendations.append('Improve class attendance to at least 80%')
-        
-        if 'Poor current performance' in risk_factors:
-            recommendations.append('Seek additional help from instructors or tutors')
-        
-        if 'Weak academic history' in risk_factors:
-            recommendations.append('Consider enrolling in academic support programs')
+        recommendations = [
+            recommendation for factor, _, _, recommendation in RISK_RULES
+            if recommendation and factor in risk_factors
+        ]
         
         if features.get('course_difficulty', 0) == 3:  # Advanced course
-            recommendations.append('Allocate extra study time for this advanced course')
+            recommendations.append(ADVANCED_COURSE_RECOMMENDATION)
         
         if not recommendations:
-            recommendations.append('Continue with current study approach')
+            recommendations.append(DEFAULT_RECOMMENDATION)
         
         return recommendations
     
-    def save_model(self):
-        """Save the trained model and scaler"""
-        os.makedirs(self.model_path, exist_ok=True)
+    def predict_batch(self, features):
+        """
+        Predict many student-course pairs with one model call.
+
+        Applies the same scoring, risk and recommendation rules as predict()
+        to a whole feature matrix.
+
+        Args:
+            features: DataFrame from extract_features_batch
+
+        Returns:
+            DataFrame with the prediction fields and interval bounds, aligned
+            with features.index, or None if no model has been trained
+        """
+        if not self.load_model():
+            return None
+        
+        features = features.fillna(0)
+        if features.empty:
+            return pd.DataFrame(
+                columns=['predicted_grade', 'confidence_score', 'interval_lower', 'interval_upper',
+                         'at_risk', 'risk_factors', 'recommendations'],
+                index=features.index,
+            )
+        
+        X = features.to_numpy(dtype=np.float64) if self.compiled is not None else features
+        predicted, confidence, lower, upper = self._score(X)
         
-        model_file = os.path.join(self.model_path, 'performance_model.joblib')
-        scaler_file = os.path.join(self.model_path, 'feature_scaler.joblib')
+        # One boolean column per rule; lists are assembled from the flags
+        flags = np.column_stack([
+            features[column].to_numpy() < threshold
+            for _, column, threshold, _ in RISK_RULES
+        ])
+        advanced = features['course_difficulty'].to_numpy() == 3
+        factor_names = [factor for factor, _, _, _ in RISK_RULES]
+        advice = [recommendation for _, _, _, recommendation in RISK_RULES]
         
-        joblib.dump(self.model, model_file)
-        joblib.dump(self.scaler, scaler_file)
+        risk_factors = []
+        recommendations = []
+        for row_flags, row_advanced in zip(flags, advanced):
+            hits = np.flatnonzero(row_flags)
+            risk_factors.append([factor_names[k] for k in hits])
+            row_advice = [advice[k] for k in hits if advice[k]]
+            if row_advanced:
+                row_advice.append(ADVANCED_COURSE_RECOMMENDATION)
+            recommendations.append(row_advice or [DEFAULT_RECOMMENDATION])
+        
+        return pd.DataFrame({
+            'predicted_grade': np.round(predicted, 2),
+            'confidence_score': np.round(confidence, 4),
+            'interval_lower': lower,
+            'interval_upper': upper,
+            'at_risk': (flags.sum(axis=1) > 2) | (predicted < 60),
+            'risk_factors': risk_factors,
+            'recommendations': recommendations,
+        }, index=features.index)
+    
+    def save_model(self):
+        """
+        Publish the trained model and scaler as a new active version.
+
+        The forest is also exported in compiled form, which predict() and
+        predict_batch() use instead of sklearn when it is available.
+        """
+        self.compiled = compile_forest(self.model, self.scaler)
+        self.model_version = get_registry(self.model_path).publish(
+            self.model, self.scaler, compiled=self.compiled,
+            metadata=self._metadata(),
+        )
+        return self.model_version
+    
+    def _metadata(self):
+        """Metadata published with the model: estimator, its parameters, search trace and online checkpoint"""
+        params = {
+            key: value for key, value in self.model.get_params().items()
+            if value is None or isinstance(value, (bool, int, float, str))
+        }
+        metadata = {'estimator': self.estimator, 'params': params}
+        if self.search_trace is not None:
+            metadata['search'] = self.search_trace
+        if self.online_state is not None:
+            metadata['online'] = self.online_state
+        return metadata
     
     def load_model(self):
-        """Load the saved model and scaler"""
-        model_file = os.path.join(self.model_path, 'performance_model.joblib')
-        scaler_file = os.path.join(self.model_path, 'feature_scaler.joblib')
-        
-        if os.path.exists(model_file) and os.path.exists(scaler_file):
-            self.model = joblib.load(model_file)
-            self.scaler = joblib.load(scaler_file)
-        else:
+        """Load the active model and scaler from the registry"""
+        loaded = get_registry(self.model_path).get()
+        if loaded is None:
             print("Model files not found. Train the model first.")
+            return False
+        
+        self.model_version = loaded.version
+        self.model = loaded.model
+        self.scaler = loaded.scaler
+        self.compiled = loaded.compiled
+        self.estimator = loaded.metadata.get('estimator') or name_for_model(loaded.model)
+        return True
 
 
-def update_predictions():
-    """Update predictions for all active enrollments"""
+def update_predictions(chunk_size=1000, course_ids=None):
+    """
+    Update predictions for all active enrollments.
+
+    Features are extracted in bulk, the model scores the whole matrix at
+    once and rows are written with chunked INSERT ... ON CONFLICT upserts.
+
+    Args:
+        chunk_size: Rows per upsert statement
+        course_ids: Restrict the refresh to these courses (one shard of a parallel run)
+
+    Returns:
+        Dict with the number of rows written, elapsed seconds and rows per second
+    """
+    started = time.perf_counter()
     predictor = PerformancePredictor()
     
     active_enrollments = Enrollment.objects.filter(
         status='enrolled',
         is_active=True
     )
+    if course_ids is not None:
+        active_enrollments = active_enrollments.filter(course_id__in=course_ids)
     
-    for enrollment in active_enrollments:
-        prediction_data = predictor.predict(
-            enrollment.student.id,
-            enrollment.course.id
-        )
-        
-        if prediction_data:
-            # Update or create prediction
-            prediction, created = PerformancePrediction.objects.update_or_create(
-                student=enrollment.student,
-                course=enrollment.course,
-                defaults={
-                    'predicted_grade': prediction_data['predicted_grade'],
-                    'confidence_score': prediction_data['confidence_score'],
-                    'at_risk': prediction_data['at_risk'],
-                    'risk_factors': prediction_data['risk_factors'],
-                    'recommendations': prediction_data['recommendations'],
-                    'features_used': prediction_data['features_used'],
-                }
+    features = enrollment_features(predictor, active_enrollments)
+    predictions = predictor.predict_batch(features)
+    rows = 0
+    
+    if predictions is not None and not predictions.empty:
+        records = [
+            PerformancePrediction(
+                student_id=student_id,
+                course_id=course_id,
+                predicted_grade=prediction['predicted_grade'],
+                confidence_score=prediction['confidence_score'],
+                at_risk=prediction['at_risk'],
+                risk_factors=prediction['risk_factors'],
+                recommendations=prediction['recommendations'],
+                features_used=predictor._features_used(
+                    features_used, prediction['interval_lower'], prediction['interval_upper']
+                ),
+                model_version=predictor.model_version,
             )
-            
-            if created:
-                print(f"Created new prediction for {enrollment}")
-            else:
-                print(f"Updated prediction for {enrollment}")
-
-
-# Django imports needed for the models
-from django.db import models
-from django.utils import timezone
+            for ((student_id, course_id), prediction), features_used in zip(
+                predictions.to_dict('index').items(), features.to_dict('records')
+            )
+        ]
+        
+        for start in range(0, len(records), chunk_size):
+            with transaction.atomic():
+                PerformancePrediction.objects.bulk_create(
+                    records[start:start + chunk_size],
+                    update_conflicts=True,
+                    unique_fields=['student', 'course'],
+                    update_fields=PREDICTION_UPDATE_FIELDS,
+                )
+        rows = len(records)
+        # bulk_create skips the post_save signals that expire cached summaries
+        invalidate_performance_summary(*{record.student_id for record in records})
+    
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,207 @@
+"""
+Process-wide registry of trained performance models.
+
+Each trained model is written to its own version directory under
+ml/models, and an ACTIVE pointer file names the version in use:
+
+    ml/models/ACTIVE
+    ml/models/v20260101120000/performance_model.joblib
+    ml/models/v20260101120000/feature_scaler.joblib
+    ml/models/v20260101120000/compiled_forest.joblib   (optional)
+    ml/models/v20260101120000/performance_model_metadata.json
+
+Models are loaded once per process. The compiled forest (plain ndarrays)
+is memory-mapped, so gunicorn workers share its pages through the OS page
+cache; the sklearn objects are loaded normally, as their unpickling copies
+tree arrays into private memory anyway. Publishing a new
+version swaps the pointer atomically; every process picks it up on its next
+lookup. A flat performance_model.joblib/feature_scaler.joblib pair from
+before versioning is served as LEGACY_VERSION.
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+import joblib
+from django.conf import settings
+from django.utils import timezone
+
+from .compiled_forest import compile_forest
+
+MODEL_FILE = 'performance_model.joblib'
+SCALER_FILE = 'feature_scaler.joblib'
+COMPILED_FILE = 'compiled_forest.joblib'
+# Same name ml.utils.save_model_metadata derives from the model file
+METADATA_FILE = 'performance_model_metadata.json'
+ACTIVE_FILE = 'ACTIVE'
+LEGACY_VERSION = 'v1.0'
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: Any
+    scaler: Any
+    compiled: Any = None
+    metadata: dict = {}
+
+
+class ModelRegistry:
+    """Versioned model store for one model directory"""
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._stamp = None
+
+    def _pointer_path(self):
+        return os.path.join(self.model_dir, ACTIVE_FILE)
+
+    def _has_legacy_files(self):
+        return all(
+            os.path.exists(os.path.join(self.model_dir, name))
+            for name in (MODEL_FILE, SCALER_FILE)
+        )
+
+    def _current_stamp(self):
+        """Cheap fingerprint of the pointer file; changes whenever a version is published"""
+        try:
+            stat = os.stat(self._pointer_path())
+        except FileNotFoundError:
+            if not self._has_legacy_files():
+                return None
+            stat = os.stat(os.path.join(self.model_dir, MODEL_FILE))
+            return ('legacy', stat.st_ino, stat.st_mtime_ns)
+        return ('pointer', stat.st_ino, stat.st_mtime_ns)
+
+    def _version_dir(self, version):
+        if version == LEGACY_VERSION and not os.path.isdir(os.path.join(self.model_dir, version)):
+            return self.model_dir
+        return os.path.join(self.model_dir, version)
+
+    def active_version(self):
+        """Version named by the pointer file, or None if no model has been trained"""
+        try:
+            with open(self._pointer_path()) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return LEGACY_VERSION if self._has_legacy_files() else None
+
+    def model_file(self, version):
+        """Path of a version's model file"""
+        return os.path.join(self._version_dir(version), MODEL_FILE)
+
+    def versions(self):
+        """All published versions, oldest first"""
+        if not os.path.isdir(self.model_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.model_dir)
+            if os.path.exists(os.path.join(self.model_dir, name, MODEL_FILE))
+        )
+
+    def _load(self, version):
+        directory = self._version_dir(version)
+        compiled_path = os.path.join(directory, COMPILED_FILE)
+        metadata_path = os.path.join(directory, METADATA_FILE)
+        model = joblib.load(os.path.join(directory, MODEL_FILE))
+        scaler = joblib.load(os.path.join(directory, SCALER_FILE))
+        if os.path.exists(compiled_path):
+            compiled = joblib.load(compiled_path, mmap_mode='r')
+        else:
+            # Versions published before compiled export are compiled on load
+            compiled = compile_forest(model, scaler)
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        return LoadedModel(version=version, model=model, scaler=scaler, compiled=compiled, metadata=metadata)
+
+    def get(self):
+        """
+        Active model, loaded at most once per version in this process.
+
+        Returns:
+            LoadedModel, or None if no model has been trained yet
+        """
+        stamp = self._current_stamp()
+        loaded = self._loaded
+        if loaded is not None and stamp == self._stamp:
+            return loaded
+        if stamp is None:
+            return None
+
+        with self._lock:
+            if self._loaded is not None and stamp == self._stamp:
+                return self._loaded
+            version = self.active_version()
+            if version is None:
+                return None
+            if self._loaded is None or self._loaded.version != version:
+                self._loaded = self._load(version)
+            self._stamp = stamp
+            return self._loaded
+
+    def _new_version(self):
+        base = timezone.now().strftime('v%Y%m%d%H%M%S')
+        version, n = base, 1
+        while os.path.exists(os.path.join(self.model_dir, version)):
+            n += 1
+            version = f'{base}-{n}'
+        return version
+
+    def _write_pointer(self, version):
+        tmp_path = os.path.join(self.model_dir, f'.{ACTIVE_FILE}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._pointer_path())
+
+    def publish(self, model, scaler, version=None, compiled=None, metadata=None):
+        """
+        Write a new model version and make it the active one.
+
+        An optional compiled form of the model (see compiled_forest) is
+        stored alongside it for fast inference, and metadata as JSON.
+
+        Files are written to a temporary directory that is renamed into place,
+        so readers never see a partially written version.
+
+        Returns:
+            The published version name
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        version = version or self._new_version()
+        target = os.path.join(self.model_dir, version)
+        tmp_dir = f'{target}.{os.getpid()}.tmp'
+        os.makedirs(tmp_dir)
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        if compiled is not None:
+            # Uncompressed, as memory-mapped loading requires
+            joblib.dump(compiled, os.path.join(tmp_dir, COMPILED_FILE))
+        if metadata is not None:
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2)
+        os.replace(tmp_dir, target)
+        self._write_pointer(version)
+        return version
+
+    def activate(self, version):
+        """Point the registry at an already published version, e.g. to roll back"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        self._write_pointer(version)
+
+
+@lru_cache(maxsize=None)
+def _registry_for(model_dir):
+    return ModelRegistry(model_dir)
+
+
+def get_registry(model_dir=None):
+    """Shared registry for a model directory (default: ml/models)"""
+    return _registry_for(os.path.abspath(model_dir or os.path.join(settings.BASE_DIR, 'ml', 'models')))
@@ -1,7 +1,44 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Case, Count, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast
 from django.conf import settings
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
+from .grading import letter_grade_expression, letter_grade_for
+
+
+# Grade percentage computed in SQL; assessments worth 0 marks count as 0%
+GRADE_PERCENTAGE = Case(
+    When(
+        assessment__total_marks__gt=0,
+        then=Cast('marks_obtained', FloatField()) * 100 / Cast('assessment__total_marks', FloatField()),
+    ),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+_PUBLISHED = Q(is_published=True)
+
+# Aggregates over Grade rows that make up a GradeSummary
+GRADE_SUMMARY_AGGREGATES = {
+    'grade_count': Count('id'),
+    'marks_sum': Sum('marks_obtained'),
+    'published_count': Count('id', filter=_PUBLISHED),
+    'published_marks_sum': Sum('marks_obtained', filter=_PUBLISHED),
+    'percentage_sum': Sum(GRADE_PERCENTAGE, filter=_PUBLISHED),
+    'weighted_score': Sum(
+        GRADE_PERCENTAGE * Cast('assessment__weight_percentage', FloatField()) / 100,
+        filter=_PUBLISHED,
+    ),
+    'last_graded_at': Max('graded_at'),
+}
+
+
+def grade_summary_aggregates(grades):
+    """Aggregate a Grade queryset into GradeSummary field values"""
+    return grades.aggregate(**GRADE_SUMMARY_AGGREGATES)
 
 
 class Assessment(models.Model):
@@ -39,6 +76,19 @@ class Assessment(models.Model):
         return f"{self.course.code} - {self.title}"
 
 
+class GradeQuerySet(models.QuerySet):
+    """Grade queryset with SQL-side percentage and letter grade annotations"""
+
+    def with_percentage(self):
+        return self.annotate(grade_percentage=GRADE_PERCENTAGE)
+
+    def with_letter_grade(self, scale=None):
+        return self.annotate(grade_letter=letter_grade_expression(GRADE_PERCENTAGE, scale))
+
+    def with_grading(self, scale=None):
+        return self.with_percentage().with_letter_grade(scale)
+
+
 class Grade(models.Model):
     """Student grades for assessments"""
     
@@ -63,9 +113,14 @@ class Grade(models.Model):
     graded_at = models.DateTimeField(auto_now_add=True)
     is_published = models.BooleanField(default=False)
 
+    objects = GradeQuerySet.as_manager()
+
     class Meta:
         db_table = 'grades'
         unique_together = ['student', 'assessment']
+        indexes = [
+            models.Index(fields=['graded_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.assessment.title}: {self.marks_obtained}/{self.assessment.total_marks}"
@@ -77,27 +132,103 @@ class Grade(models.Model):
     @property
     def letter_grade(self):
         """Convert percentage to letter grade"""
-        percentage = self.percentage
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 85:
-            return 'A'
-        elif percentage >= 80:
-            return 'A-'
-        elif percentage >= 75:
-            return 'B+'
-        elif percentage >= 70:
-            return 'B'
-        elif percentage >= 65:
-            return 'B-'
-        elif percentage >= 60:
-            return 'C+'
-        elif percentage >= 55:
-            return 'C'
-        elif percentage >= 50:
-            return 'C-'
-        else:
-            return 'F'
+        return letter_grade_for(self.percentage)
+
+
+class GradeSummary(models.Model):
+    """Running grade aggregates for a student in a course"""
+    
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='grade_summaries'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='grade_summaries'
+    )
+    # All grades, published or not
+    grade_count = models.PositiveIntegerField(default=0)
+    marks_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Published grades only
+    published_count = models.PositiveIntegerField(default=0)
+    published_marks_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    percentage_sum = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    weighted_score = models.DecimalField(max_digits=12, decimal_places=4, default=0)  # sum of percentage x weight
+    last_graded_at = models.DateTimeField(null=True, blank=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'grade_summaries'
+        unique_together = ['student', 'course']
+
+    def __str__(self):
+        return f"{self.student.user.get_full_name()} - {self.course.code} - {self.published_count} grades"
+
+    @property
+    def average_marks(self):
+        """Average raw marks over published grades"""
+        return self.published_marks_sum / self.published_count if self.published_count else 0
+
+    @property
+    def average_percentage(self):
+        """Average percentage over published grades"""
+        return self.percentage_sum / self.published_count if self.published_count else 0
+
+    def update_summary(self):
+        """Recompute the summary from the student's grade rows"""
+        totals = grade_summary_aggregates(
+            Grade.objects.filter(student=self.student, assessment__course=self.course)
+        )
+        for field, value in totals.items():
+            setattr(self, field, value if value is not None else self._meta.get_field(field).get_default())
+        self.save()
+
+    @classmethod
+    def rebuild(cls, course=None, students=None):
+        """Rebuild summaries from scratch, optionally scoped to a course and/or students"""
+        grades = Grade.objects.all()
+        summaries = cls.objects.all()
+        if course is not None:
+            grades = grades.filter(assessment__course=course)
+            summaries = summaries.filter(course=course)
+        if students is not None:
+            grades = grades.filter(student__in=students)
+            summaries = summaries.filter(student__in=students)
+        
+        rows = grades.values('student_id', 'assessment__course_id').order_by()
+        rows = rows.annotate(**GRADE_SUMMARY_AGGREGATES)
+        
+        with transaction.atomic():
+            summaries.delete()
+            created = cls.objects.bulk_create(
+                [
+                    cls(
+                        student_id=row['student_id'],
+                        course_id=row['assessment__course_id'],
+                        **{field: row[field] for field in GRADE_SUMMARY_AGGREGATES if row[field] is not None}
+                    )
+                    for row in rows.iterator(chunk_size=2000)
+                ],
+                batch_size=1000,
+            )
+        return len(created)
+
+
+class PerformanceSummaryVersion(models.Model):
+    """Version of a student's cached performance summary (see summary.py), shared by all workers"""
+    
+    # Not a foreign key: versions are bumped from signals while a student's
+    # rows are being cascade-deleted, after the student is already gone
+    student_id = models.BigIntegerField(primary_key=True)
+    version = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'performance_summary_versions'
+
+    def __str__(self):
+        return f"Summary version {self.version} for {self.student_id}"
 
 
 class PerformancePrediction(models.Model):
@@ -118,6 +249,8 @@ class PerformancePrediction(models.Model):
     prediction_date = models.DateTimeField(auto_now_add=True)
     model_version = models.CharField(max_length=20, default='v1.0')
     features_used = models.JSONField(default=dict)  # Store feature importance
+    # Hash of the student data an AI prediction was made from (see gemini_predictor)
+    data_fingerprint = models.CharField(max_length=64, blank=True, default='')
     
     # Risk factors
     at_risk = models.BooleanField(default=False)
@@ -132,6 +265,108 @@ class PerformancePrediction(models.Model):
         return f"Prediction for {self.student.user.get_full_name()} in {self.course.code}: {self.predicted_grade}"
 
 
+class FeatureSnapshot(models.Model):
+    """Model features of an active enrollment as they stood at captured_at"""
+    
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='feature_snapshots'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='feature_snapshots'
+    )
+    captured_at = models.DateTimeField()
+    
+    # One column per entry of ml_utils.FEATURE_COLUMNS
+    year_of_study = models.SmallIntegerField()
+    current_gpa = models.FloatField()
+    course_difficulty = models.SmallIntegerField()
+    course_credits = models.SmallIntegerField()
+    avg_historical_performance = models.FloatField()
+    total_assessments_taken = models.IntegerField()
+    current_course_avg = models.FloatField()
+    assessments_completed = models.IntegerField()
+    attendance_rate = models.FloatField()
+    days_enrolled = models.IntegerField()
+
+    class Meta:
+        db_table = 'feature_snapshots'
+        unique_together = ['student', 'course', 'captured_at']
+
+    def __str__(self):
+        return f"Features for {self.student_id} in {self.course_id} at {self.captured_at:%Y-%m-%d %H:%M}"
+
+
+class PredictionJob(models.Model):
+    """Queued AI course prediction, run in the background by jobs.py workers"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='prediction_jobs'
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='prediction_jobs'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Refreshed on progress; stale jobs are retried
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'prediction_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Prediction job {self.pk} for {self.course.code}: {self.status}"
+
+
+class ProviderGuardState(models.Model):
+    """Rate limit and circuit breaker state of an AI provider, shared by all workers (see provider_guard.py)"""
+    
+    CIRCUIT_CHOICES = [
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half open'),
+    ]
+    
+    provider = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField()
+    refilled_at = models.DateTimeField()
+    circuit = models.CharField(max_length=10, choices=CIRCUIT_CHOICES, default='closed')
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    probe_started_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        db_table = 'provider_guard_state'
+
+    def __str__(self):
+        return f"{self.provider}: circuit {self.circuit}, {self.tokens:.1f} tokens"
+
+
 class StudyGoal(models.Model):
     """Student study goals and targets"""
     
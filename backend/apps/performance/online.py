@@ -0,0 +1,156 @@
+"""
+Online updates of the performance model.
+
+Finished (completed or failed) enrollments with a final grade are consumed
+in (graded_at, id) order. Enrollment.save stamps graded_at when the row first
+becomes trainable (stamp_graded_at catches rows finished with update()), so
+a grade entered long after the course finished is still picked up. Each run continues from the checkpoint stored in the
+active model version's metadata, feeds the new rows to the estimator's
+partial_fit in small batches, and publishes the result as a new version
+whose metadata carries the advanced checkpoint. Model and checkpoint
+therefore always change together, and a run that finds nothing new
+publishes nothing.
+
+The scaler is frozen once fitted: shifting it would change what the
+estimator's existing weights mean.
+"""
+import copy
+import time
+
+from django.db.models import Q
+from django.utils import timezone
+from sklearn.preprocessing import StandardScaler
+
+from apps.courses.models import Enrollment
+from .estimators import make_estimator
+from .model_registry import get_registry
+
+
+ONLINE_ESTIMATOR = 'sgd'
+
+
+def finished_enrollments():
+    """Enrollments usable as training rows, in the order online updates consume them"""
+    return Enrollment.objects.filter(
+        status__in=['completed', 'failed'],
+        final_grade__isnull=False,
+        graded_at__isnull=False,
+    ).order_by('graded_at', 'id')
+
+
+def stamp_graded_at():
+    """
+    Stamp graded_at on finished, graded enrollments that lack it.
+
+    Enrollment.save stamps graded_at, but queryset update() and bulk_update()
+    bypass save. Rows finished that way are stamped here, as of now, so the
+    next checkpoint covers them instead of skipping them for good.
+
+    Returns:
+        Number of enrollments stamped
+    """
+    return Enrollment.objects.filter(
+        status__in=['completed', 'failed'],
+        final_grade__isnull=False,
+        graded_at__isnull=True,
+    ).update(graded_at=timezone.now())
+
+
+def latest_checkpoint():
+    """Checkpoint just past the newest finished enrollment (after stamp_graded_at), or None if there is none"""
+    stamp_graded_at()
+    latest = finished_enrollments().values('id', 'graded_at').last()
+    if latest is None:
+        return None
+    return {'graded_at': latest['graded_at'].isoformat(), 'enrollment_id': latest['id']}
+
+
+def _after(queryset, checkpoint):
+    if not checkpoint:
+        return queryset
+    # Checkpoints written before graded_at existed hold the completion_date it was backfilled from
+    graded_at = checkpoint.get('graded_at') or checkpoint['completion_date']
+    return queryset.filter(
+        Q(graded_at__gt=graded_at)
+        | Q(graded_at=graded_at, id__gt=checkpoint['enrollment_id'])
+    )
+
+
+def incremental_update(batch_size=256, max_batches=None, model_dir=None, progress=None):
+    """
+    Update the active model with enrollments finished since its checkpoint.
+
+    Starts a fresh ONLINE_ESTIMATOR model when none has been trained yet.
+
+    Args:
+        batch_size: Enrollments per partial_fit call
+        max_batches: Stop after this many batches (default: consume everything)
+        model_dir: Model directory (default: ml/models)
+        progress: Callable receiving one message per batch
+
+    Returns:
+        Dict with rows and batches consumed, the published version (None if
+        nothing was new) and elapsed seconds
+
+    Raises:
+        ValueError: if the active model cannot be updated incrementally
+    """
+    from .ml_utils import FEATURE_COLUMNS, PerformancePredictor
+
+    started = time.perf_counter()
+    progress = progress or (lambda message: None)
+    predictor = PerformancePredictor(ONLINE_ESTIMATOR)
+    if model_dir:
+        predictor.model_path = model_dir
+
+    loaded = get_registry(predictor.model_path).get()
+    if loaded is None:
+        model, scaler, state = make_estimator(ONLINE_ESTIMATOR), StandardScaler(), {'rows_seen': 0}
+    else:
+        if not hasattr(loaded.model, 'partial_fit'):
+            raise ValueError(
+                f"Active model {loaded.version} ({type(loaded.model).__name__}) does not support "
+                f"partial_fit; train a '{ONLINE_ESTIMATOR}' model first"
+            )
+        predictor.estimator = loaded.metadata.get('estimator', ONLINE_ESTIMATOR)
+        # Don't mutate the model other threads in this process are serving
+        model, scaler = copy.deepcopy(loaded.model), copy.deepcopy(loaded.scaler)
+        state = dict(loaded.metadata.get('online') or {'rows_seen': 0})
+
+    stamped = stamp_graded_at()
+    if stamped:
+        progress(f'Stamped graded_at on {stamped} enrollments finished without Enrollment.save')
+
+    rows = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = list(_after(finished_enrollments(), state.get('checkpoint')).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+
+        df = predictor.prepare_training_data(Enrollment.objects.filter(id__in=batch).order_by('graded_at', 'id'))
+        if not df.empty:
+            X, y = df[FEATURE_COLUMNS], df['final_grade']
+            if not hasattr(scaler, 'mean_'):
+                # A fresh model takes its scaling from the first batch
+                scaler.fit(X)
+            model.partial_fit(scaler.transform(X), y)
+
+        last = Enrollment.objects.values('id', 'graded_at').get(id=batch[-1])
+        state['checkpoint'] = {'graded_at': last['graded_at'].isoformat(), 'enrollment_id': last['id']}
+        state['rows_seen'] = state.get('rows_seen', 0) + len(df)
+        rows += len(df)
+        batches += 1
+        progress(f"Batch {batches}: {len(df)} enrollments (checkpoint {state['checkpoint']['graded_at']})")
+
+    version = None
+    if batches:
+        predictor.model, predictor.scaler = model, scaler
+        predictor.online_state = state
+        version = predictor.save_model()
+
+    return {
+        'rows': rows,
+        'batches': batches,
+        'version': version,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
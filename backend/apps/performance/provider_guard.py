@@ -0,0 +1,129 @@
+"""
+Rate limiting and circuit breaking for AI provider calls.
+
+The state lives in one ProviderGuardState row per provider, locked with
+SELECT ... FOR UPDATE, so every gunicorn worker and job thread sees the
+same quota and circuit:
+
+- Token bucket: the bucket holds up to the per-minute quota and refills
+  continuously at that rate. A call takes one token. If the bucket is
+  empty, the call is refused. A 429 from the provider empties the bucket,
+  so other workers back off too.
+- Circuit breaker: CIRCUIT_FAILURE_THRESHOLD failures in a row open the
+  circuit, and calls are refused without touching the network. After the
+  cooldown, a single probe call is let through (half open). If the probe
+  succeeds, the circuit closes; if it fails, the circuit opens again.
+
+Refused calls raise ProviderUnavailable, and callers go straight to their
+heuristic fallbacks.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ProviderGuardState
+
+
+DEFAULT_REQUESTS_PER_MINUTE = 15
+DEFAULT_CIRCUIT_COOLDOWN = 30
+CIRCUIT_FAILURE_THRESHOLD = 5
+
+
+class ProviderUnavailable(Exception):
+    """The guard refused a provider call; reason is 'rate limit' or 'service unavailable'"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _requests_per_minute():
+    return getattr(settings, 'GEMINI_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE)
+
+
+def _cooldown():
+    return timedelta(seconds=getattr(settings, 'GEMINI_CIRCUIT_COOLDOWN', DEFAULT_CIRCUIT_COOLDOWN))
+
+
+def _locked_state(provider, now):
+    state = ProviderGuardState.objects.select_for_update().filter(provider=provider).first()
+    if state is None:
+        ProviderGuardState.objects.get_or_create(
+            provider=provider, defaults={'tokens': _requests_per_minute(), 'refilled_at': now}
+        )
+        state = ProviderGuardState.objects.select_for_update().get(provider=provider)
+    return state
+
+
+def acquire(provider='gemini'):
+    """
+    Take permission for one provider call.
+
+    Raises:
+        ProviderUnavailable: if the circuit is open (or a half-open probe is
+            already in flight) or the quota is used up
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        state = _locked_state(provider, now)
+
+        if state.circuit != 'closed':
+            waiting_since = state.probe_started_at if state.circuit == 'half_open' else state.opened_at
+            if waiting_since and now - waiting_since < _cooldown():
+                raise ProviderUnavailable('service unavailable')
+            # Cooldown over (or a probe never reported back): let one probe through
+            state.circuit = 'half_open'
+            state.probe_started_at = now
+
+        rate = _requests_per_minute() / 60
+        state.tokens = min(_requests_per_minute(), state.tokens + (now - state.refilled_at).total_seconds() * rate)
+        state.refilled_at = now
+        if state.tokens < 1:
+            state.save(update_fields=['tokens', 'refilled_at'])
+            raise ProviderUnavailable('rate limit')
+        state.tokens -= 1
+        state.save()
+
+
+def record_success(provider='gemini'):
+    """Close the circuit after a successful call"""
+    ProviderGuardState.objects.filter(provider=provider).exclude(
+        circuit='closed', consecutive_failures=0
+    ).update(circuit='closed', consecutive_failures=0, opened_at=None, probe_started_at=None)
+
+
+def record_failure(provider='gemini', error=None):
+    """Count a failed call, opening the circuit on a failed probe or too many failures in a row"""
+    now = timezone.now()
+    error_text = str(error or '')
+    with transaction.atomic():
+        state = _locked_state(provider, now)
+        state.consecutive_failures += 1
+        state.last_error = error_text[:200]
+        if '429' in error_text or 'RESOURCE_EXHAUSTED' in error_text:
+            state.tokens = 0
+            state.refilled_at = now
+        if state.circuit == 'half_open' or state.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            state.circuit = 'open'
+            state.opened_at = now
+            state.probe_started_at = None
+        state.save()
+
+
+def guarded_call(func, *args, provider='gemini', **kwargs):
+    """
+    Call func(*args, **kwargs) under the guard, recording the outcome.
+
+    Raises:
+        ProviderUnavailable: without calling func, if the guard refuses
+    """
+    acquire(provider)
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        record_failure(provider, e)
+        raise
+    record_success(provider)
+    return result
@@ -0,0 +1,154 @@
+"""
+Parallel, resumable refresh of performance predictions.
+
+Active enrollments are split into shards of whole courses, balanced by
+enrollment count, and each shard is refreshed by update_predictions in a
+worker process with its own database connection. Completed courses are
+recorded in a checkpoint file so that an interrupted run can resume where
+it stopped.
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.db import connections
+from django.db.models import Count
+
+from apps.courses.models import Enrollment
+
+
+def shard_courses(shards, exclude=()):
+    """
+    Split the courses with active enrollments into balanced shards.
+
+    Courses are assigned largest first to the currently lightest shard.
+
+    Returns:
+        List of non-empty lists of course ids
+    """
+    counts = (
+        Enrollment.objects.filter(status='enrolled', is_active=True)
+        .exclude(course_id__in=exclude)
+        .values('course_id')
+        .annotate(n=Count('id'))
+        .order_by('-n', 'course_id')
+    )
+    buckets = [[0, []] for _ in range(max(shards, 1))]
+    for row in counts:
+        bucket = min(buckets, key=lambda b: b[0])
+        bucket[0] += row['n']
+        bucket[1].append(row['course_id'])
+    return [course_ids for _, course_ids in buckets if course_ids]
+
+
+def _load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f).get('completed_courses', []))
+
+
+def _save_checkpoint(path, completed):
+    if not path:
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'completed_courses': sorted(completed)}, f)
+    os.replace(tmp_path, path)
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op when the worker was forked
+    django.setup()
+
+
+def _refresh_shard(course_ids, chunk_size):
+    from .ml_utils import PerformancePredictor, update_predictions
+
+    # Without a model update_predictions writes nothing; that must not
+    # count as a refreshed (checkpointed) shard
+    if not PerformancePredictor().load_model():
+        raise RuntimeError('No trained model is active')
+    return update_predictions(chunk_size=chunk_size, course_ids=course_ids)
+
+
+def refresh_predictions(workers=None, shards=None, checkpoint=None, resume=False,
+                        chunk_size=1000, progress=None):
+    """
+    Refresh predictions for all active enrollments across a process pool.
+
+    Args:
+        workers: Worker processes (default: CPU count); 0 runs shards in this process
+        shards: Number of shards (default: 4 per worker, for load balancing
+            and checkpoint granularity)
+        checkpoint: Path of the checkpoint file; completed courses are recorded there
+        resume: Skip courses already recorded in the checkpoint
+        chunk_size: Rows per upsert statement
+        progress: Callable receiving one progress message per finished shard
+
+    Returns:
+        Dict with rows written, shard and course counts, courses of failed
+        shards, elapsed seconds and rows per second. Failed shards are not
+        checkpointed, so a resumed run retries them.
+
+    Raises:
+        ValueError: if no trained model is active
+    """
+    from .ml_utils import PerformancePredictor
+
+    started = time.perf_counter()
+    if not PerformancePredictor().load_model():
+        raise ValueError('No trained model is active; train one before refreshing predictions')
+    progress = progress or (lambda message: None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    completed = _load_checkpoint(checkpoint) if resume else set()
+    if not resume:
+        _save_checkpoint(checkpoint, completed)
+    if completed:
+        progress(f"Resuming: {len(completed)} courses already refreshed")
+
+    pending = shard_courses(shards or max(workers, 1) * 4, exclude=completed)
+    totals = {
+        'rows': 0,
+        'shards': len(pending),
+        'courses': sum(len(shard) for shard in pending),
+        'failed_courses': [],
+    }
+
+    def record(done, course_ids, run):
+        try:
+            stats = run()
+        except Exception as e:
+            totals['failed_courses'].extend(course_ids)
+            progress(f"[{done}/{len(pending)}] {len(course_ids)} courses failed: {e}")
+            return
+        totals['rows'] += stats['rows']
+        completed.update(course_ids)
+        _save_checkpoint(checkpoint, completed)
+        progress(
+            f"[{done}/{len(pending)}] {len(course_ids)} courses, {stats['rows']} rows "
+            f"({stats['rows_per_second']:.1f} rows/sec)"
+        )
+
+    if workers == 0:
+        for done, course_ids in enumerate(pending, start=1):
+            record(done, course_ids, lambda: _refresh_shard(course_ids, chunk_size))
+    elif pending:
+        # Forked workers must not inherit the parent's open database connections;
+        # each opens its own on first use
+        connections.close_all()
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = {pool.submit(_refresh_shard, course_ids, chunk_size): course_ids for course_ids in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                record(done, futures[future], future.result)
+
+    elapsed = time.perf_counter() - started
+    totals['seconds'] = round(elapsed, 3)
+    totals['rows_per_second'] = round(totals['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+    return totals
@@ -0,0 +1,158 @@
+"""
+Time-budgeted hyperparameter search for the performance predictor.
+
+Candidates are drawn from the estimator's SEARCH_SPACES entry and scored
+with forward-chaining (TimeSeriesSplit) folds over chronologically ordered
+rows, so every fold validates on data newer than it trained on. Fold fits
+run in parallel through joblib in waves sized to the worker pool; the
+wall-clock budget is checked between waves, so a search stops close to the
+budget instead of blocking until every candidate has run.
+
+Two strategies are available:
+
+- random: score n_candidates random configurations on all rows.
+- halving: successive halving; start every candidate on the most recent
+  slice of the data and keep the best 1/factor on a factor-times larger
+  slice each round, ending on all rows.
+"""
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from .estimators import SEARCH_SPACES, estimator_name, make_estimator
+
+
+STRATEGIES = ('random', 'halving')
+
+
+def time_series_folds(n_rows, n_splits=5):
+    """Forward-chaining (train, validation) index pairs over chronologically ordered rows"""
+    n_splits = max(2, min(n_splits, n_rows - 1))
+    return list(TimeSeriesSplit(n_splits=n_splits).split(np.arange(n_rows)))
+
+
+def _fit_and_score(estimator, params, X, y, train, test):
+    """Validation MSE of one candidate on one fold, with its fit time"""
+    started = time.perf_counter()
+    scaler = StandardScaler().fit(X[train])
+    model = make_estimator(estimator).set_params(**params)
+    model.fit(scaler.transform(X[train]), y[train])
+    mse = mean_squared_error(y[test], model.predict(scaler.transform(X[test])))
+    return float(mse), time.perf_counter() - started
+
+
+def hyperparameter_search(X, y, estimator=None, strategy='random', n_candidates=20,
+                          budget_seconds=600, n_splits=5, n_jobs=-1, halving_factor=3,
+                          random_state=42):
+    """
+    Search hyperparameters within a wall-clock budget.
+
+    Args:
+        X: Feature matrix with rows in chronological order
+        y: Targets aligned with X
+        estimator: Estimator name (default: the PERFORMANCE_ESTIMATOR setting)
+        strategy: 'random' or 'halving'
+        n_candidates: Configurations sampled from the search space
+        budget_seconds: Wall-clock budget; no new wave starts once it would be exceeded
+        n_splits: Time-series folds per candidate
+        n_jobs: joblib workers (-1 for all cores)
+        halving_factor: Candidates kept per halving round is 1/halving_factor
+        random_state: Seed for candidate sampling
+
+    Returns:
+        Tuple of (best_params, trace). The trace lists every scored candidate
+        with its round, rows used, fold MSEs and fit time, plus the best
+        score, elapsed time and whether the budget cut the search short.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}'; choose from {', '.join(STRATEGIES)}")
+    estimator = estimator_name(estimator)
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(X) < 3:
+        raise ValueError('Hyperparameter search needs at least 3 rows')
+    # Every fold needs at least one training and one validation row
+    n_splits = max(2, min(n_splits, len(X) - 1))
+    started = time.perf_counter()
+
+    candidates = [
+        {key: value.item() if isinstance(value, np.generic) else value for key, value in params.items()}
+        for params in ParameterSampler(SEARCH_SPACES[estimator], n_candidates, random_state=random_state)
+    ]
+
+    if strategy == 'halving':
+        rounds = max(1, math.ceil(math.log(len(candidates), halving_factor)))
+        min_rows = min(len(X), (n_splits + 1) * 2)
+        schedule = [
+            max(min_rows, min(len(X), len(X) // halving_factor ** (rounds - 1 - r)))
+            for r in range(rounds)
+        ]
+    else:
+        schedule = [len(X)]
+
+    workers = effective_n_jobs(n_jobs)
+    wave_size = max(1, math.ceil(workers / n_splits))
+    trace = {
+        'estimator': estimator,
+        'strategy': strategy,
+        'budget_seconds': budget_seconds,
+        'n_splits': n_splits,
+        'workers': workers,
+        'candidates': [],
+        'stopped_by_budget': False,
+    }
+    last_wave_seconds = 0.0
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for round_number, n_rows in enumerate(schedule):
+            # The most recent rows, so every round validates on the newest data
+            X_round, y_round = X[len(X) - n_rows:], y[len(y) - n_rows:]
+            folds = time_series_folds(n_rows, min(n_splits, n_rows - 1))
+            scored = []
+
+            for start in range(0, len(candidates), wave_size):
+                elapsed = time.perf_counter() - started
+                if trace['candidates'] and elapsed + last_wave_seconds > budget_seconds:
+                    trace['stopped_by_budget'] = True
+                    break
+
+                wave = candidates[start:start + wave_size]
+                wave_started = time.perf_counter()
+                results = parallel(
+                    delayed(_fit_and_score)(estimator, params, X_round, y_round, train, test)
+                    for params in wave
+                    for train, test in folds
+                )
+                last_wave_seconds = time.perf_counter() - wave_started
+
+                for i, params in enumerate(wave):
+                    fold_results = results[i * len(folds):(i + 1) * len(folds)]
+                    entry = {
+                        'params': params,
+                        'round': round_number,
+                        'rows': n_rows,
+                        'fold_mse': [round(mse, 4) for mse, _ in fold_results],
+                        'mean_mse': round(float(np.mean([mse for mse, _ in fold_results])), 4),
+                        'fit_seconds': round(sum(seconds for _, seconds in fold_results), 3),
+                    }
+                    trace['candidates'].append(entry)
+                    scored.append(entry)
+
+            if scored:
+                scored.sort(key=lambda entry: entry['mean_mse'])
+                keep = max(1, math.ceil(len(scored) / halving_factor))
+                candidates = [entry['params'] for entry in scored[:keep]]
+            if trace['stopped_by_budget']:
+                break
+
+    # Prefer candidates scored on the most data, then the lowest error
+    best = min(trace['candidates'], key=lambda entry: (-entry['rows'], entry['mean_mse']))
+    trace['best_params'] = best['params']
+    trace['best_mse'] = best['mean_mse']
+    trace['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return best['params'], trace
@@ -0,0 +1,127 @@
+"""
+Grade ingestion service shared by the teacher grade-writing endpoints
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from apps.students.models import StudentProfile
+from .models import Grade, GradeSummary
+from .summary import invalidate_performance_summary
+
+
+class GradeIngestionService:
+    """Validate and upsert a batch of grades for one assessment"""
+
+    def __init__(self, assessment, graded_by):
+        self.assessment = assessment
+        self.graded_by = graded_by
+
+    @staticmethod
+    def _parse_student_id(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _parse_score(value):
+        try:
+            score = Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            return None
+        return score if score.is_finite() else None
+
+    def _validate(self, rows, validate_scores):
+        """Check the whole batch against one roster query; the last row per student wins"""
+        student_ids = {self._parse_student_id(row.get('student_id')) for row in rows}
+        student_ids.discard(None)
+        roster = StudentProfile.objects.select_related('user').in_bulk(student_ids)
+
+        total_marks = Decimal(str(self.assessment.total_marks))
+        accepted = {}
+        errors = []
+        for row in rows:
+            raw_id = row.get('student_id')
+            student = roster.get(self._parse_student_id(raw_id))
+            if student is None:
+                errors.append(f"Student with ID {raw_id} not found")
+                continue
+
+            score = None if row.get('score') is None else self._parse_score(row['score'])
+            if score is None or (
+                validate_scores and (score < 0 or score > total_marks)
+            ):
+                errors.append(f"Invalid score for student {student.user.get_full_name()}")
+                continue
+
+            accepted[student.id] = (student, score, row.get('feedback') or '')
+        return accepted, errors
+
+    def ingest(self, rows, publish=False, validate_scores=True):
+        """
+        Upsert grades for the assessment in a single statement.
+
+        Args:
+            rows: Iterable of dicts with student_id, score and optional feedback
+            publish: Publish newly created grades (existing grades keep their flag)
+            validate_scores: Reject scores outside 0..total_marks
+
+        Returns:
+            Dict with created and updated counts and per-row error messages
+        """
+        accepted, errors = self._validate(list(rows), validate_scores)
+        if not accepted:
+            return {'created': 0, 'updated': 0, 'errors': errors}
+
+        grades = [
+            Grade(
+                student=student,
+                assessment=self.assessment,
+                marks_obtained=score,
+                feedback=feedback,
+                graded_by=self.graded_by,
+                is_published=publish,
+            )
+            for student, score, feedback in accepted.values()
+        ]
+
+        with transaction.atomic():
+            existing = set(
+                Grade.objects.filter(
+                    assessment=self.assessment, student_id__in=accepted
+                ).values_list('student_id', flat=True)
+            )
+            # INSERT ... ON CONFLICT (student_id, assessment_id) DO UPDATE
+            Grade.objects.bulk_create(
+                grades,
+                update_conflicts=True,
+                unique_fields=['student', 'assessment'],
+                update_fields=['marks_obtained', 'feedback', 'graded_by'],
+            )
+            # bulk_create skips the Grade signals, so refresh the affected summaries here
+            GradeSummary.rebuild(course=self.assessment.course_id, students=list(accepted))
+            invalidate_performance_summary(*accepted)
+
+            created = [grade for grade in grades if grade.student_id not in existing]
+            if publish and created:
+                self._notify_created(created)
+
+        return {
+            'created': len(created),
+            'updated': len(grades) - len(created),
+            'errors': errors,
+        }
+
+    def _notify_created(self, created):
+        from apps.notifications.services import NotificationService
+
+        grade_ids = dict(
+            Grade.objects.filter(
+                assessment=self.assessment,
+                student_id__in=[grade.student_id for grade in created],
+            ).values_list('student_id', 'id')
+        )
+        for grade in created:
+            grade.id = grade_ids.get(grade.student_id)
+        NotificationService.bulk_notify_grades_posted(created, self.assessment)
@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.courses.models import Enrollment
+from .models import Assessment, Grade, GradeSummary, PerformancePrediction, StudyGoal
+from .summary import invalidate_performance_summary
+
+
+def _grade_contribution(student_id, assessment, marks_obtained, is_published):
+    """GradeSummary field deltas contributed by a single grade"""
+    marks = Decimal(str(marks_obtained))
+    total_marks = Decimal(str(assessment.total_marks))
+    delta = {
+        'grade_count': 1,
+        'marks_sum': marks,
+        'published_count': 0,
+        'published_marks_sum': Decimal('0'),
+        'percentage_sum': Decimal('0'),
+        'weighted_score': Decimal('0'),
+    }
+    if is_published:
+        percentage = marks * 100 / total_marks if total_marks > 0 else Decimal('0')
+        delta.update({
+            'published_count': 1,
+            'published_marks_sum': marks,
+            'percentage_sum': percentage,
+            'weighted_score': percentage * Decimal(str(assessment.weight_percentage)) / 100,
+        })
+    return (student_id, assessment.course_id), delta
+
+
+def _apply_delta(key, delta, sign=1, graded_at=None):
+    student_id, course_id = key
+    summaries = GradeSummary.objects.filter(student_id=student_id, course_id=course_id)
+    if sign > 0:
+        GradeSummary.objects.get_or_create(student_id=student_id, course_id=course_id)
+    updates = {
+        field: F(field) + sign * value
+        for field, value in delta.items()
+        if value
+    }
+    if graded_at is not None:
+        graded_at = Value(graded_at, output_field=DateTimeField())
+        updates['last_graded_at'] = Greatest(Coalesce('last_graded_at', graded_at), graded_at)
+    updates['last_updated'] = timezone.now()
+    # Removals only touch an existing row so cascading deletes never recreate one
+    summaries.update(**updates)
+
+
+@receiver(pre_save, sender=Grade)
+def remember_previous_grade(sender, instance, raw=False, **kwargs):
+    """Capture the stored grade so post_save can apply the difference"""
+    instance._summary_previous = None
+    if raw or not instance.pk:
+        return
+    previous = Grade.objects.filter(pk=instance.pk).select_related('assessment').first()
+    if previous is not None:
+        instance._summary_previous = _grade_contribution(
+            previous.student_id, previous.assessment, previous.marks_obtained, previous.is_published
+        )
+
+
+@receiver(post_save, sender=Grade)
+def update_grade_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    """Apply a grade create/update to the student's GradeSummary by delta"""
+    if raw:
+        return
+    key, delta = _grade_contribution(
+        instance.student_id, instance.assessment, instance.marks_obtained, instance.is_published
+    )
+    previous = getattr(instance, '_summary_previous', None)
+    if previous is not None:
+        previous_key, previous_delta = previous
+        if previous_key == key:
+            delta = {field: value - previous_delta[field] for field, value in delta.items()}
+        else:
+            _apply_delta(previous_key, previous_delta, sign=-1)
+    _apply_delta(key, delta, graded_at=instance.graded_at if created else None)
+
+
+@receiver(post_delete, sender=Grade)
+def update_grade_summary_on_delete(sender, instance, **kwargs):
+    """Remove a deleted grade's contribution from its GradeSummary"""
+    try:
+        assessment = instance.assessment
+    except Assessment.DoesNotExist:
+        return
+    key, delta = _grade_contribution(
+        instance.student_id, assessment, instance.marks_obtained, instance.is_published
+    )
+    _apply_delta(key, delta, sign=-1)
+
+
+@receiver(pre_save, sender=Assessment)
+def remember_previous_assessment_marks(sender, instance, raw=False, **kwargs):
+    instance._summary_previous = None
+    if raw or not instance.pk:
+        return
+    instance._summary_previous = (
+        Assessment.objects.filter(pk=instance.pk)
+        .values_list('course_id', 'total_marks', 'weight_percentage')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Assessment)
+def rebuild_summaries_on_assessment_change(sender, instance, created, raw=False, **kwargs):
+    """Percentages depend on the assessment, so rebuild its course when marks or weight change"""
+    previous = getattr(instance, '_summary_previous', None)
+    if raw or created or previous is None:
+        return
+    course_id, total_marks, weight_percentage = previous
+    if (
+        course_id != instance.course_id
+        or Decimal(str(total_marks)) != Decimal(str(instance.total_marks))
+        or Decimal(str(weight_percentage)) != Decimal(str(instance.weight_percentage))
+    ):
+        GradeSummary.rebuild(course=instance.course)
+        if course_id != instance.course_id:
+            GradeSummary.rebuild(course=course_id)
+        invalidate_performance_summary(*instance.grades.values_list('student_id', flat=True))
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=StudyGoal)
+@receiver(post_delete, sender=StudyGoal)
+@receiver(post_save, sender=PerformancePrediction)
+@receiver(post_delete, sender=PerformancePrediction)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_student_summary(sender, instance, **kwargs):
+    """Any change to a student's rows makes their cached performance summary stale"""
+    invalidate_performance_summary(instance.student_id)
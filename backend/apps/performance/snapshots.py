@@ -0,0 +1,189 @@
+"""
+Point-in-time feature snapshots.
+
+capture_snapshots() stores the model features of every active enrollment
+as they stand at one moment, one FeatureSnapshot row per enrollment. Run
+periodically (the snapshot_features command), the table becomes a history
+that serves two purposes:
+
+- Training: snapshot_training_frame() pairs each finished enrollment with
+  the newest snapshot taken before it finished, so features never include
+  grades posted after the fact, and reads everything in one scan instead of
+  recomputing features from live tables.
+- Serving: when FEATURE_SNAPSHOT_MAX_AGE is set, predictions reuse the
+  latest snapshot of an enrollment while it is younger than that many
+  seconds and newer than the enrollment's last grade change, skipping live
+  feature extraction. Other inputs (GPA, attendance) may lag by up to the
+  max age, which is why reuse is off by default.
+"""
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.courses.models import Enrollment
+from .models import FeatureSnapshot, GradeSummary
+
+
+DEFAULT_SNAPSHOT_MAX_AGE = 0
+
+
+def snapshot_max_age():
+    """How old a snapshot may be and still stand in for live features (0 disables reuse)"""
+    return timedelta(seconds=getattr(settings, 'FEATURE_SNAPSHOT_MAX_AGE', DEFAULT_SNAPSHOT_MAX_AGE))
+
+
+def capture_snapshots(captured_at=None, course_ids=None, chunk_size=1000):
+    """
+    Snapshot the features of all active enrollments.
+
+    Args:
+        captured_at: Snapshot time (default: now)
+        course_ids: Restrict to these courses
+        chunk_size: Rows per INSERT statement
+
+    Returns:
+        Number of snapshots written
+    """
+    from .ml_utils import PerformancePredictor
+
+    captured_at = captured_at or timezone.now()
+    enrollments = Enrollment.objects.filter(status='enrolled', is_active=True)
+    if course_ids is not None:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+
+    features = PerformancePredictor().extract_features_batch(enrollments)
+    snapshots = [
+        FeatureSnapshot(student_id=student_id, course_id=course_id, captured_at=captured_at, **record)
+        for (student_id, course_id), record in zip(features.index, features.to_dict('records'))
+    ]
+    FeatureSnapshot.objects.bulk_create(snapshots, batch_size=chunk_size, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def _fresh_snapshots(max_age, **filters):
+    """Snapshots younger than max_age and taken after their enrollment's grades last changed"""
+    regraded = GradeSummary.objects.filter(
+        student_id=OuterRef('student_id'),
+        course_id=OuterRef('course_id'),
+        last_updated__gte=OuterRef('captured_at'),
+    )
+    return FeatureSnapshot.objects.filter(captured_at__gte=timezone.now() - max_age, **filters).exclude(Exists(regraded))
+
+
+def _snapshot_frame(snapshots):
+    from .ml_utils import FEATURE_COLUMNS
+
+    return pd.DataFrame.from_records(
+        snapshots.values_list('student_id', 'course_id', 'captured_at', *FEATURE_COLUMNS).iterator(chunk_size=5000),
+        columns=['student_id', 'course_id', 'captured_at'] + FEATURE_COLUMNS,
+    )
+
+
+def snapshot_training_frame(lead_days=0):
+    """
+    Training frame built from snapshots, without leakage from later data.
+
+    Each finished enrollment with a final grade gets the newest snapshot
+    captured at least lead_days before its completion (an as-of join), i.e.
+    what the model would have seen when predicting at that point. Enrollments
+    without a completion date or such a snapshot are left out.
+
+    Returns:
+        DataFrame of FEATURE_COLUMNS and final_grade, oldest enrollment first,
+        like prepare_training_data()
+    """
+    from .ml_utils import FEATURE_COLUMNS
+
+    finished = Enrollment.objects.filter(
+        status__in=['completed', 'failed'], final_grade__isnull=False, completion_date__isnull=False
+    )
+    enrollments = pd.DataFrame.from_records(
+        finished.order_by('enrollment_date', 'id')
+        .values_list('student_id', 'course_id', 'completion_date', 'final_grade'),
+        columns=['student_id', 'course_id', 'completion_date', 'final_grade'],
+    )
+    # Only snapshots the join can pick: of a finished enrollment, taken by its cutoff
+    usable = finished.filter(
+        student_id=OuterRef('student_id'),
+        course_id=OuterRef('course_id'),
+        completion_date__gte=OuterRef('captured_at') + timedelta(days=lead_days),
+    )
+    snapshots = _snapshot_frame(FeatureSnapshot.objects.filter(Exists(usable)).order_by('captured_at'))
+    if enrollments.empty or snapshots.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS + ['final_grade'])
+
+    completed_at = pd.to_datetime(enrollments['completion_date'], utc=True)
+    enrollments['cutoff'] = completed_at - pd.Timedelta(days=lead_days)
+    enrollments['order'] = range(len(enrollments))
+    snapshots['captured_at'] = pd.to_datetime(snapshots['captured_at'], utc=True)
+
+    joined = pd.merge_asof(
+        enrollments.sort_values('cutoff'),
+        snapshots,
+        left_on='cutoff',
+        right_on='captured_at',
+        by=['student_id', 'course_id'],
+        direction='backward',
+    )
+    joined = joined[joined['captured_at'].notna()].sort_values('order')
+
+    df = joined[FEATURE_COLUMNS].astype({column: snapshots[column].dtype for column in FEATURE_COLUMNS})
+    df['final_grade'] = joined['final_grade'].astype(float)
+    return df.reset_index(drop=True)
+
+
+def snapshot_features(student_id, course_id, max_age=None):
+    """Latest fresh snapshot of one enrollment as a feature dict, or None"""
+    from .ml_utils import FEATURE_COLUMNS
+
+    max_age = snapshot_max_age() if max_age is None else max_age
+    if not max_age:
+        return None
+    return (
+        _fresh_snapshots(max_age, student_id=student_id, course_id=course_id)
+        .order_by('-captured_at')
+        .values(*FEATURE_COLUMNS)
+        .first()
+    )
+
+
+def enrollment_features(predictor, enrollments, max_age=None):
+    """
+    Features for many enrollments, from fresh snapshots where available.
+
+    Enrollments without a fresh snapshot (see _fresh_snapshots) are
+    extracted live with predictor.extract_features_batch.
+
+    Returns:
+        DataFrame indexed by (student_id, course_id), as extract_features_batch
+    """
+    from .ml_utils import FEATURE_COLUMNS
+
+    max_age = snapshot_max_age() if max_age is None else max_age
+    if not max_age:
+        return predictor.extract_features_batch(enrollments)
+
+    snapshots = _snapshot_frame(
+        _fresh_snapshots(
+            max_age,
+            student_id__in=enrollments.values('student_id'),
+            course_id__in=enrollments.values('course_id'),
+        ).order_by('captured_at')
+    )
+    pairs = pd.DataFrame.from_records(
+        enrollments.values_list('id', 'student_id', 'course_id'), columns=['id', 'student_id', 'course_id']
+    )
+    fresh = pairs.merge(
+        snapshots.drop_duplicates(['student_id', 'course_id'], keep='last'),
+        on=['student_id', 'course_id'],
+    ).set_index(['student_id', 'course_id'])
+
+    live_enrollments = enrollments.exclude(id__in=fresh['id'].tolist())
+    live = predictor.extract_features_batch(live_enrollments) if len(fresh) < len(pairs) else None
+    features = fresh[FEATURE_COLUMNS]
+    if live is not None and not live.empty:
+        features = pd.concat([features, live])
+    return features
@@ -0,0 +1,121 @@
+"""
+Cached student performance summary.
+
+Each student's summary document is stored under a key that embeds a
+per-student version number. Signals bump the version whenever one of the
+student's grades, goals, predictions or enrollments changes, so stale
+documents are never read again and simply expire.
+
+The version lives in the database (PerformanceSummaryVersion), not the
+cache: without Redis every gunicorn worker has its own LocMemCache, and a
+bump made by one worker must still reach the others.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+
+from apps.courses.models import Enrollment
+from apps.students.models import StudentProfile
+from .models import Grade, GradeSummary, PerformancePrediction, PerformanceSummaryVersion, StudyGoal
+
+
+SUMMARY_CACHE_TIMEOUT = 60 * 10
+_DOCUMENT_KEY = 'performance_summary:{}:{}'
+
+
+def _new_version():
+    # Time-based so a bumped version never repeats one an older cached
+    # document was stored under
+    return time.time_ns()
+
+
+def _summary_version(student_id):
+    version = PerformanceSummaryVersion.objects.filter(student_id=student_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def invalidate_performance_summary(*student_ids):
+    """
+    Bump the summary version of the given students.
+
+    The bump is part of the caller's transaction, so other workers see it
+    exactly when they see the change that caused it.
+    """
+    if student_ids:
+        version = _new_version()
+        PerformanceSummaryVersion.objects.bulk_create(
+            [PerformanceSummaryVersion(student_id=student_id, version=version) for student_id in set(student_ids)],
+            update_conflicts=True,
+            unique_fields=['student_id'],
+            update_fields=['version'],
+        )
+
+
+def _student_scalar(queryset, aggregate):
+    """Per-student aggregate of a related table as a scalar subquery"""
+    return Subquery(
+        queryset.filter(student=OuterRef('pk'))
+        .order_by()
+        .values('student')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def build_performance_summary(student_profile):
+    """Compute the summary document from the database"""
+    totals = StudentProfile.objects.filter(pk=student_profile.pk).annotate(
+        completed_assessments=_student_scalar(GradeSummary.objects, Sum('published_count')),
+        published_marks=_student_scalar(GradeSummary.objects, Sum('published_marks_sum')),
+        at_risk_courses=_student_scalar(PerformancePrediction.objects, Count('pk', filter=Q(at_risk=True))),
+        total_courses=_student_scalar(Enrollment.objects, Count('pk', filter=Q(is_active=True))),
+    ).values('completed_assessments', 'published_marks', 'at_risk_courses', 'total_courses').get()
+
+    completed_assessments = totals['completed_assessments'] or 0
+    average_grade = totals['published_marks'] / completed_assessments if completed_assessments else 0
+
+    recent_grades = (
+        Grade.objects.with_percentage()
+        .filter(student=student_profile, is_published=True)
+        .select_related('assessment__course')
+        .order_by('-graded_at')[:10]
+    )
+    active_goals = StudyGoal.objects.filter(student=student_profile, status='active')[:5]
+
+    return {
+        'average_grade': float(average_grade),
+        'total_courses': totals['total_courses'] or 0,
+        'completed_assessments': completed_assessments,
+        'at_risk_courses': totals['at_risk_courses'] or 0,
+        'recent_grades': [
+            {
+                'assessment': grade.assessment.title,
+                'course': grade.assessment.course.name,
+                'marks_obtained': float(grade.marks_obtained),
+                'total_marks': float(grade.assessment.total_marks),
+                'percentage': grade.grade_percentage,
+                'graded_at': grade.graded_at.isoformat()
+            }
+            for grade in recent_grades
+        ],
+        'active_goals': [
+            {
+                'title': goal.title,
+                'description': goal.description,
+                'target_date': goal.target_date.isoformat(),
+                'progress': float(goal.progress_percentage)
+            }
+            for goal in active_goals
+        ]
+    }
+
+
+def cached_performance_summary(student_profile):
+    """Summary document for a student, built on a cache miss"""
+    key = _DOCUMENT_KEY.format(student_profile.pk, _summary_version(student_profile.pk))
+    data = cache.get(key)
+    if data is None:
+        data = build_performance_summary(student_profile)
+        cache.set(key, data, timeout=SUMMARY_CACHE_TIMEOUT)
+    return data
@@ -1,14 +1,169 @@
 # Create your tests here.
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models import F
 from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
 from apps.students.models import StudentProfile
-from apps.courses.models import Course
-from .models import Assessment, Grade, StudyGoal
+from apps.courses.models import Course, Enrollment
+from .models import Assessment, Grade, GradeSummary, PerformancePrediction, StudyGoal
 from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+import json
+import os
+
+import numpy as np
 
 User = get_user_model()
 
 
+class RosterMixin:
+    """Builders for the users, courses and grades the performance tests share"""
+
+    def create_teacher(self, **fields):
+        return User.objects.create_user(
+            **{'username': 'teacher1', 'email': 'teacher@example.com', 'role': 'teacher', **fields}
+        )
+
+    def create_student(self, i, **fields):
+        """Profile of student{i}, created by the users app with its account"""
+        return User.objects.create_user(
+            username=f'student{i}', email=f'student{i}@example.com', role='student', **fields
+        ).student_profile
+
+    def create_course(self, instructor, **fields):
+        return Course.objects.create(**{
+            'code': 'CS101',
+            'name': 'Introduction to Computer Science',
+            'description': 'Basic concepts',
+            'credits': 3,
+            'difficulty_level': 'beginner',
+            'instructor': instructor,
+            'start_date': date.today(),
+            'end_date': date.today(),
+            **fields,
+        })
+
+    def create_assessment(self, course, **fields):
+        return Assessment.objects.create(**{
+            'course': course,
+            'title': 'Quiz 1',
+            'assessment_type': 'quiz',
+            'total_marks': 50,
+            'weight_percentage': 10,
+            'due_date': datetime.now(timezone.utc),
+            **fields,
+        })
+
+    def authenticated_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def create_feature_roster(self):
+        """
+        Three courses and four students with mixed grades and attendance;
+        students[3] has an invalid year_of_study, so its features fail
+        """
+        from apps.attendance.models import AttendanceRecord
+
+        instructor = self.create_teacher()
+        self.courses = [
+            self.create_course(
+                instructor, code=f'CS10{i}', name=f'Course {i}', credits=3 + i, difficulty_level=level
+            )
+            for i, level in enumerate(['beginner', 'advanced', 'intermediate'])
+        ]
+        self.students = [self.create_student(i) for i in range(4)]
+        StudentProfile.objects.filter(pk=self.students[0].pk).update(year_of_study='3', gpa='3.45')
+        StudentProfile.objects.filter(pk=self.students[1].pk).update(year_of_study='2', gpa=None)
+        StudentProfile.objects.filter(pk=self.students[3].pk).update(year_of_study='x')
+
+        for student in self.students:
+            for course in self.courses[:2]:
+                Enrollment.objects.create(student=student, course=course)
+        Enrollment.objects.create(student=self.students[0], course=self.courses[2])
+        Enrollment.objects.filter(course=self.courses[1]).update(
+            enrollment_date=datetime(2024, 1, 15, 23, 30, tzinfo=timezone.utc)
+        )
+
+        for c, course in enumerate(self.courses):
+            assessments = [
+                self.create_assessment(course, title=f'Quiz {a}', total_marks=30 + 10 * a)
+                for a in range(3)
+            ]
+            for s, student in enumerate(self.students[:3]):
+                for a, assessment in enumerate(assessments[: 1 + (s + c) % 3]):
+                    Grade.objects.create(
+                        student=student,
+                        assessment=assessment,
+                        marks_obtained=Decimal(f'{7 + s * 3 + a + c}.33'),
+                        is_published=(a + s) % 2 == 0
+                    )
+
+        for day, status_value in enumerate(['present', 'absent', 'present', 'late']):
+            AttendanceRecord.objects.create(
+                student=self.students[0],
+                course=self.courses[0],
+                date=date(2026, 1, 5 + day),
+                status=status_value
+            )
+        AttendanceRecord.objects.create(
+            student=self.students[1],
+            course=self.courses[1],
+            date=date(2026, 1, 5),
+            status='absent'
+        )
+
+    def save_roster_model(self):
+        """Train and save a small model on the feature roster, in a temporary BASE_DIR"""
+        import tempfile
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        from .ml_utils import PerformancePredictor
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(BASE_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        predictor = PerformancePredictor()
+        X = predictor.extract_features_batch(Enrollment.objects.order_by('id'))
+        rng = np.random.default_rng(0)
+        predictor.scaler = StandardScaler().fit(X)
+        predictor.model = RandomForestRegressor(n_estimators=5, random_state=0).fit(
+            predictor.scaler.transform(X), rng.uniform(40, 95, len(X))
+        )
+        self.version = predictor.save_model()
+
+    def fake_gemini_client(self, flaky_id, broken_id):
+        """
+        Gemini stand-in recording each request's student IDs in self.calls;
+        the first request naming flaky_id fails, and any naming broken_id
+        gets unparseable JSON
+        """
+        import re
+        from types import SimpleNamespace
+
+        def generate_content(model, contents):
+            ids = re.findall(r'^Student ID: (.+)$', contents, re.M)
+            self.calls.append(ids)
+            if broken_id in ids:
+                return SimpleNamespace(text='[{"student_id": ')
+            if flaky_id in ids and self.calls.count(ids) == 1:
+                raise RuntimeError('503 UNAVAILABLE')
+            return SimpleNamespace(text=json.dumps([
+                {'student_id': i, 'predicted_grade': 81, 'risk_level': 'low', 'summary': 'ok'} for i in ids
+            ]))
+
+        return SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+
 class AssessmentModelTest(TestCase):
     def setUp(self):
         self.instructor = User.objects.create_user(
@@ -109,3 +264,1539 @@ class GradeModelTest(TestCase):
             )
             self.assertEqual(grade.letter_grade, expected_letter)
             grade.delete()  # Clean up for next test
+
+
+class TeacherDashboardQueryTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher()
+        self.students = [self.create_student(i) for i in range(3)]
+        self.client = self.authenticated_client(self.instructor)
+        self.course_number = 0
+
+    def _add_course(self, assessments):
+        self.course_number += 1
+        course = self.create_course(
+            self.instructor,
+            code=f'CS{self.course_number:03d}',
+            name=f'Course {self.course_number}',
+            description='Course',
+        )
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=course)
+        for i in range(assessments):
+            assessment = self.create_assessment(course, title=f'Quiz {i}')
+            # Grade only the first student so the others stay pending
+            Grade.objects.create(
+                student=self.students[0],
+                assessment=assessment,
+                marks_obtained=40
+            )
+        return course
+
+    def _fetch(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/performance/teacher/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_dashboard_figures(self):
+        self._add_course(assessments=4)
+        data, _ = self._fetch()
+
+        course = data['courses'][0]
+        self.assertEqual(course['student_count'], 3)
+        self.assertEqual(course['assessment_count'], 4)
+        self.assertEqual(course['total_grades'], 4)
+        self.assertEqual(course['pending_grades'], 8)
+        self.assertEqual(float(course['average_performance']), 40.0)
+        self.assertEqual(len(course['recent_assessments']), 3)
+        self.assertEqual(data['summary']['pending_grades'], 8)
+
+    def test_query_count_constant_as_courses_and_assessments_grow(self):
+        self._add_course(assessments=1)
+        _, small_count = self._fetch()
+
+        for _ in range(4):
+            self._add_course(assessments=6)
+        data, large_count = self._fetch()
+
+        self.assertEqual(len(data['courses']), 5)
+        self.assertEqual(small_count, large_count)
+
+
+class CoursePerformanceGradebookTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher()
+        self.course = self.create_course(self.instructor)
+        self.students = []
+        for i in range(2):
+            student = self.create_student(i, first_name='Student', last_name=str(i))
+            Enrollment.objects.create(student=student, course=self.course)
+            self.students.append(student)
+        self.quiz = self.create_assessment(self.course)
+        self.exam = self.create_assessment(
+            self.course, title='Midterm', assessment_type='midterm', total_marks=100, weight_percentage=30
+        )
+        Grade.objects.create(student=self.students[0], assessment=self.quiz, marks_obtained=45)
+        Grade.objects.create(student=self.students[1], assessment=self.quiz, marks_obtained=20)
+        Grade.objects.create(student=self.students[0], assessment=self.exam, marks_obtained=70)
+        self.client = self.authenticated_client(self.instructor)
+
+    def test_course_performance_output(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/performance/course/{self.course.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), 5)
+
+        students = {s['id']: s for s in response.data['students']}
+        self.assertEqual(students[self.students[0].id]['total_assessments'], 2)
+        self.assertEqual(students[self.students[0].id]['average_score'], 57.5)
+        self.assertEqual(students[self.students[1].id]['average_score'], 20.0)
+
+        quiz = next(a for a in response.data['assessments'] if a['id'] == self.quiz.id)
+        self.assertEqual(quiz['graded_count'], 2)
+        self.assertEqual(quiz['total_students'], 2)
+        self.assertEqual(quiz['average_score'], 32.5)
+        self.assertEqual(quiz['average_percentage'], 65.0)
+        self.assertEqual([p['grade'] for p in quiz['performance']], ['A+', 'F'])
+        self.assertEqual(quiz['performance'][0]['percentage'], 90.0)
+
+    def test_assessment_type_filter(self):
+        response = self.client.get(
+            f'/api/performance/course/{self.course.id}/', {'assessment_type': 'midterm'}
+        )
+        self.assertEqual([a['id'] for a in response.data['assessments']], [self.exam.id])
+        # Student totals still cover every assessment in the course
+        self.assertEqual(response.data['students'][0]['total_assessments'], 2)
+
+
+class GradeSummaryTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher()
+        self.student = self.create_student(1)
+        self.course = self.create_course(self.instructor)
+        self.quiz = self.create_assessment(self.course)
+        self.exam = self.create_assessment(
+            self.course, title='Final', assessment_type='final', total_marks=80, weight_percentage=40
+        )
+
+    def _summary_values(self):
+        summary = GradeSummary.objects.get(student=self.student, course=self.course)
+        return (
+            summary.grade_count,
+            summary.marks_sum,
+            summary.published_count,
+            summary.published_marks_sum,
+            round(summary.percentage_sum, 2),
+            round(summary.weighted_score, 2),
+        )
+
+    def _assert_matches_rebuild(self):
+        incremental = self._summary_values()
+        GradeSummary.rebuild(course=self.course)
+        self.assertEqual(incremental, self._summary_values())
+
+    def test_summary_tracks_grade_writes(self):
+        quiz_grade = Grade.objects.create(
+            student=self.student, assessment=self.quiz, marks_obtained=40, is_published=True
+        )
+        Grade.objects.create(
+            student=self.student, assessment=self.exam, marks_obtained=60
+        )
+        summary = GradeSummary.objects.get(student=self.student, course=self.course)
+        self.assertEqual(summary.grade_count, 2)
+        self.assertEqual(summary.published_count, 1)
+        self.assertEqual(summary.average_percentage, 80)
+        self.assertEqual(summary.weighted_score, 8)
+        self.assertIsNotNone(summary.last_graded_at)
+        self._assert_matches_rebuild()
+
+        quiz_grade.marks_obtained = 25
+        quiz_grade.save()
+        self._assert_matches_rebuild()
+
+        quiz_grade.delete()
+        self._assert_matches_rebuild()
+        self.assertEqual(self._summary_values()[:3], (1, 60, 0))
+
+    def test_assessment_total_change_rebuilds_course(self):
+        Grade.objects.create(
+            student=self.student, assessment=self.quiz, marks_obtained=40, is_published=True
+        )
+        self.quiz.total_marks = 40
+        self.quiz.save()
+
+        summary = GradeSummary.objects.get(student=self.student, course=self.course)
+        self.assertEqual(summary.average_percentage, 100)
+
+    def test_rebuild_command(self):
+        Grade.objects.create(
+            student=self.student, assessment=self.quiz, marks_obtained=40, is_published=True
+        )
+        GradeSummary.objects.all().delete()
+
+        call_command('rebuild_grade_summaries', stdout=StringIO())
+
+        summary = GradeSummary.objects.get(student=self.student, course=self.course)
+        self.assertEqual(summary.published_count, 1)
+        self.assertEqual(summary.average_marks, 40)
+
+
+class GradeIngestionTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher()
+        self.course = self.create_course(self.instructor)
+        self.students = [self.create_student(i) for i in range(6)]
+        self.assessment = self.create_assessment(self.course)
+        self.client = self.authenticated_client(self.instructor)
+
+    def _record(self, grades):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/performance/teacher/record-grades/', {
+                'assessment_id': self.assessment.id,
+                'grades': grades
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_record_student_grades_upserts_and_reports_errors(self):
+        Grade.objects.create(student=self.students[0], assessment=self.assessment, marks_obtained=10)
+
+        data, _ = self._record([
+            {'student_id': self.students[0].id, 'score': 30, 'feedback': 'Better'},
+            {'student_id': self.students[1].id, 'score': 45},
+            {'student_id': self.students[2].id, 'score': 80},
+            {'student_id': 999999, 'score': 20},
+        ])
+
+        self.assertEqual(data['created_grades'], 1)
+        self.assertEqual(data['updated_grades'], 1)
+        self.assertEqual(data['total_processed'], 2)
+        self.assertEqual(len(data['errors']), 2)
+        self.assertIn('Student with ID 999999 not found', data['errors'])
+
+        regraded = Grade.objects.get(student=self.students[0], assessment=self.assessment)
+        self.assertEqual(regraded.marks_obtained, 30)
+        self.assertEqual(regraded.feedback, 'Better')
+        summary = GradeSummary.objects.get(student=self.students[1], course=self.course)
+        self.assertEqual(summary.grade_count, 1)
+        self.assertEqual(summary.marks_sum, 45)
+
+    def test_query_count_independent_of_batch_size(self):
+        _, small = self._record([{'student_id': self.students[0].id, 'score': 10}])
+        _, large = self._record([
+            {'student_id': student.id, 'score': 20} for student in self.students
+        ])
+        self.assertEqual(small, large)
+
+    def test_record_performance_publishes_and_notifies_in_bulk(self):
+        from apps.notifications.models import Notification
+
+        response = self.client.post('/api/performance/teacher/record/', {
+            'course_id': self.course.id,
+            'assessment_name': 'Lab 1',
+            'total_marks': 20,
+            'performance': [
+                {'student_id': student.id, 'marks_obtained': 15, 'comments': 'Good'}
+                for student in self.students
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created_grades'], 6)
+        self.assertEqual(Grade.objects.filter(assessment__title='Lab 1', is_published=True).count(), 6)
+        notifications = Notification.objects.filter(notification_type='grade')
+        self.assertEqual(notifications.count(), 6)
+        self.assertEqual(notifications.first().data['percentage'], 75.0)
+
+
+class PerformanceRecordsExportTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher(first_name='Grace', last_name='Otieno')
+        self.course = self.create_course(self.instructor)
+        self.assessment = self.create_assessment(self.course, total_marks=40)
+        for i in range(3):
+            student = self.create_student(i, first_name='Student', last_name=str(i))
+            Grade.objects.create(
+                student=student,
+                assessment=self.assessment,
+                marks_obtained=10 * (i + 1),
+                feedback=f'Note {i}',
+                graded_by=self.instructor
+            )
+        self.client = self.authenticated_client(self.instructor)
+
+    def test_csv_export_streams_rows(self):
+        response = self.client.get('/api/performance/teacher/records/', {'export': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Date,Course,Assessment'))
+        self.assertIn('Introduction to Computer Science,Quiz 1,Student 2,', lines[1])
+        self.assertTrue(lines[1].endswith(',30.00,40.00,75.0%,Note 2,Grace Otieno'))
+
+    def test_csv_export_applies_filters(self):
+        response = self.client.get('/api/performance/teacher/records/', {
+            'export': 'csv',
+            'min_score': 15,
+            'date_from': date.today().isoformat(),
+        })
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_summary_percentages_use_each_assessment_maximum(self):
+        final = Assessment.objects.create(
+            course=self.course,
+            title='Final',
+            assessment_type='exam',
+            total_marks=100,
+            weight_percentage=50,
+            due_date=datetime.now(timezone.utc)
+        )
+        Grade.objects.create(
+            student=StudentProfile.objects.get(user__username='student0'),
+            assessment=final,
+            marks_obtained=100
+        )
+
+        summary = self.client.get('/api/performance/teacher/records/').data['summary']
+
+        # Percentages are 25, 50, 75 (out of 40) and 100 (out of 100)
+        self.assertEqual(summary['total_grades'], 4)
+        self.assertEqual(summary['average_percentage'], 62.5)
+        self.assertEqual(summary['median_percentage'], 62.5)
+        self.assertEqual(summary['p10_percentage'], 32.5)
+        self.assertEqual(summary['p90_percentage'], 92.5)
+        self.assertEqual(summary['stddev_percentage'], 28.0)
+
+
+    def test_filter_and_distribution_by_letter_grade(self):
+        # Percentages are 25, 50 and 75
+        response = self.client.get('/api/performance/teacher/records/', {'letter_grade': 'B+'})
+
+        self.assertEqual([record['letter_grade'] for record in response.data['records']], ['B+'])
+        self.assertEqual(response.data['records'][0]['percentage'], 75.0)
+
+        distribution = self.client.get('/api/performance/teacher/records/').data['summary']['letter_grade_distribution']
+        self.assertEqual(distribution, {'B+': 1, 'C-': 1, 'F': 1})
+
+
+class GradeQuerySetTest(RosterMixin, TestCase):
+    def setUp(self):
+        course = self.create_course(self.create_teacher())
+        self.assessment = self.create_assessment(course, total_marks=200)
+        # Boundaries of every step of the scale, plus values just below them
+        for i, marks in enumerate([200, 180, 179, 170, 160, 150, 140, 130, 120, 110, 100, 99, 0]):
+            student = self.create_student(i)
+            Grade.objects.create(student=student, assessment=self.assessment, marks_obtained=marks)
+
+    def test_sql_annotations_match_model_properties(self):
+        for grade in Grade.objects.with_grading().select_related('assessment'):
+            self.assertAlmostEqual(grade.grade_percentage, float(grade.percentage))
+            self.assertEqual(grade.grade_letter, grade.letter_grade)
+
+    def test_filter_by_letter_grade_in_sql(self):
+        letters = Grade.objects.with_letter_grade().filter(grade_letter='A-').values_list('marks_obtained', flat=True)
+        self.assertEqual(sorted(letters), [160])
+
+    @override_settings(LETTER_GRADE_SCALE=[(50, 'P')])
+    def test_configurable_scale(self):
+        letters = dict(Grade.objects.with_letter_grade().values_list('marks_obtained', 'grade_letter'))
+        self.assertEqual(letters[100], 'P')
+        self.assertEqual(letters[99], 'F')
+        grade = Grade.objects.select_related('assessment').get(marks_obtained=100)
+        self.assertEqual(grade.letter_grade, 'P')
+
+
+class PerformanceRecordsCursorPaginationTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.instructor = self.create_teacher()
+        self.course = self.create_course(self.instructor)
+        students = [self.create_student(i, last_name=f'Student{i % 3}') for i in range(4)]
+        for a in range(3):
+            assessment = self.create_assessment(self.course, title=f'Quiz {a}', total_marks=20)
+            for student in students:
+                Grade.objects.create(student=student, assessment=assessment, marks_obtained=10)
+        # Identical timestamps force the walk to fall through to the tie-breakers
+        Grade.objects.update(graded_at=datetime(2024, 5, 1, tzinfo=timezone.utc))
+        self.client = self.authenticated_client(self.instructor)
+
+    def _get(self, **params):
+        response = self.client.get('/api/performance/teacher/records/', {
+            'pagination': 'cursor', 'page_size': 5, **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_walk_matches_offset_order(self):
+        expected = [
+            record['id']
+            for record in self.client.get(
+                '/api/performance/teacher/records/', {'page_size': 100}
+            ).data['records']
+        ]
+
+        pages = []
+        data = self._get(include_total='true')
+        self.assertEqual(data['pagination']['estimated_total'], 12)
+        self.assertFalse(data['pagination']['has_previous'])
+        pages.append([record['id'] for record in data['records']])
+        while data['pagination']['has_next']:
+            data = self._get(cursor=data['pagination']['next_cursor'])
+            pages.append([record['id'] for record in data['records']])
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(sum(pages, []), expected)
+
+        data = self._get(cursor=data['pagination']['previous_cursor'])
+        self.assertEqual([record['id'] for record in data['records']], pages[1])
+        data = self._get(cursor=data['pagination']['previous_cursor'])
+        self.assertEqual([record['id'] for record in data['records']], pages[0])
+        self.assertFalse(data['pagination']['has_previous'])
+        self.assertTrue(data['pagination']['has_next'])
+
+    def test_tampered_cursor_is_rejected(self):
+        cursor = self._get()['pagination']['next_cursor']
+        response = self.client.get('/api/performance/teacher/records/', {
+            'pagination': 'cursor', 'cursor': cursor[:-2] + 'xx'
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class PerformanceSummaryCacheTest(RosterMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = self.create_course(self.create_teacher())
+        self.student = self.create_student(1)
+        self.user = self.student.user
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assessment = self.create_assessment(self.course, total_marks=40)
+        Grade.objects.create(student=self.student, assessment=self.assessment, marks_obtained=30, is_published=True)
+        StudyGoal.objects.create(
+            student=self.student,
+            course=self.course,
+            title='Improve quizzes',
+            description='Score above 80%',
+            goal_type='grade',
+            target_value=80,
+            current_value=40,
+            target_date=date.today()
+        )
+        self.client = self.authenticated_client(self.user)
+
+    def _summary(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/performance/summary/')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_summary_is_served_from_cache(self):
+        data, miss_queries = self._summary()
+        self.assertEqual(data['average_grade'], 30.0)
+        self.assertEqual(data['total_courses'], 1)
+        self.assertEqual(data['completed_assessments'], 1)
+        self.assertEqual(data['recent_grades'][0]['percentage'], 75.0)
+        self.assertEqual(data['active_goals'][0]['progress'], 50.0)
+        self.assertLessEqual(miss_queries, 4)
+
+        cached, hit_queries = self._summary()
+        self.assertEqual(cached, data)
+        # Only the shared version is read
+        self.assertEqual(hit_queries, 1)
+
+    def test_version_bump_from_another_worker_invalidates_summary(self):
+        from .models import PerformanceSummaryVersion
+
+        self._summary()
+        # Another worker's grade write: new data and version, but this
+        # process's cache is untouched
+        Grade.objects.filter(student=self.student).update(marks_obtained=20)
+        GradeSummary.rebuild(students=[self.student])
+        PerformanceSummaryVersion.objects.filter(student_id=self.student.pk).update(version=F('version') + 1)
+
+        data, _ = self._summary()
+        self.assertEqual(data['average_grade'], 20.0)
+
+    def test_grade_change_invalidates_summary(self):
+        self._summary()
+        final = Assessment.objects.create(
+            course=self.course,
+            title='Final',
+            assessment_type='exam',
+            total_marks=100,
+            weight_percentage=50,
+            due_date=datetime.now(timezone.utc)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=self.student, assessment=final, marks_obtained=90, is_published=True)
+
+        data, _ = self._summary()
+        self.assertEqual(data['completed_assessments'], 2)
+        self.assertEqual(data['average_grade'], 60.0)
+        self.assertEqual(data['recent_grades'][0]['assessment'], 'Final')
+
+    def test_other_students_keep_their_cached_summary(self):
+        self._summary()
+        other = self.create_student(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=other, assessment=self.assessment, marks_obtained=10, is_published=True)
+
+        _, queries = self._summary()
+        self.assertEqual(queries, 1)
+
+
+class BatchFeatureExtractionTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+
+    def test_batch_matches_per_pair_extraction(self):
+        from .ml_utils import FEATURE_COLUMNS, PerformancePredictor
+
+        predictor = PerformancePredictor()
+        enrollments = Enrollment.objects.order_by('id')
+
+        with CaptureQueriesContext(connection) as ctx:
+            batch = predictor.extract_features_batch(enrollments)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+        expected = {}
+        for enrollment in enrollments:
+            features = predictor.extract_features(enrollment.student_id, enrollment.course_id)
+            if features:
+                expected[(enrollment.student_id, enrollment.course_id)] = features
+
+        self.assertEqual(list(batch.columns), FEATURE_COLUMNS)
+        self.assertEqual(list(batch.index), list(expected))
+        self.assertEqual(batch.to_dict('index'), expected)
+
+    def test_prepare_training_data_uses_final_grades(self):
+        from .ml_utils import FEATURE_COLUMNS, PerformancePredictor
+
+        Enrollment.objects.filter(student=self.students[0]).update(status='completed', final_grade='71.50')
+
+        df = PerformancePredictor().prepare_training_data()
+
+        self.assertEqual(list(df.columns), FEATURE_COLUMNS + ['final_grade'])
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df['final_grade'].tolist(), [71.5, 71.5, 71.5])
+
+
+class ModelRegistryTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        from .model_registry import ModelRegistry
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = ModelRegistry(self.tmp.name)
+
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(40, 3))
+        self.y = self.X @ [3.0, -2.0, 1.0] + 70
+        self.scaler = StandardScaler().fit(self.X)
+        self.model = RandomForestRegressor(n_estimators=5, random_state=0).fit(self.scaler.transform(self.X), self.y)
+
+    def test_loads_each_version_once_and_hot_swaps(self):
+        self.assertIsNone(self.registry.get())
+
+        first = self.registry.publish(self.model, self.scaler, version='v1')
+        loaded = self.registry.get()
+        self.assertEqual(loaded.version, 'v1')
+        self.assertIs(self.registry.get(), loaded)
+        np.testing.assert_allclose(
+            loaded.model.predict(loaded.scaler.transform(self.X)),
+            self.model.predict(self.scaler.transform(self.X)),
+        )
+
+        self.registry.publish(self.model, self.scaler, version='v2')
+        self.assertEqual(self.registry.get().version, 'v2')
+
+        self.registry.activate(first)
+        self.assertEqual(self.registry.get().version, 'v1')
+        self.assertEqual(self.registry.versions(), ['v1', 'v2'])
+        with self.assertRaises(ValueError):
+            self.registry.activate('v3')
+
+    def test_serves_legacy_flat_files(self):
+        import joblib
+        from .model_registry import LEGACY_VERSION, MODEL_FILE, SCALER_FILE
+
+        joblib.dump(self.model, os.path.join(self.tmp.name, MODEL_FILE))
+        joblib.dump(self.scaler, os.path.join(self.tmp.name, SCALER_FILE))
+
+        self.assertEqual(self.registry.get().version, LEGACY_VERSION)
+
+    def test_prediction_records_active_version(self):
+        from .ml_utils import PerformancePredictor
+
+        predictor = PerformancePredictor()
+        predictor.model_path = self.tmp.name
+        predictor.model, predictor.scaler = self.model, self.scaler
+        version = predictor.save_model()
+
+        serving = PerformancePredictor()
+        serving.model_path = self.tmp.name
+        prediction = serving.predict(None, None, features=dict(zip(['a', 'b', 'c'], self.X[0])))
+
+        self.assertEqual(prediction['model_version'], version)
+        self.assertTrue(version.startswith('v'))
+        self.assertLessEqual(len(version), 20)
+
+
+class BulkPredictionUpdateTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.save_roster_model()
+
+    def test_bulk_update_matches_single_predictions(self):
+        from .ml_utils import PerformancePredictor, update_predictions
+
+        PerformancePrediction.objects.create(
+            student=self.students[0], course=self.courses[0],
+            predicted_grade=10, confidence_score=0.5, model_version='old'
+        )
+
+        stats = update_predictions(chunk_size=2)
+
+        self.assertEqual(stats['rows'], 7)
+        self.assertEqual(PerformancePrediction.objects.count(), 7)
+        predictor = PerformancePredictor()
+        for prediction in PerformancePrediction.objects.all():
+            expected = predictor.predict(prediction.student_id, prediction.course_id)
+            self.assertEqual(float(prediction.predicted_grade), expected['predicted_grade'])
+            self.assertEqual(float(prediction.confidence_score), expected['confidence_score'])
+            self.assertEqual(prediction.at_risk, expected['at_risk'])
+            self.assertEqual(prediction.risk_factors, expected['risk_factors'])
+            self.assertEqual(prediction.recommendations, expected['recommendations'])
+            self.assertEqual(prediction.features_used, expected['features_used'])
+            self.assertEqual(prediction.model_version, self.version)
+
+
+class ShardedPredictionRefreshTest(RosterMixin, TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.create_feature_roster()
+        self.save_roster_model()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = os.path.join(tmp.name, 'refresh.json')
+
+    def test_shards_balance_courses_by_enrollment_count(self):
+        from .refresh import shard_courses
+
+        shards = shard_courses(2)
+
+        self.assertEqual(sorted(map(sorted, shards)), sorted([
+            [self.courses[0].id, self.courses[2].id], [self.courses[1].id]
+        ]))
+        self.assertEqual(shard_courses(5, exclude=[self.courses[0].id, self.courses[1].id]), [[self.courses[2].id]])
+
+    def test_inline_refresh_writes_every_prediction(self):
+        from .refresh import refresh_predictions
+
+        messages = []
+        totals = refresh_predictions(workers=0, shards=2, checkpoint=self.checkpoint, progress=messages.append)
+
+        self.assertEqual(totals['rows'], 7)
+        self.assertEqual((totals['shards'], totals['courses'], totals['failed_courses']), (2, 3, []))
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(PerformancePrediction.objects.count(), 7)
+        with open(self.checkpoint) as f:
+            self.assertEqual(sorted(json.load(f)['completed_courses']), sorted(c.id for c in self.courses))
+
+    def test_resume_skips_checkpointed_courses(self):
+        from .refresh import refresh_predictions
+
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'completed_courses': [self.courses[0].id, self.courses[1].id]}, f)
+
+        totals = refresh_predictions(workers=0, checkpoint=self.checkpoint, resume=True)
+
+        self.assertEqual((totals['rows'], totals['courses']), (1, 1))
+        self.assertEqual(
+            list(PerformancePrediction.objects.values_list('course_id', flat=True)), [self.courses[2].id]
+        )
+
+    def test_failed_shard_is_left_out_of_checkpoint(self):
+        from unittest import mock
+        from .refresh import refresh_predictions
+
+        with mock.patch('apps.performance.ml_utils.PerformancePredictor.predict_batch', side_effect=RuntimeError('boom')):
+            totals = refresh_predictions(workers=0, shards=1, checkpoint=self.checkpoint)
+
+        self.assertEqual(sorted(totals['failed_courses']), sorted(c.id for c in self.courses))
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['completed_courses'], [])
+
+
+    def test_refresh_without_model_aborts(self):
+        from unittest import mock
+        from django.core.management.base import CommandError
+        from .refresh import refresh_predictions
+
+        with override_settings(BASE_DIR=os.path.dirname(self.checkpoint)):
+            with self.assertRaises(CommandError):
+                call_command('refresh_predictions', workers=0, checkpoint=self.checkpoint, stdout=StringIO())
+            self.assertFalse(os.path.exists(self.checkpoint))
+
+        # The model disappearing mid-run fails the shard instead of checkpointing it
+        with mock.patch('apps.performance.ml_utils.PerformancePredictor.load_model', side_effect=[True, False]):
+            totals = refresh_predictions(workers=0, shards=1, checkpoint=self.checkpoint)
+        self.assertEqual(totals['rows'], 0)
+        self.assertEqual(sorted(totals['failed_courses']), sorted(c.id for c in self.courses))
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['completed_courses'], [])
+
+
+class CompiledForestTest(TestCase):
+    def setUp(self):
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        rng = np.random.default_rng(1)
+        self.X = rng.normal(loc=60, scale=15, size=(300, 4))
+        y = self.X @ [0.5, -0.2, 0.1, 0.3] + rng.normal(size=300)
+        self.scaler = StandardScaler().fit(self.X)
+        self.model = RandomForestRegressor(n_estimators=20, random_state=0).fit(self.scaler.transform(self.X), y)
+
+    def test_matches_sklearn_predictions(self):
+        from .compiled_forest import compile_forest
+
+        compiled = compile_forest(self.model, self.scaler)
+        X_test = np.random.default_rng(2).normal(loc=60, scale=25, size=(200, 4))
+
+        expected = self.model.predict(self.scaler.transform(X_test))
+        np.testing.assert_allclose(compiled.predict(X_test), expected, rtol=0, atol=1e-9)
+        self.assertAlmostEqual(compiled.predict_one(X_test[0]), expected[0], places=9)
+
+    def test_only_compiles_regression_forests(self):
+        from sklearn.linear_model import Ridge
+        from .compiled_forest import compile_forest
+
+        self.assertIsNone(compile_forest(Ridge().fit(self.X, self.X[:, 0]), self.scaler))
+
+    def test_registry_serves_compiled_model(self):
+        import tempfile
+        from .ml_utils import PerformancePredictor
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        predictor = PerformancePredictor()
+        predictor.model_path = tmp.name
+        predictor.model, predictor.scaler = self.model, self.scaler
+        predictor.save_model()
+
+        serving = PerformancePredictor()
+        serving.model_path = tmp.name
+        features = dict(zip('abcd', self.X[0]))
+        prediction = serving.predict(None, None, features=features)
+
+        self.assertIsNotNone(serving.compiled)
+        # The compiled arrays are shared between workers through the page cache
+        self.assertIsInstance(serving.compiled.value, np.memmap)
+        expected = self.model.predict(self.scaler.transform(self.X[:1]))[0]
+        self.assertEqual(prediction['predicted_grade'], round(expected, 2))
+
+
+class PredictionIntervalTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.save_roster_model()
+
+    def test_interval_and_confidence_come_from_tree_spread(self):
+        from math import erf
+        from .ml_utils import CONFIDENCE_TOLERANCE, PREDICTION_INTERVAL_Z, PerformancePredictor, update_predictions
+
+        update_predictions()
+
+        predictor = PerformancePredictor()
+        predictor.load_model()
+        features = predictor.extract_features_batch(Enrollment.objects.order_by('id'))
+        per_tree = np.stack([
+            tree.predict(predictor.scaler.transform(features).astype(np.float32))
+            for tree in predictor.model.estimators_
+        ])
+        for (student_id, course_id), mean, spread in zip(features.index, per_tree.mean(axis=0), per_tree.std(axis=0)):
+            stored = PerformancePrediction.objects.get(student_id=student_id, course_id=course_id)
+            interval = stored.features_used['prediction_interval']
+            self.assertAlmostEqual(interval['lower'], mean - PREDICTION_INTERVAL_Z * spread, places=2)
+            self.assertAlmostEqual(interval['upper'], mean + PREDICTION_INTERVAL_Z * spread, places=2)
+            self.assertAlmostEqual(
+                float(stored.confidence_score), erf(CONFIDENCE_TOLERANCE / (spread * np.sqrt(2))), places=4
+            )
+            self.assertLessEqual(interval['lower'], float(stored.predicted_grade))
+            self.assertGreaterEqual(interval['upper'], float(stored.predicted_grade))
+
+
+class TrainingReportTest(TestCase):
+    def test_trains_on_supplied_frame_and_reports_holdout(self):
+        import tempfile
+        from ml.utils import create_training_report, generate_synthetic_training_data
+        from .ml_utils import FEATURE_COLUMNS, PerformancePredictor
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        df = generate_synthetic_training_data(200, random_state=0)
+        self.assertEqual(list(df.columns), FEATURE_COLUMNS + ['final_grade'])
+        self.assertTrue(df['final_grade'].between(0, 100).all())
+
+        predictor = PerformancePredictor()
+        predictor.model_path = tmp.name
+        predictor.model.set_params(n_estimators=10)
+        self.assertTrue(predictor.train_model(df))
+
+        X_test, y_test = predictor.holdout
+        report = create_training_report(predictor.model, X_test, y_test, FEATURE_COLUMNS)
+        self.assertEqual(report['test_samples'], 40)
+        self.assertGreater(report['r2_score'], 0.5)
+        self.assertEqual(report['feature_importance'][0]['feature'], 'current_course_avg')
+
+
+class EstimatorRegistryTest(TestCase):
+    def setUp(self):
+        import tempfile
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_dir = tmp.name
+
+    def test_estimator_follows_setting(self):
+        from sklearn.linear_model import Ridge
+        from .ml_utils import PerformancePredictor
+
+        with override_settings(PERFORMANCE_ESTIMATOR='ridge'):
+            self.assertIsInstance(PerformancePredictor().model, Ridge)
+        with self.assertRaises(ValueError):
+            PerformancePredictor('svm')
+
+    def test_load_model_restores_trained_estimator(self):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        from ml.utils import generate_synthetic_training_data
+        from .ml_utils import FEATURE_COLUMNS, PerformancePredictor
+
+        df = generate_synthetic_training_data(100, random_state=0)
+        trainer = PerformancePredictor('hist_gradient_boosting')
+        trainer.model_path = self.model_dir
+        trainer.model.set_params(max_iter=10)
+        self.assertTrue(trainer.train_model(df))
+
+        serving = PerformancePredictor()
+        serving.model_path = self.model_dir
+        prediction = serving.predict(None, None, features=df[FEATURE_COLUMNS].iloc[0].to_dict())
+
+        self.assertEqual(serving.estimator, 'hist_gradient_boosting')
+        self.assertIsInstance(serving.model, HistGradientBoostingRegressor)
+        self.assertIsNone(serving.compiled)
+        self.assertEqual(prediction['model_version'], trainer.model_version)
+        self.assertNotIn('prediction_interval', prediction['features_used'])
+
+
+class HyperparameterSearchTest(TestCase):
+    def setUp(self):
+        from ml.utils import generate_synthetic_training_data
+        from .ml_utils import FEATURE_COLUMNS
+
+        self.df = generate_synthetic_training_data(300, random_state=0)
+        self.X, self.y = self.df[FEATURE_COLUMNS], self.df['final_grade']
+
+    def test_folds_validate_on_newer_rows(self):
+        from .search import time_series_folds
+
+        for train, test in time_series_folds(100, n_splits=4):
+            self.assertLess(train.max(), test.min())
+
+    def test_random_search_scores_every_candidate_within_budget(self):
+        from .search import hyperparameter_search
+
+        params, trace = hyperparameter_search(self.X, self.y, 'ridge', n_candidates=5, n_splits=3, n_jobs=1)
+
+        self.assertEqual(len(trace['candidates']), 5)
+        self.assertFalse(trace['stopped_by_budget'])
+        self.assertEqual(params, min(trace['candidates'], key=lambda c: c['mean_mse'])['params'])
+        self.assertEqual(len(trace['candidates'][0]['fold_mse']), 3)
+
+    def test_budget_stops_search_after_first_wave(self):
+        from .search import hyperparameter_search
+
+        _, trace = hyperparameter_search(self.X, self.y, 'ridge', n_candidates=5, budget_seconds=0, n_jobs=1)
+
+        self.assertTrue(trace['stopped_by_budget'])
+        self.assertEqual(len(trace['candidates']), 1)
+
+    def test_halving_promotes_best_candidates_to_more_rows(self):
+        from .search import hyperparameter_search
+
+        params, trace = hyperparameter_search(
+            self.X, self.y, 'ridge', strategy='halving', n_candidates=7, n_splits=3, n_jobs=1
+        )
+
+        rows = [candidate['rows'] for candidate in trace['candidates']]
+        self.assertEqual(rows.count(rows[0]), 7)
+        self.assertEqual(rows[-1], len(self.X))
+        self.assertLess(rows.count(len(self.X)), 7)
+        self.assertEqual(params, trace['best_params'])
+
+    def test_halving_on_tiny_dataset_stays_within_rows(self):
+        from .search import hyperparameter_search
+
+        X, y = self.X[:8], self.y[:8]
+        params, trace = hyperparameter_search(
+            X, y, 'ridge', strategy='halving', n_candidates=7, n_splits=5, n_jobs=1
+        )
+
+        self.assertTrue(all(candidate['rows'] <= 8 for candidate in trace['candidates']))
+        self.assertEqual(trace['candidates'][-1]['rows'], 8)
+        self.assertEqual(params, trace['best_params'])
+
+    def test_train_model_saves_search_trace_with_model(self):
+        import tempfile
+        from .ml_utils import PerformancePredictor
+        from .model_registry import get_registry
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        predictor = PerformancePredictor('ridge')
+        predictor.model_path = tmp.name
+
+        self.assertTrue(predictor.train_model(self.df, search={'n_candidates': 3, 'n_splits': 3, 'n_jobs': 1}))
+
+        metadata = get_registry(tmp.name).get().metadata
+        self.assertEqual(metadata['search']['best_params'], {'alpha': predictor.model.alpha})
+        self.assertEqual(metadata['params']['alpha'], predictor.model.alpha)
+        self.assertEqual(len(predictor.holdout[1]), 60)
+        self.assertEqual(list(predictor.holdout[1].index), list(range(240, 300)))
+
+
+class OnlineModelUpdateTest(RosterMixin, TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.create_feature_roster()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_dir = tmp.name
+
+    def finish(self, enrollments, grade):
+        for enrollment in enrollments:
+            enrollment.status = 'completed'
+            enrollment.final_grade = Decimal(grade)
+            enrollment.save()
+
+    def test_consumes_new_enrollments_from_checkpoint(self):
+        from .model_registry import get_registry
+        from .online import incremental_update
+
+        enrollments = list(Enrollment.objects.order_by('id'))
+        self.finish(enrollments[:3], '72.50')
+        self.assertTrue(all(e.completion_date for e in enrollments[:3]))
+
+        first = incremental_update(batch_size=2, model_dir=self.model_dir)
+        self.assertEqual((first['rows'], first['batches']), (3, 2))
+        loaded = get_registry(self.model_dir).get()
+        self.assertEqual(loaded.metadata['estimator'], 'sgd')
+        self.assertEqual(loaded.metadata['online']['rows_seen'], 3)
+        self.assertEqual(loaded.metadata['online']['checkpoint']['enrollment_id'], enrollments[2].id)
+
+        idle = incremental_update(model_dir=self.model_dir)
+        self.assertIsNone(idle['version'])
+
+        coef = loaded.model.coef_.copy()
+        self.finish(enrollments[3:5], '55.00')
+        second = incremental_update(model_dir=self.model_dir)
+        self.assertEqual(second['rows'], 2)
+        updated = get_registry(self.model_dir).get()
+        self.assertEqual(updated.version, second['version'])
+        self.assertEqual(updated.metadata['online']['rows_seen'], 5)
+        self.assertFalse(np.array_equal(updated.model.coef_, coef))
+
+    def test_grade_entered_after_checkpoint_is_consumed(self):
+        from .model_registry import get_registry
+        from .online import incremental_update
+
+        enrollments = list(Enrollment.objects.order_by('id'))
+        # Finished first, graded only after the checkpoint has moved past it
+        late = enrollments[0]
+        late.status = 'completed'
+        late.save()
+        self.finish(enrollments[1:3], '72.50')
+        # Rows without a completion date are still consumed
+        Enrollment.objects.filter(pk=enrollments[1].pk).update(completion_date=None)
+        self.assertEqual(incremental_update(model_dir=self.model_dir)['rows'], 2)
+
+        late.final_grade = Decimal('64.00')
+        late.save()
+        second = incremental_update(model_dir=self.model_dir)
+
+        self.assertEqual(second['rows'], 1)
+        checkpoint = get_registry(self.model_dir).get().metadata['online']['checkpoint']
+        self.assertEqual(checkpoint['enrollment_id'], late.id)
+
+    def test_enrollments_finished_by_queryset_update_are_consumed(self):
+        from .online import incremental_update
+
+        enrollments = list(Enrollment.objects.order_by('id'))
+        # update() bypasses Enrollment.save, so graded_at is not stamped
+        Enrollment.objects.filter(id__in=[e.id for e in enrollments[:3]]).update(
+            status='completed', final_grade='72.50'
+        )
+        messages = []
+
+        first = incremental_update(model_dir=self.model_dir, progress=messages.append)
+
+        self.assertEqual(first['rows'], 3)
+        self.assertIn('Stamped graded_at on 3 enrollments finished without Enrollment.save', messages)
+        self.assertFalse(Enrollment.objects.filter(final_grade__isnull=False, graded_at__isnull=True).exists())
+        self.assertIsNone(incremental_update(model_dir=self.model_dir)['version'])
+
+    def test_scaler_is_frozen_after_first_fit(self):
+        from .model_registry import get_registry
+        from .online import incremental_update
+
+        enrollments = list(Enrollment.objects.order_by('id'))
+        self.finish(enrollments[:3], '72.50')
+        incremental_update(model_dir=self.model_dir)
+        mean = get_registry(self.model_dir).get().scaler.mean_.copy()
+
+        self.finish(enrollments[3:5], '55.00')
+        incremental_update(model_dir=self.model_dir)
+
+        np.testing.assert_array_equal(get_registry(self.model_dir).get().scaler.mean_, mean)
+
+    def test_model_trained_on_given_frame_records_checkpoint(self):
+        from ml.utils import generate_synthetic_training_data
+        from .ml_utils import PerformancePredictor
+        from .model_registry import get_registry
+        from .online import incremental_update, latest_checkpoint
+
+        enrollments = list(Enrollment.objects.order_by('id'))
+        self.finish(enrollments[:3], '72.50')
+        predictor = PerformancePredictor('sgd')
+        predictor.model_path = self.model_dir
+        df = generate_synthetic_training_data(50, random_state=0)
+
+        self.assertTrue(predictor.train_model(df, checkpoint=latest_checkpoint()))
+
+        online = get_registry(self.model_dir).get().metadata['online']
+        self.assertEqual(online['checkpoint']['enrollment_id'], enrollments[2].id)
+        self.assertEqual(online['rows_seen'], 50)
+        self.assertIsNone(incremental_update(model_dir=self.model_dir)['version'])
+
+    def test_refuses_models_without_partial_fit(self):
+        from .ml_utils import PerformancePredictor
+        from .online import incremental_update
+
+        predictor = PerformancePredictor('ridge')
+        predictor.model_path = self.model_dir
+        X = predictor.extract_features_batch(Enrollment.objects.order_by('id'))
+        predictor.scaler.fit(X)
+        predictor.model.fit(predictor.scaler.transform(X), np.arange(len(X)))
+        predictor.save_model()
+
+        with self.assertRaises(ValueError):
+            incremental_update(model_dir=self.model_dir)
+
+
+@override_settings(FEATURE_SNAPSHOT_MAX_AGE=60 * 60 * 24)
+class FeatureSnapshotTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.save_roster_model()
+
+    def test_snapshots_match_live_features(self):
+        from .ml_utils import PerformancePredictor
+        from .snapshots import capture_snapshots, enrollment_features, snapshot_features
+
+        self.assertEqual(capture_snapshots(), 7)
+
+        predictor = PerformancePredictor()
+        live = predictor.extract_features_batch(Enrollment.objects.order_by('id'))
+        with CaptureQueriesContext(connection) as ctx:
+            reused = enrollment_features(predictor, Enrollment.objects.order_by('id'))
+        # Snapshots, enrollment pairs, and one live pass for the unsnapshotted (invalid) enrollments
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(reused.to_dict('index'), live.to_dict('index'))
+
+        student_id, course_id = live.index[0]
+        self.assertEqual(snapshot_features(student_id, course_id), live.loc[(student_id, course_id)].to_dict())
+
+    def test_predictions_reuse_fresh_snapshots_only(self):
+        from .ml_utils import PerformancePredictor, update_predictions
+        from .snapshots import capture_snapshots
+
+        capture_snapshots()
+        # Live data moves on after the snapshot
+        StudentProfile.objects.filter(pk=self.students[0].pk).update(gpa='1.10')
+
+        update_predictions()
+        prediction = PerformancePrediction.objects.get(student=self.students[0], course=self.courses[0])
+        self.assertEqual(prediction.features_used['current_gpa'], 3.45)
+        self.assertEqual(
+            PerformancePredictor().predict(self.students[0].id, self.courses[0].id)['features_used']['current_gpa'], 3.45
+        )
+
+        with override_settings(FEATURE_SNAPSHOT_MAX_AGE=0):
+            update_predictions()
+        prediction.refresh_from_db()
+        self.assertEqual(prediction.features_used['current_gpa'], 1.1)
+
+    def test_new_grade_makes_snapshot_stale(self):
+        from .ml_utils import PerformancePredictor
+        from .snapshots import capture_snapshots, snapshot_features
+
+        student, course = self.students[0], self.courses[0]
+        capture_snapshots()
+        self.assertIsNotNone(snapshot_features(student.id, course.id))
+
+        assessment = Assessment.objects.create(
+            course=course, title='Late quiz', assessment_type='quiz', total_marks=50,
+            weight_percentage=10, due_date=datetime.now(timezone.utc),
+        )
+        Grade.objects.create(student=student, assessment=assessment, marks_obtained=5)
+
+        self.assertIsNone(snapshot_features(student.id, course.id))
+        live = PerformancePredictor().extract_features_batch(Enrollment.objects.filter(student=student, course=course))
+        self.assertEqual(
+            PerformancePredictor().predict(student.id, course.id)['features_used']['current_course_avg'],
+            live.iloc[0]['current_course_avg'],
+        )
+
+    def test_training_frame_uses_snapshot_before_completion(self):
+        from datetime import timedelta
+        from django.utils import timezone as django_timezone
+        from .ml_utils import FEATURE_COLUMNS
+        from .snapshots import capture_snapshots, snapshot_training_frame
+
+        now = django_timezone.now()
+        capture_snapshots(captured_at=now - timedelta(days=10))
+        StudentProfile.objects.filter(pk=self.students[0].pk).update(gpa='2.00')
+        capture_snapshots(captured_at=now - timedelta(days=3))
+        StudentProfile.objects.filter(pk=self.students[0].pk).update(gpa='1.00')
+        capture_snapshots(captured_at=now)
+
+        Enrollment.objects.filter(student=self.students[0]).update(
+            status='completed', final_grade='80.00', completion_date=now - timedelta(days=1)
+        )
+
+        df = snapshot_training_frame()
+        self.assertEqual(list(df.columns), FEATURE_COLUMNS + ['final_grade'])
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df['current_gpa'].tolist(), [2.0, 2.0, 2.0])
+        self.assertEqual(df['final_grade'].tolist(), [80.0, 80.0, 80.0])
+
+        self.assertEqual(snapshot_training_frame(lead_days=5)['current_gpa'].tolist(), [3.45, 3.45, 3.45])
+        self.assertTrue(snapshot_training_frame(lead_days=20).empty)
+
+        # Snapshots of unfinished enrollments or taken after completion are not read
+        from unittest import mock
+        from . import snapshots
+
+        frames = []
+        snapshot_frame = snapshots._snapshot_frame
+
+        def record(queryset):
+            frames.append(snapshot_frame(queryset))
+            return frames[-1]
+
+        with mock.patch.object(snapshots, '_snapshot_frame', side_effect=record):
+            snapshot_training_frame()
+        # The 3 finished enrollments' snapshots from before completion, of 21
+        self.assertEqual(len(frames[0]), 6)
+
+        # Without a completion date there is no point in time to join on
+        Enrollment.objects.filter(student=self.students[0], course=self.courses[0]).update(completion_date=None)
+        self.assertEqual(len(snapshot_training_frame()), 2)
+
+
+class PredictionJobTest(RosterMixin, TestCase):
+    def setUp(self):
+        from unittest import mock
+
+        self.create_feature_roster()
+        self.teacher = self.courses[0].instructor
+        self.client = self.authenticated_client(self.teacher)
+        # No API key: predictions come from the local fallback
+        env = mock.patch.dict(os.environ, {'GEMINI_API_KEY': ''})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_request_is_queued_and_deduplicated(self):
+        from unittest import mock
+        from .models import PredictionJob
+
+        with mock.patch('apps.performance.gemini_predictor.predict_course_performance') as predict:
+            response = self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/')
+            again = self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(again.data['job_id'], response.data['job_id'])
+        self.assertEqual(PredictionJob.objects.count(), 1)
+        predict.assert_not_called()
+
+    def test_job_runs_and_reports_result(self):
+        from .jobs import run_pending_jobs
+
+        response = self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/')
+        self.assertEqual(run_pending_jobs(), 1)
+
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.data['status'], 'succeeded')
+        self.assertEqual(status_response.data['progress'], 100)
+        self.assertEqual(status_response.data['result']['summary']['total_students'], 4)
+
+        # A finished job no longer blocks a new request
+        response = self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/')
+        self.assertNotEqual(response.data['job_id'], status_response.data['job_id'])
+
+    def test_jobs_are_private_to_their_teacher(self):
+        other = self.create_teacher(username='teacher2', email='teacher2@example.com')
+        response = self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/')
+
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(response.data['status_url']).status_code, 404)
+        self.assertEqual(self.client.post(f'/api/performance/ai/predict/course/{self.courses[0].id}/').status_code, 404)
+
+    def test_stale_jobs_are_retried_then_failed(self):
+        from django.utils import timezone as dj_timezone
+        from .jobs import JOB_STALE_AFTER, MAX_JOB_ATTEMPTS, claim_next_job, enqueue_course_prediction
+        from .models import PredictionJob
+
+        job, _ = enqueue_course_prediction(self.courses[0], self.teacher)
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertIsNone(claim_next_job())
+
+        # The worker died: its heartbeat stops
+        stale = dj_timezone.now() - JOB_STALE_AFTER * 2
+        PredictionJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertEqual(claim_next_job().attempts, 2)
+
+        PredictionJob.objects.filter(pk=job.pk).update(heartbeat_at=stale, attempts=MAX_JOB_ATTEMPTS)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_simultaneous_requests_queue_one_job(self):
+        from unittest import mock
+        from django.db import transaction
+        from django.db.models.query import QuerySet
+        from .jobs import enqueue_course_prediction
+        from .models import PredictionJob
+
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=select_for_update) as lock, \
+                transaction.atomic():
+            # Neither request's job is committed when the other checks
+            first, first_created = enqueue_course_prediction(self.courses[0], self.teacher)
+            second, second_created = enqueue_course_prediction(self.courses[0], self.courses[0].instructor)
+
+        self.assertEqual((first_created, second_created), (True, False))
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(PredictionJob.objects.filter(course=self.courses[0]).count(), 1)
+        # Each check runs under a lock on the course row
+        self.assertEqual([call.args[0].model for call in lock.call_args_list], [Course, Course])
+
+    def test_enqueue_replaces_stale_job_and_wakes_workers_for_active_one(self):
+        from unittest import mock
+        from django.utils import timezone as dj_timezone
+        from .jobs import JOB_STALE_AFTER, claim_next_job, enqueue_course_prediction
+        from .models import PredictionJob
+
+        job, _ = enqueue_course_prediction(self.courses[0], self.teacher)
+        with mock.patch('apps.performance.jobs.wake_workers') as wake:
+            with self.captureOnCommitCallbacks(execute=True):
+                same, created = enqueue_course_prediction(self.courses[0], self.teacher)
+        self.assertEqual((same.pk, created), (job.pk, False))
+        wake.assert_called_once()
+
+        claim_next_job()
+        PredictionJob.objects.filter(pk=job.pk).update(heartbeat_at=dj_timezone.now() - JOB_STALE_AFTER * 2)
+        replacement, created = enqueue_course_prediction(self.courses[0], self.teacher)
+
+        self.assertTrue(created)
+        self.assertNotEqual(replacement.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(claim_next_job().pk, replacement.pk)
+
+
+class ChunkedGeminiPredictionTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.teacher = self.courses[0].instructor
+        self.calls = []
+
+    def test_chunks_retry_and_fall_back_independently(self):
+        from unittest import mock
+        from .gemini_predictor import predict_course_performance
+
+        ids = [s.student_id for s in self.students]
+        with mock.patch('apps.performance.gemini_predictor._get_gemini_client', return_value=self.fake_gemini_client(ids[0], ids[1])), \
+                mock.patch('apps.performance.gemini_predictor.CHUNK_MAX_STUDENTS', 1), \
+                mock.patch('apps.performance.gemini_predictor.CHUNK_RETRY_DELAY', 0):
+            result = predict_course_performance(self.courses[0].id, self.teacher)
+
+        by_id = {p['student_id']: p for p in result['predictions']}
+        self.assertEqual(sorted(by_id), sorted(ids))
+        self.assertEqual(by_id[ids[0]]['summary'], 'ok')
+        self.assertIn('AI response parse error', by_id[ids[1]]['summary'])
+        self.assertIn('1 of 4 students', result['warning'])
+        self.assertEqual(result['model'], 'gemini-2.0-flash')
+        # One request per student, and retries only for the two failing chunks
+        self.assertEqual(sorted(map(tuple, self.calls)), sorted([(i,) for i in ids] + [(ids[0],), (ids[1],)]))
+        # Only Gemini predictions are persisted
+        self.assertEqual(PerformancePrediction.objects.filter(course=self.courses[0]).count(), 3)
+
+    def test_rate_limited_chunks_wait_for_quota(self):
+        from unittest import mock
+        from .gemini_predictor import predict_course_performance
+        from .provider_guard import ProviderUnavailable
+
+        def predict(quota_wait):
+            self.calls, messages = [], []
+            refusals = [None, ProviderUnavailable('rate limit'), None, ProviderUnavailable('rate limit'), None, None]
+            with mock.patch('apps.performance.gemini_predictor._get_gemini_client', return_value=self.fake_gemini_client(None, None)), \
+                    mock.patch('apps.performance.gemini_predictor.provider_guard.acquire', side_effect=refusals), \
+                    mock.patch('apps.performance.gemini_predictor.CHUNK_MAX_STUDENTS', 1), \
+                    mock.patch('apps.performance.gemini_predictor.QUOTA_POLL_INTERVAL', 0):
+                result = predict_course_performance(
+                    self.courses[0].id, self.teacher, progress=lambda percent, message: messages.append(message),
+                    quota_wait=quota_wait,
+                )
+            return result, messages
+
+        result, messages = predict(quota_wait=60)
+        self.assertEqual(len(self.calls), 4)
+        self.assertNotIn('warning', result)
+        self.assertEqual(sum('Waiting for AI quota' in message for message in messages), 2)
+
+        PerformancePrediction.objects.all().delete()
+        result, _ = predict(quota_wait=0)
+        self.assertEqual(len(self.calls), 2)
+        self.assertIn('rate limit', result['warning'])
+
+    def test_chunks_are_size_bounded(self):
+        from .gemini_predictor import _chunk_students, _student_prompt_block
+
+        students = [{'student_id': str(i), 'student_name': 'x' * (5000 if i == 2 else 10), 'year_of_study': '1',
+                     'major': '', 'gpa': None, 'current_course_grades': [], 'historical_avg_percentage': None,
+                     'attendance': None} for i in range(7)]
+        chunks = _chunk_students(students, max_students=3, max_chars=1000)
+        self.assertEqual([[sd['student_id'] for sd in chunk] for chunk in chunks],
+                         [['0', '1'], ['2'], ['3', '4', '5'], ['6']])
+        self.assertGreater(len(_student_prompt_block(1, students[2])), 1000)
+
+
+class IncrementalAIPredictionTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.teacher = self.courses[0].instructor
+        self.calls = []
+
+    def predict(self):
+        from unittest import mock
+        from .gemini_predictor import predict_course_performance
+
+        client = self.fake_gemini_client(None, None)
+        self.calls.clear()
+        with mock.patch('apps.performance.gemini_predictor._get_gemini_client', return_value=client):
+            return predict_course_performance(self.courses[0].id, self.teacher)
+
+    def test_only_changed_students_are_resent(self):
+        first = self.predict()
+        self.assertEqual(first['reused_predictions'], 0)
+        self.assertEqual(sorted(sum(self.calls, [])), sorted(s.student_id for s in self.students))
+
+        second = self.predict()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(second['reused_predictions'], 4)
+        self.assertEqual(second['predictions'], first['predictions'])
+
+        StudentProfile.objects.filter(pk=self.students[2].pk).update(gpa='2.10')
+        third = self.predict()
+        self.assertEqual(self.calls, [[self.students[2].student_id]])
+        self.assertEqual(third['reused_predictions'], 3)
+
+        # Predictions overwritten by the ML model are not reused
+        PerformancePrediction.objects.filter(student=self.students[0]).update(model_version='v1.0')
+        self.predict()
+        self.assertEqual(self.calls, [[self.students[0].student_id]])
+
+
+class ProviderGuardTest(RosterMixin, TestCase):
+    def setUp(self):
+        self.create_feature_roster()
+        self.teacher = self.courses[0].instructor
+        self.calls = []
+
+    def test_token_bucket_limits_requests(self):
+        from datetime import timedelta
+        from .models import ProviderGuardState
+        from .provider_guard import ProviderUnavailable, acquire
+
+        with override_settings(GEMINI_REQUESTS_PER_MINUTE=2):
+            acquire()
+            acquire()
+            with self.assertRaises(ProviderUnavailable) as raised:
+                acquire()
+            self.assertEqual(raised.exception.reason, 'rate limit')
+
+            # Half a minute refills one token
+            state = ProviderGuardState.objects.get(provider='gemini')
+            ProviderGuardState.objects.filter(pk=state.pk).update(refilled_at=state.refilled_at - timedelta(seconds=30))
+            acquire()
+
+    def test_circuit_opens_and_probes_for_recovery(self):
+        from datetime import timedelta
+        from .models import ProviderGuardState
+        from .provider_guard import CIRCUIT_FAILURE_THRESHOLD, ProviderUnavailable, acquire, record_failure, record_success
+
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+            record_failure(error=RuntimeError('503 UNAVAILABLE'))
+        with self.assertRaises(ProviderUnavailable) as raised:
+            acquire()
+        self.assertEqual(raised.exception.reason, 'service unavailable')
+
+        # After the cooldown exactly one probe goes through
+        ProviderGuardState.objects.update(opened_at=F('opened_at') - timedelta(minutes=5))
+        acquire()
+        with self.assertRaises(ProviderUnavailable):
+            acquire()
+
+        # A failed probe reopens the circuit, a successful one closes it
+        record_failure(error=RuntimeError('503 UNAVAILABLE'))
+        self.assertEqual(ProviderGuardState.objects.get().circuit, 'open')
+        ProviderGuardState.objects.update(opened_at=F('opened_at') - timedelta(minutes=5))
+        acquire()
+        record_success()
+        acquire()
+        acquire()
+        self.assertEqual(ProviderGuardState.objects.get().circuit, 'closed')
+
+    def test_open_circuit_skips_the_provider(self):
+        from unittest import mock
+        from .gemini_predictor import chat_with_ai, predict_course_performance
+        from .provider_guard import CIRCUIT_FAILURE_THRESHOLD, record_failure
+
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+            record_failure(error=RuntimeError('429 RESOURCE_EXHAUSTED'))
+
+        client = self.fake_gemini_client(None, None)
+        # No latency budget: call inline, in this test's transaction
+        with mock.patch('apps.performance.gemini_predictor._get_gemini_client', return_value=client), \
+                override_settings(AI_LATENCY_BUDGETS={}):
+            result = predict_course_performance(self.courses[0].id, self.teacher)
+            chat = chat_with_ai(self.students[0], 'How am I doing?')
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(result['model'], 'fallback-heuristic')
+        self.assertIn('service unavailable', result['warning'])
+        self.assertTrue(chat['response'])
+        self.assertEqual(chat['source'], 'fallback')
+
+
+class LatencyBudgetTest(RosterMixin, TransactionTestCase):
+    """The Gemini call runs on another thread and connection, so test data must be committed"""
+
+    def setUp(self):
+        import threading
+        from types import SimpleNamespace
+        from unittest import mock
+
+        self.create_feature_roster()
+        self.save_roster_model()
+        self.teacher = self.courses[0].instructor
+        self.calls, self.configs = [], []
+        self.release = threading.Event()
+        self.addCleanup(self.finish_background_calls)
+
+        def generate_content(model, contents, config=None):
+            self.calls.append(contents)
+            self.configs.append(config)
+            self.release.wait(5)
+            student_id = contents.split('Student ID: ')[1].split('\n')[0]
+            return SimpleNamespace(text=json.dumps([
+                {'student_id': student_id, 'predicted_grade': 77, 'risk_level': 'low', 'summary': 'late but fine'}
+            ]))
+
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+        patcher = mock.patch('apps.performance.gemini_predictor._get_gemini_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        settings_override = override_settings(AI_LATENCY_BUDGETS={'student_prediction': 0.05, 'chat': 0.05})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def finish_background_calls(self):
+        from . import gemini_predictor
+
+        # Let outstanding Gemini calls finish before the tables are flushed
+        self.release.set()
+        if gemini_predictor._background is not None:
+            gemini_predictor._background.shutdown(wait=True)
+            gemini_predictor._background = None
+
+    def wait_for_gemini_prediction(self):
+        # Reading while the background thread writes locks SQLite's shared
+        # in-memory tables, so wait for the call to finish first
+        self.finish_background_calls()
+        return PerformancePrediction.objects.get(model_version='gemini-2.0-flash')
+
+    def test_slow_provider_answers_from_local_model_then_persists(self):
+        from .gemini_predictor import predict_single_student
+        from .ml_utils import PerformancePredictor
+
+        result = predict_single_student(self.students[0].id, self.courses[0].id, self.teacher)
+        self.assertEqual(result['source'], 'local-model')
+        self.assertEqual(result['model_version'], self.version)
+        self.assertEqual(
+            result['predicted_grade'],
+            PerformancePredictor().predict(self.students[0].id, self.courses[0].id)['predicted_grade'],
+        )
+
+        # The Gemini call finishes after the request and is stored for next time
+        prediction = self.wait_for_gemini_prediction()
+        self.assertEqual(float(prediction.predicted_grade), 77)
+
+        result = predict_single_student(self.students[0].id, self.courses[0].id, self.teacher)
+        self.assertEqual(result['source'], 'stored')
+        self.assertEqual(result['summary'], 'late but fine')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_slow_provider_without_local_model_uses_heuristic(self):
+        from unittest import mock
+        from .gemini_predictor import chat_with_ai, predict_single_student
+
+        with mock.patch('apps.performance.gemini_predictor.PerformancePredictor.predict', return_value=None):
+            result = predict_single_student(self.students[1].id, self.courses[0].id, self.teacher)
+        self.assertEqual(result['source'], 'fallback-heuristic')
+        self.assertIn('AI response too slow', result['summary'])
+
+        chat = chat_with_ai(self.students[1], 'How am I doing?')
+        self.assertEqual(chat['source'], 'fallback')
+
+        # Each request carries its own deadline: chat stops with its budget
+        self.assertEqual(self.configs[0]['http_options'], {'timeout': 60000})
+        self.assertEqual(self.configs[1]['http_options'], {'timeout': 50})
+
+    def test_busy_background_threads_answer_locally_at_once(self):
+        from unittest import mock
+        from .gemini_predictor import chat_with_ai, predict_single_student
+
+        with mock.patch('apps.performance.gemini_predictor.BACKGROUND_LLM_THREADS', 2):
+            for student in self.students[:2]:
+                predict_single_student(student.id, self.courses[0].id, self.teacher)
+
+            # Both threads are stuck on slow Gemini calls: nothing else is queued
+            result = predict_single_student(self.students[2].id, self.courses[0].id, self.teacher)
+            chat = chat_with_ai(self.students[2], 'How am I doing?')
+
+        self.assertEqual(result['source'], 'local-model')
+        self.assertEqual(chat['source'], 'fallback')
+        self.assertEqual(len(self.calls), 2)
@@ -36,6 +36,7 @@ urlpatterns = [
     
     # AI Predictions (Gemini)
     path('ai/predict/course/<int:course_id>/', views.ai_predict_course, name='ai-predict-course'),
+    path('ai/jobs/<uuid:job_id>/', views.ai_prediction_job, name='ai-prediction-job'),
     path('ai/predict/course/<int:course_id>/student/<int:student_id>/', views.ai_predict_student, name='ai-predict-student'),
     
     # AI Performance Chat (Student)
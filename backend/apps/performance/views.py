@@ -2,8 +2,10 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Count
-from .models import Assessment, Grade, PerformancePrediction, StudyGoal
+from django.urls import reverse
+from django.db.models import Avg, Count, Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from .models import Assessment, Grade, PerformancePrediction, PredictionJob, StudyGoal
 from .serializers import (
     AssessmentSerializer, 
     GradeSerializer,
@@ -12,10 +14,20 @@ from .serializers import (
     StudyGoalSerializer,
     PerformanceSummarySerializer
 )
+from .aggregates import percentage_statistics
+from .exports import stream_performance_csv
+from .gradebook import CourseGradebook
+from .services import GradeIngestionService
+from .summary import cached_performance_summary
 from .ml_utils import PerformancePredictor
-from .gemini_predictor import predict_course_performance, predict_single_student, chat_with_ai
+from .gemini_predictor import predict_single_student, chat_with_ai
+from .jobs import enqueue_course_prediction
 from apps.students.models import StudentProfile
 from apps.courses.models import Course
+from api.pagination import InvalidCursor, KeysetPaginator, estimated_count
+
+
+PERFORMANCE_RECORDS_ORDERING = ['-graded_at', 'assessment__course__name', 'student__user__last_name', 'id']
 
 
 class AssessmentListCreateView(generics.ListCreateAPIView):
@@ -131,98 +143,11 @@ class StudyGoalListCreateView(generics.ListCreateAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def performance_summary(request):
     """Get performance summary for a student"""
-    try:
-        print(f"User: {request.user}, Role: {request.user.role}")
-        if not request.user.is_student:
-            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
-        
-        print("Getting student profile...")
-        student_profile = request.user.student_profile
-        print(f"Student profile: {student_profile}")
-        
-        # Calculate overall statistics
-        print("Getting grades...")
-        all_grades = Grade.objects.filter(
-            student=student_profile,
-            is_published=True
-        )
-        print(f"Found {all_grades.count()} grades")
-        
-        if all_grades.exists():
-            average_grade = all_grades.aggregate(
-                avg_grade=Avg('marks_obtained')
-            )['avg_grade'] or 0
-        else:
-            average_grade = 0
-        
-        print(f"Average grade: {average_grade}")
-        
-        # Get recent grades (last 10)
-        recent_grades = all_grades.order_by('-graded_at')[:10]
-        
-        # Count at-risk courses - simplified to avoid potential issues
-        print("Getting predictions...")
-        try:
-            at_risk_courses = PerformancePrediction.objects.filter(
-                student=student_profile,
-                at_risk=True
-            ).count()
-        except Exception as e:
-            print(f"Error getting predictions: {e}")
-            at_risk_courses = 0
-        
-        # Get active study goals - simplified to avoid potential issues
-        print("Getting goals...")
-        try:
-            active_goals = StudyGoal.objects.filter(
-                student=student_profile,
-                status='active'
-            )[:5]
-        except Exception as e:
-            print(f"Error getting goals: {e}")
-            active_goals = []
-        
-        # Count total courses and assessments
-        print("Getting enrollments...")
-        total_courses = student_profile.enrollments.filter(is_active=True).count()
-        completed_assessments = all_grades.count()
-        
-        print("Preparing response data...")
-        data = {
-            'average_grade': float(average_grade),
-            'total_courses': total_courses,
-            'completed_assessments': completed_assessments,
-            'at_risk_courses': at_risk_courses,
-            'recent_grades': [
-                {
-                    'assessment': grade.assessment.title,
-                    'course': grade.assessment.course.name,
-                    'marks_obtained': float(grade.marks_obtained),
-                    'total_marks': float(grade.assessment.total_marks),
-                    'percentage': float((grade.marks_obtained / grade.assessment.total_marks) * 100),
-                    'graded_at': grade.graded_at.isoformat()
-                }
-                for grade in recent_grades
-            ],
-            'active_goals': [
-                {
-                    'title': goal.title,
-                    'description': goal.description,
-                    'target_date': goal.target_date.isoformat(),
-                    'progress': goal.progress
-                }
-                for goal in active_goals
-            ]
-        }
-        
-        print("Returning response...")
-        return Response(data, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        print(f"Error in performance_summary: {e}")
-        import traceback
-        traceback.print_exc()
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if not request.user.is_student:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    data = cached_performance_summary(request.user.student_profile)
+    return Response(data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -254,6 +179,7 @@ def generate_prediction(request, student_id, course_id):
                 'risk_factors': prediction_data['risk_factors'],
                 'recommendations': prediction_data['recommendations'],
                 'features_used': prediction_data['features_used'],
+                'model_version': prediction_data['model_version'],
             }
         )
         
@@ -309,12 +235,62 @@ def teacher_performance_dashboard(request):
     from apps.courses.models import Course, Enrollment
     
     # Get teacher's courses
-    courses = Course.objects.filter(instructor=request.user, is_active=True)
+    courses = list(Course.objects.filter(instructor=request.user, is_active=True))
+    course_ids = [course.id for course in courses]
+    
+    # Every per-course figure below comes from one grouped query over all courses,
+    # so the query count does not grow with the number of courses or assessments.
+    student_counts = dict(
+        Enrollment.objects.filter(course_id__in=course_ids, is_active=True)
+        .values('course_id').annotate(n=Count('id')).order_by()
+        .values_list('course_id', 'n')
+    )
+    assessment_counts = dict(
+        Assessment.objects.filter(course_id__in=course_ids)
+        .values('course_id').annotate(n=Count('id')).order_by()
+        .values_list('course_id', 'n')
+    )
+    grade_stats = {
+        row['assessment__course_id']: row
+        for row in Grade.objects.filter(assessment__course_id__in=course_ids)
+        .values('assessment__course_id')
+        .annotate(total=Count('id'), avg=Avg('marks_obtained')).order_by()
+    }
+    
+    # Pending grades: (active enrollment, assessment) pairs of the same course
+    # with no matching grade row (anti-join of Enrollment against Grade).
+    pending_counts = dict(
+        Enrollment.objects.filter(course_id__in=course_ids, is_active=True)
+        .annotate(assessment_id=F('course__assessments__id'))
+        .filter(assessment_id__isnull=False)
+        .filter(~Exists(Grade.objects.filter(
+            student_id=OuterRef('student_id'),
+            assessment_id=OuterRef('assessment_id'),
+        )))
+        .values('course_id').annotate(n=Count('id')).order_by()
+        .values_list('course_id', 'n')
+    )
+    
+    # Three most recent assessments per course in a single windowed query
+    recent_assessments = {}
+    for row in (
+        Assessment.objects.filter(course_id__in=course_ids)
+        .annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('course_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ))
+        .filter(row_number__lte=3)
+        .order_by('course_id', 'row_number')
+        .values('id', 'title', 'assessment_type', 'due_date', 'course_id')
+    ):
+        course_id = row.pop('course_id')
+        recent_assessments.setdefault(course_id, []).append(row)
     
     dashboard_data = {
         'courses': [],
         'summary': {
-            'total_courses': courses.count(),
+            'total_courses': len(courses),
             'total_students': 0,
             'total_assessments': 0,
             'pending_grades': 0,
@@ -326,41 +302,27 @@ def teacher_performance_dashboard(request):
     course_count = 0
     
     for course in courses:
-        # Get enrolled students
-        enrollments = Enrollment.objects.filter(course=course, is_active=True)
-        student_count = enrollments.count()
-        
-        # Get assessments for this course
-        assessments = Assessment.objects.filter(course=course)
-        
-        # Get grades for this course
-        grades = Grade.objects.filter(assessment__course=course)
-        
-        # Calculate course average
-        course_avg = grades.aggregate(avg=Avg('marks_obtained'))['avg'] or 0
-        
-        # Count pending grades (assessments without grades for enrolled students)
-        pending_count = 0
-        for assessment in assessments:
-            graded_students = Grade.objects.filter(assessment=assessment).values_list('student_id', flat=True)
-            enrolled_student_ids = enrollments.values_list('student_id', flat=True)
-            pending_count += len(set(enrolled_student_ids) - set(graded_students))
+        student_count = student_counts.get(course.id, 0)
+        assessment_count = assessment_counts.get(course.id, 0)
+        pending_count = pending_counts.get(course.id, 0)
+        stats = grade_stats.get(course.id, {})
+        course_avg = stats.get('avg') or 0
         
         course_data = {
             'id': course.id,
             'name': course.name,
             'code': course.code,
             'student_count': student_count,
-            'assessment_count': assessments.count(),
-            'total_grades': grades.count(),
+            'assessment_count': assessment_count,
+            'total_grades': stats.get('total', 0),
             'pending_grades': pending_count,
             'average_performance': round(course_avg, 2),
-            'recent_assessments': assessments.order_by('-created_at')[:3].values('id', 'title', 'assessment_type', 'due_date')
+            'recent_assessments': recent_assessments.get(course.id, [])
         }
         
         dashboard_data['courses'].append(course_data)
         dashboard_data['summary']['total_students'] += student_count
-        dashboard_data['summary']['total_assessments'] += assessments.count()
+        dashboard_data['summary']['total_assessments'] += assessment_count
         dashboard_data['summary']['pending_grades'] += pending_count
         
         if course_avg > 0:
@@ -390,65 +352,24 @@ def record_student_grades(request):
         return Response({'error': 'Assessment not found or access denied'}, 
                        status=status.HTTP_404_NOT_FOUND)
     
-    created_grades = []
-    updated_grades = []
-    errors = []
+    rows = [
+        {
+            'student_id': grade_item.get('student_id'),
+            'score': grade_item.get('score'),
+            'feedback': grade_item.get('feedback', '')
+        }
+        for grade_item in grades_data
+    ]
     
-    for grade_item in grades_data:
-        student_id = grade_item.get('student_id')
-        score = grade_item.get('score')
-        feedback = grade_item.get('feedback', '')
-        
-        try:
-            student = StudentProfile.objects.get(id=student_id)
-            
-            # Validate score
-            if score is None or score < 0 or score > assessment.total_marks:
-                errors.append(f"Invalid score for student {student.user.get_full_name()}")
-                continue
-            
-            # Create or update grade
-            grade, created = Grade.objects.get_or_create(
-                student=student,
-                assessment=assessment,
-                defaults={
-                    'marks_obtained': score,
-                    'feedback': feedback,
-                    'graded_by': request.user
-                }
-            )
-            
-            if created:
-                created_grades.append(grade)
-            else:
-                # Update existing grade
-                grade.marks_obtained = score
-                grade.feedback = feedback
-                grade.graded_by = request.user
-                grade.save()
-                updated_grades.append(grade)
-                
-        except StudentProfile.DoesNotExist:
-            errors.append(f"Student with ID {student_id} not found")
-            continue
-        except Exception as e:
-            errors.append(f"Error processing student {student_id}: {str(e)}")
-            continue
-    
-    # Send notifications for new grades
-    if created_grades:
-        from apps.notifications.services import NotificationService
-        notification_service = NotificationService()
-        
-        for grade in created_grades:
-            notification_service.send_grade_notification(grade)
+    # Validate against the roster and upsert the whole batch at once
+    result = GradeIngestionService(assessment, graded_by=request.user).ingest(rows)
     
     return Response({
         'message': 'Grades recorded successfully',
-        'created_grades': len(created_grades),
-        'updated_grades': len(updated_grades),
-        'errors': errors,
-        'total_processed': len(created_grades) + len(updated_grades)
+        'created_grades': result['created'],
+        'updated_grades': result['updated'],
+        'errors': result['errors'],
+        'total_processed': result['created'] + result['updated']
     })
 
 @api_view(['POST'])
@@ -480,33 +401,23 @@ def create_assessment_with_grading(request):
     
     assessment = assessment_serializer.save()
     
-    # Add grades if provided
-    created_grades = []
+    # Add grades if provided; rows with unknown students or invalid scores are skipped
+    grades_created = 0
     if grades_data:
-        for grade_item in grades_data:
-            student_id = grade_item.get('student_id')
-            score = grade_item.get('score')
-            feedback = grade_item.get('feedback', '')
-            
-            try:
-                student = StudentProfile.objects.get(id=student_id)
-                
-                if score is not None and 0 <= score <= assessment.total_marks:
-                    grade = Grade.objects.create(
-                        student=student,
-                        assessment=assessment,
-                        marks_obtained=score,
-                        feedback=feedback,
-                        graded_by=request.user
-                    )
-                    created_grades.append(grade)
-                    
-            except StudentProfile.DoesNotExist:
-                continue
+        rows = [
+            {
+                'student_id': grade_item.get('student_id'),
+                'score': grade_item.get('score'),
+                'feedback': grade_item.get('feedback', '')
+            }
+            for grade_item in grades_data
+        ]
+        result = GradeIngestionService(assessment, graded_by=request.user).ingest(rows)
+        grades_created = result['created']
     
     return Response({
         'assessment': AssessmentSerializer(assessment).data,
-        'grades_created': len(created_grades),
+        'grades_created': grades_created,
         'message': 'Assessment created successfully'
     })
 
@@ -525,10 +436,11 @@ def teacher_performance_records(request):
     date_to = request.query_params.get('date_to')
     min_score = request.query_params.get('min_score')
     max_score = request.query_params.get('max_score')
+    letter_grade = request.query_params.get('letter_grade')
     export_format = request.query_params.get('export', '')  # 'csv' or 'excel'
     
-    # Base queryset - only teacher's courses
-    queryset = Grade.objects.filter(assessment__course__instructor=request.user)
+    # Base queryset - only teacher's courses, with percentage and letter grade computed in SQL
+    queryset = Grade.objects.with_grading().filter(assessment__course__instructor=request.user)
     
     # Apply filters
     if course_id:
@@ -536,66 +448,57 @@ def teacher_performance_records(request):
     if assessment_id:
         queryset = queryset.filter(assessment_id=assessment_id)
     if date_from:
-        queryset = queryset.filter(created_at__gte=date_from)
+        queryset = queryset.filter(graded_at__gte=date_from)
     if date_to:
-        queryset = queryset.filter(created_at__lte=date_to)
+        queryset = queryset.filter(graded_at__lte=date_to)
     if min_score:
         queryset = queryset.filter(marks_obtained__gte=min_score)
     if max_score:
         queryset = queryset.filter(marks_obtained__lte=max_score)
+    if letter_grade:
+        queryset = queryset.filter(grade_letter=letter_grade)
     
     queryset = queryset.select_related(
         'student__user', 'assessment__course', 'graded_by'
-    ).order_by('-created_at', 'assessment__course__name', 'student__user__last_name')
+    ).order_by(*PERFORMANCE_RECORDS_ORDERING)
     
-    # If export is requested, return CSV data
+    # If export is requested, stream CSV data
     if export_format == 'csv':
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="performance_records.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Date', 'Course', 'Assessment', 'Student Name', 'Student ID', 
-            'Score', 'Max Score', 'Percentage', 'Feedback', 'Graded By'
-        ])
-        
-        for grade in queryset:
-            percentage = (grade.marks_obtained / grade.assessment.total_marks * 100) if grade.assessment.total_marks > 0 else 0
-            writer.writerow([
-                grade.created_at.date(),
-                grade.assessment.course.name,
-                grade.assessment.title,
-                grade.student.user.get_full_name(),
-                grade.student.student_id,
-                grade.marks_obtained,
-                grade.assessment.total_marks,
-                f"{percentage:.1f}%",
-                grade.feedback,
-                grade.graded_by.get_full_name() if grade.graded_by else ''
-            ])
-        
-        return response
+        return stream_performance_csv(queryset)
     
     # Regular JSON response with pagination
     page_size = int(request.query_params.get('page_size', 50))
-    page = int(request.query_params.get('page', 1))
-    
-    start = (page - 1) * page_size
-    end = start + page_size
     
-    grades = queryset[start:end]
-    total_count = queryset.count()
+    if request.query_params.get('pagination') == 'cursor':
+        paginator = KeysetPaginator(PERFORMANCE_RECORDS_ORDERING, page_size, salt='performance-records')
+        try:
+            grades, pagination = paginator.paginate(queryset, request.query_params.get('cursor'))
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('include_total') == 'true':
+            pagination['estimated_total'] = estimated_count(queryset)
+    else:
+        page = int(request.query_params.get('page', 1))
+        
+        start = (page - 1) * page_size
+        end = start + page_size
+        
+        grades = queryset[start:end]
+        total_count = queryset.count()
+        pagination = {
+            'current_page': page,
+            'page_size': page_size,
+            'total_records': total_count,
+            'total_pages': (total_count + page_size - 1) // page_size,
+            'has_next': end < total_count,
+            'has_previous': page > 1
+        }
     
     data = []
     for grade in grades:
-        percentage = (grade.marks_obtained / grade.assessment.total_marks * 100) if grade.assessment.total_marks > 0 else 0
-        
         data.append({
             'id': grade.id,
-            'created_at': grade.created_at,
+            'created_at': grade.graded_at,
             'course': {
                 'id': grade.assessment.course.id,
                 'name': grade.assessment.course.name,
@@ -615,16 +518,16 @@ def teacher_performance_records(request):
                 'email': grade.student.user.email
             },
             'score': grade.marks_obtained,
-            'percentage': round(percentage, 1),
+            'percentage': round(grade.grade_percentage, 1),
+            'letter_grade': grade.grade_letter,
             'feedback': grade.feedback,
             'graded_by': grade.graded_by.get_full_name() if grade.graded_by else None
         })
     
-    # Calculate summary statistics
-    summary = queryset.aggregate(
-        total_grades=Count('id'),
-        avg_score=Avg('marks_obtained'),
-        avg_percentage=Avg('marks_obtained') * 100 / queryset.first().assessment.total_marks if queryset.exists() else 0
+    # Calculate summary statistics; percentages are per grade against its own assessment
+    summary = percentage_statistics(queryset)
+    letter_distribution = dict(
+        queryset.values_list('grade_letter').annotate(count=Count('id')).order_by()
     )
     
     return Response({
@@ -632,16 +535,14 @@ def teacher_performance_records(request):
         'summary': {
             'total_grades': summary['total_grades'] or 0,
             'average_score': round(summary['avg_score'] or 0, 2),
-            'average_percentage': round(summary['avg_percentage'] or 0, 1)
+            'average_percentage': round(summary['avg_percentage'] or 0, 1),
+            'median_percentage': round(summary['median_percentage'] or 0, 1),
+            'p10_percentage': round(summary['p10_percentage'] or 0, 1),
+            'p90_percentage': round(summary['p90_percentage'] or 0, 1),
+            'stddev_percentage': round(summary['stddev_percentage'] or 0, 1),
+            'letter_grade_distribution': letter_distribution
         },
-        'pagination': {
-            'current_page': page,
-            'page_size': page_size,
-            'total_records': total_count,
-            'total_pages': (total_count + page_size - 1) // page_size,
-            'has_next': end < total_count,
-            'has_previous': page > 1
-        }
+        'pagination': pagination
     })
 
 
@@ -694,48 +595,27 @@ def record_performance(request):
         }
     )
     
-    created_grades = []
-    updated_grades = []
+    rows = [
+        {
+            'student_id': grade_item.get('student_id'),
+            # Accept both 'score' and 'marks_obtained' field names
+            'score': grade_item.get('marks_obtained') or grade_item.get('score', 0),
+            # Accept both 'feedback' and 'comments' field names
+            'feedback': grade_item.get('comments') or grade_item.get('feedback', '')
+        }
+        for grade_item in grades_data
+    ]
     
-    for grade_item in grades_data:
-        student_id = grade_item.get('student_id')
-        # Accept both 'score' and 'marks_obtained' field names
-        score = grade_item.get('marks_obtained') or grade_item.get('score', 0)
-        # Accept both 'feedback' and 'comments' field names  
-        feedback = grade_item.get('comments') or grade_item.get('feedback', '')
-        
-        try:
-            student = StudentProfile.objects.get(id=student_id)
-            
-            grade, was_created = Grade.objects.get_or_create(
-                student=student,
-                assessment=assessment,
-                defaults={
-                    'marks_obtained': score,
-                    'feedback': feedback,
-                    'graded_by': request.user,
-                    'is_published': True
-                }
-            )
-            
-            if was_created:
-                created_grades.append(grade)
-            else:
-                grade.marks_obtained = score
-                grade.feedback = feedback
-                grade.graded_by = request.user
-                grade.save()
-                updated_grades.append(grade)
-                
-        except StudentProfile.DoesNotExist:
-            continue
+    result = GradeIngestionService(assessment, graded_by=request.user).ingest(
+        rows, publish=True, validate_scores=False
+    )
     
     return Response({
         'message': 'Performance recorded successfully',
         'assessment_id': assessment.id,
-        'created_grades': len(created_grades),
-        'updated_grades': len(updated_grades),
-        'total_processed': len(created_grades) + len(updated_grades)
+        'created_grades': result['created'],
+        'updated_grades': result['updated'],
+        'total_processed': result['created'] + result['updated']
     })
 
 
@@ -753,88 +633,18 @@ def course_performance(request, course_id):
         return Response({'error': 'Course not found or access denied'}, 
                        status=status.HTTP_404_NOT_FOUND)
     
-    from apps.courses.models import Enrollment
-    
     # Get assessment type filter
     assessment_type = request.query_params.get('assessment_type')
     
-    # Get assessments for this course
-    assessments_qs = Assessment.objects.filter(course=course).order_by('-created_at')
-    
-    # Filter by assessment type (ignore 'undefined', 'all', or empty values)
-    if assessment_type and assessment_type not in ('undefined', 'all', ''):
-        assessments_qs = assessments_qs.filter(assessment_type=assessment_type)
-    
-    # Get enrolled students
-    enrollments = Enrollment.objects.filter(course=course, is_active=True).select_related('student__user')
-    students = []
-    for enrollment in enrollments:
-        # Get student's grades for this course
-        student_grades = Grade.objects.filter(
-            student=enrollment.student,
-            assessment__course=course
-        )
-        avg_score = student_grades.aggregate(avg=Avg('marks_obtained'))['avg'] or 0
-        
-        students.append({
-            'id': enrollment.student.id,
-            'name': enrollment.student.user.get_full_name(),
-            'student_id': enrollment.student.student_id,
-            'email': enrollment.student.user.email,
-            'total_assessments': student_grades.count(),
-            'average_score': round(avg_score, 2)
-        })
+    # Ignore 'undefined', 'all', or empty values
+    if assessment_type in ('undefined', 'all', ''):
+        assessment_type = None
     
-    # Build assessments with grades
-    assessments_data = []
-    for assessment in assessments_qs[:50]:  # Limit to 50 assessments
-        grades = Grade.objects.filter(assessment=assessment).select_related('student__user')
-        
-        performance_list = []
-        for grade in grades:
-            percentage = (grade.marks_obtained / assessment.total_marks * 100) if assessment.total_marks > 0 else 0
-            # Calculate letter grade
-            if percentage >= 90:
-                letter_grade = 'A+'
-            elif percentage >= 85:
-                letter_grade = 'A'
-            elif percentage >= 80:
-                letter_grade = 'B+'
-            elif percentage >= 75:
-                letter_grade = 'B'
-            elif percentage >= 70:
-                letter_grade = 'C+'
-            elif percentage >= 65:
-                letter_grade = 'C'
-            elif percentage >= 60:
-                letter_grade = 'D'
-            else:
-                letter_grade = 'F'
-            
-            performance_list.append({
-                'student_id': grade.student.student_id,
-                'student_name': grade.student.user.get_full_name(),
-                'marks_obtained': float(grade.marks_obtained),
-                'percentage': round(percentage, 1),
-                'grade': letter_grade,
-                'comments': grade.feedback or ''
-            })
-        
-        avg_score = grades.aggregate(avg=Avg('marks_obtained'))['avg'] or 0
-        
-        assessments_data.append({
-            'id': assessment.id,
-            'assessment_name': assessment.title,
-            'assessment_type': assessment.assessment_type,
-            'total_marks': float(assessment.total_marks),
-            'due_date': assessment.due_date,
-            'created_at': assessment.created_at,
-            'performance': performance_list,
-            'total_students': len(students),
-            'graded_count': len(performance_list),
-            'average_score': round(avg_score, 2),
-            'average_percentage': round((avg_score / assessment.total_marks * 100) if assessment.total_marks > 0 else 0, 1)
-        })
+    # Load the whole course gradebook in a few queries and compute
+    # per-student and per-assessment statistics in memory
+    gradebook = CourseGradebook(course)
+    students = gradebook.student_rows()
+    assessments_data = gradebook.assessment_rows(assessment_type=assessment_type, limit=50)
     
     return Response({
         'course': {
@@ -849,12 +659,15 @@ def course_performance(request, course_id):
 
 # ─── Gemini AI Prediction Endpoints ──────────────────────────────────
 
-@api_view(['GET'])
+@api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
 def ai_predict_course(request, course_id):
     """
-    Generate AI predictions for all students in a course.
+    Queue AI predictions for all students in a course.
     Teachers only. Uses Gemini to analyse performance + attendance data.
+
+    The prediction runs as a background job; poll the returned status_url
+    for progress and the result.
     """
     if not request.user.is_teacher:
         return Response(
@@ -862,21 +675,48 @@ def ai_predict_course(request, course_id):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    try:
-        result = predict_course_performance(course_id, request.user)
-        if result.get('error'):
-            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return Response(result, status=status.HTTP_200_OK)
-    except Course.DoesNotExist:
+    course = Course.objects.filter(id=course_id, instructor=request.user).first()
+    if course is None:
         return Response(
             {'error': 'Course not found or access denied.'},
             status=status.HTTP_404_NOT_FOUND,
         )
-    except Exception as e:
+
+    job, _ = enqueue_course_prediction(course, request.user)
+    return Response(_job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+
+def _job_payload(request, job):
+    payload = {
+        'job_id': str(job.id),
+        'course_id': job.course_id,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.progress_message,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('api:performance:ai-prediction-job', args=[job.id])),
+    }
+    if job.status == 'succeeded':
+        payload['result'] = job.result
+    elif job.status == 'failed':
+        payload['error'] = job.error
+        payload['result'] = job.result
+    return payload
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def ai_prediction_job(request, job_id):
+    """Status, progress and (once finished) result of a queued course prediction"""
+    job = PredictionJob.objects.filter(id=job_id, requested_by=request.user).first()
+    if job is None:
         return Response(
-            {'error': f'Prediction failed: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {'error': 'Prediction job not found.'},
+            status=status.HTTP_404_NOT_FOUND,
         )
+    return Response(_job_payload(request, job))
 
 
 @api_view(['GET'])
@@ -959,4 +799,5 @@ def ai_performance_chat(request):
 
     return Response({
         'response': result['response'],
+        'source': result['source'],
     }, status=status.HTTP_200_OK)
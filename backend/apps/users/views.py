@@ -531,7 +531,7 @@ def course_students_detail(request, course_id):
                        status=status.HTTP_403_FORBIDDEN)
     
     from apps.courses.models import Course, Enrollment
-    from apps.performance.models import Grade, Assessment
+    from apps.performance.models import GradeSummary
     from apps.attendance.models import AttendanceRecord
     
     try:
@@ -547,24 +547,20 @@ def course_students_detail(request, course_id):
         is_active=True
     ).select_related('student__user')
     
+    # Grade aggregates for every student in the course in one lookup
+    grade_summaries = {
+        summary.student_id: summary
+        for summary in GradeSummary.objects.filter(course=course)
+    }
+    
     students_data = []
     for enrollment in enrollments:
         student = enrollment.student
         
-        # Get student's grades for this course
-        grades = Grade.objects.filter(
-            student=student,
-            assessment__course=course,
-            is_published=True
-        )
-        
-        # Calculate average grade
-        if grades.exists():
-            avg_grade = sum(g.marks_obtained for g in grades) / len(grades)
-            total_assessments = grades.count()
-        else:
-            avg_grade = 0
-            total_assessments = 0
+        # Average grade over the student's published grades
+        summary = grade_summaries.get(student.id)
+        avg_grade = summary.average_marks if summary else 0
+        total_assessments = summary.published_count if summary else 0
         
         # Get attendance records
         attendance_records = AttendanceRecord.objects.filter(
@@ -585,7 +581,7 @@ def course_students_detail(request, course_id):
             'name': student.user.get_full_name(),
             'email': student.user.email,
             'student_id': student.student_id,
-            'enrollment_date': enrollment.enrolled_at,
+            'enrollment_date': enrollment.enrollment_date,
             'performance': {
                 'average_grade': round(avg_grade, 2),
                 'total_assessments': total_assessments,
@@ -130,6 +130,25 @@ else:
     }
 
 
+# Cache
+# A shared Redis cache keeps cached documents and their invalidation versions
+# consistent across gunicorn workers; without REDIS_URL each process keeps its own.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -233,6 +252,30 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'BrightPath <noreply@brightpath.edu>')
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 
+# Performance prediction
+# Estimator trained by PerformancePredictor: a key of apps.performance.estimators.ESTIMATORS
+# (random_forest, hist_gradient_boosting, ridge, or sgd: the only one online updates can extend).
+PERFORMANCE_ESTIMATOR = os.environ.get('PERFORMANCE_ESTIMATOR', 'random_forest')
+# Seconds a feature snapshot may stand in for live feature extraction (0, the
+# default, disables reuse). Snapshots older than the enrollment's last grade
+# change are never reused.
+FEATURE_SNAPSHOT_MAX_AGE = int(os.environ.get('FEATURE_SNAPSHOT_MAX_AGE', 0))
+# Threads per web process running queued AI course predictions
+# (0 leaves them to the run_prediction_jobs command).
+PREDICTION_JOB_THREADS = int(os.environ.get('PREDICTION_JOB_THREADS', 2))
+# Gemini requests in flight at once for one chunked course prediction.
+GEMINI_CHUNK_CONCURRENCY = int(os.environ.get('GEMINI_CHUNK_CONCURRENCY', 4))
+# Gemini request quota shared by all workers, and seconds the circuit breaker
+# stays open before probing again (see apps/performance/provider_guard.py).
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 15))
+GEMINI_CIRCUIT_COOLDOWN = int(os.environ.get('GEMINI_CIRCUIT_COOLDOWN', 30))
+# Seconds AI endpoints wait for Gemini before answering from the local model
+# or fallback heuristics (0 waits indefinitely).
+AI_LATENCY_BUDGETS = {
+    'student_prediction': float(os.environ.get('AI_STUDENT_PREDICTION_BUDGET', 8)),
+    'chat': float(os.environ.get('AI_CHAT_BUDGET', 12)),
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
@@ -0,0 +1,80 @@
+"""
+Benchmark single-row inference: sklearn versus the compiled forest
+"""
+import os
+import sys
+import time
+import django
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+# Add the project directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from apps.performance.compiled_forest import compile_forest
+from apps.performance.ml_utils import FEATURE_COLUMNS
+from ml.utils import generate_synthetic_training_data
+
+
+def synthetic_model(n_samples=2000, n_estimators=100, seed=42):
+    """Fit a forest shaped like the production model on synthetic features"""
+    df = generate_synthetic_training_data(n_samples, random_state=seed)
+    X, y = df[FEATURE_COLUMNS], df['final_grade']
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=seed).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+def time_per_row(predict_row, rows):
+    """Median latency of predict_row over rows, in microseconds"""
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        predict_row(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1e6
+
+
+def benchmark(rows=500, n_estimators=100):
+    """Compare per-row latency and agreement of both inference paths"""
+    model, scaler, X = synthetic_model(n_estimators=n_estimators)
+    compiled = compile_forest(model, scaler)
+    samples = X.sample(rows, random_state=0)
+    feature_dicts = samples.to_dict('records')
+
+    # The request-time path in PerformancePredictor.predict before compilation
+    def sklearn_row(features):
+        return model.predict(scaler.transform(pd.DataFrame([features]).fillna(0)))[0]
+
+    def compiled_row(features):
+        return compiled.predict_one(np.fromiter(features.values(), dtype=np.float64))
+
+    expected = model.predict(scaler.transform(samples))
+    max_error = float(np.abs(compiled.predict(samples.to_numpy()) - expected).max())
+
+    sklearn_us = time_per_row(sklearn_row, feature_dicts)
+    compiled_us = time_per_row(compiled_row, feature_dicts)
+
+    print(f"Forest: {n_estimators} trees, max depth {compiled.max_depth}, {len(compiled.value)} nodes")
+    print(f"sklearn:  {sklearn_us:9.1f} us/row")
+    print(f"compiled: {compiled_us:9.1f} us/row ({sklearn_us / compiled_us:.1f}x faster)")
+    print(f"Max absolute difference: {max_error:.2e}")
+
+    return {'sklearn_us': sklearn_us, 'compiled_us': compiled_us, 'max_error': max_error}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark compiled forest inference')
+    parser.add_argument('--rows', type=int, default=500, help='Rows to time')
+    parser.add_argument('--trees', type=int, default=100, help='Trees in the synthetic forest')
+
+    args = parser.parse_args()
+    benchmark(rows=args.rows, n_estimators=args.trees)
@@ -12,7 +12,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from apps.performance.ml_utils import PerformancePredictor, update_predictions
+from apps.performance.ml_utils import PerformancePredictor
+from apps.performance.refresh import refresh_predictions
 from apps.students.models import StudentProfile
 from apps.courses.models import Course, Enrollment
 
@@ -45,13 +46,16 @@ def predict_single_student(student_id, course_id):
         print(f"Error generating prediction: {e}")
 
 
-def predict_all_active():
+def predict_all_active(workers=None, checkpoint=None, resume=False):
     """Generate predictions for all active enrollments"""
     print("Generating predictions for all active enrollments...")
     
     try:
-        update_predictions()
-        print("All predictions updated successfully")
+        stats = refresh_predictions(workers=workers, checkpoint=checkpoint, resume=resume, progress=print)
+        print(f"Updated {stats['rows']} predictions in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:.1f} rows/sec)")
+        if stats['failed_courses']:
+            print(f"{len(stats['failed_courses'])} courses failed; rerun with --resume")
     except Exception as e:
         print(f"Error updating predictions: {e}")
 
@@ -94,6 +98,9 @@ if __name__ == "__main__":
                        default='all', help='Action to perform')
     parser.add_argument('--student-id', type=int, help='Student ID for single prediction')
     parser.add_argument('--course-id', type=int, help='Course ID for single prediction')
+    parser.add_argument('--workers', type=int, help='Worker processes for --action all (0 runs in-process)')
+    parser.add_argument('--checkpoint', help='Checkpoint file for --action all')
+    parser.add_argument('--resume', action='store_true', help='Resume --action all from the checkpoint')
     
     args = parser.parse_args()
     
@@ -103,7 +110,7 @@ if __name__ == "__main__":
         else:
             print("Please provide both --student-id and --course-id for single prediction")
     elif args.action == 'all':
-        predict_all_active()
+        predict_all_active(args.workers, args.checkpoint, args.resume)
     elif args.action == 'at-risk':
         show_at_risk_students()
     elif args.action == 'list-students':
@@ -2,7 +2,10 @@
 Training script for the student performance prediction model
 """
 import os
+import resource
 import sys
+import time
+import tracemalloc
 import django
 import pandas as pd
 import numpy as np
@@ -19,18 +22,37 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from apps.performance.ml_utils import PerformancePredictor
+from django.conf import settings
 
+from apps.performance.estimators import ESTIMATORS
+from apps.performance.ml_utils import FEATURE_COLUMNS, PerformancePredictor
+from apps.performance.model_registry import get_registry
+from apps.performance.online import latest_checkpoint
+from apps.performance.search import STRATEGIES
+from apps.performance.snapshots import snapshot_training_frame
+from ml.utils import (
+    create_training_report, generate_synthetic_training_data, load_model_metadata, save_model_metadata
+)
 
-def train_model():
-    """Train the performance prediction model"""
+
+def train_model(estimator=None, search=None, features='snapshots', lead_days=0):
+    """Train the performance prediction model, optionally with a hyperparameter search"""
     print("Starting model training...")
     
-    predictor = PerformancePredictor()
+    predictor = PerformancePredictor(estimator)
+    print(f"Estimator: {predictor.estimator}")
     
     # Prepare training data
     print("Preparing training data...")
-    df = predictor.prepare_training_data()
+    snapshot_df = checkpoint = None
+    if features == 'snapshots':
+        # Rows finished after this point are left to online updates
+        checkpoint = latest_checkpoint()
+        snapshot_df = snapshot_training_frame(lead_days=lead_days)
+        if snapshot_df.empty:
+            print("No feature snapshots of finished enrollments; computing features from live data")
+            snapshot_df = None
+    df = snapshot_df if snapshot_df is not None else predictor.prepare_training_data()
     
     if df.empty:
         print("No training data available. Please ensure you have completed enrollments with grades.")
@@ -40,11 +62,11 @@ def train_model():
     print(f"Features: {list(df.columns)}")
     
     # Train the model
-    success = predictor.train_model()
+    success = predictor.train_model(snapshot_df, search=search, checkpoint=checkpoint)
     
     if success:
         print("Model trained successfully!")
-        print(f"Model saved to: {predictor.model_path}")
+        print(f"Model version {predictor.model_version} saved to: {predictor.model_path}")
     else:
         print("Model training failed.")
     
@@ -70,33 +92,163 @@ def generate_sample_data():
     """)
 
 
-def evaluate_model():
-    """Evaluate the trained model"""
-    predictor = PerformancePredictor()
-    
+def _measure(func, *args):
+    """Run func, returning its result, wall time in seconds and peak traced memory in MB"""
+    tracemalloc.start()
+    started = time.perf_counter()
     try:
-        predictor.load_model()
-        print("Model loaded successfully")
-        
-        # You could add evaluation logic here
-        print("Model evaluation would go here...")
-        
-    except Exception as e:
-        print(f"Error loading model: {e}")
+        result = func(*args)
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def evaluate_model(n_samples=5000, output_dir=None, latency_rows=200, random_state=42, estimator=None):
+    """
+    Train on a synthetic dataset and report training and inference cost.
+    
+    The model is published to its own registry under output_dir (default:
+    ml/benchmarks), never to the production model directory, and the report
+    is written next to its model file.
+    
+    Returns:
+        The report dictionary, or None if training failed
+    """
+    output_dir = output_dir or os.path.join(settings.BASE_DIR, 'ml', 'benchmarks')
+    predictor = PerformancePredictor(estimator)
+    predictor.model_path = output_dir
+    print(f"Evaluating {predictor.estimator} on {n_samples} synthetic samples...")
+    
+    df = generate_synthetic_training_data(n_samples, random_state=random_state)
+    
+    trained, train_seconds, train_peak_mb = _measure(predictor.train_model, df)
+    if not trained:
+        print("Model training failed.")
+        return None
+    
+    X = df[FEATURE_COLUMNS]
+    rows = X.sample(min(latency_rows, len(X)), random_state=random_state).to_dict('records')
+    latencies = []
+    for features in rows:
+        started = time.perf_counter()
+        predictor.predict(None, None, features=features)
+        latencies.append(time.perf_counter() - started)
+    
+    _, batch_seconds, batch_peak_mb = _measure(predictor.predict_batch, X)
+    
+    model_file = get_registry(output_dir).model_file(predictor.model_version)
+    version_dir = os.path.dirname(model_file)
+    model_bytes = sum(
+        os.path.getsize(os.path.join(version_dir, name))
+        for name in os.listdir(version_dir) if name.endswith('.joblib')
+    )
+    
+    X_test, y_test = predictor.holdout
+    report = create_training_report(predictor.model, X_test, y_test, FEATURE_COLUMNS)
+    report.update({
+        'estimator': predictor.estimator,
+        'model_version': predictor.model_version,
+        'model_size_mb': round(model_bytes / 2**20, 3),
+        'dataset': {'synthetic': True, 'samples': n_samples, 'random_state': random_state},
+        'benchmark': {
+            'train_seconds': round(train_seconds, 3),
+            'train_peak_memory_mb': round(train_peak_mb, 1),
+            'single_row_latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)) * 1000, 3),
+                'p95': round(float(np.percentile(latencies, 95)) * 1000, 3),
+            },
+            'batch_rows': len(X),
+            'batch_seconds': round(batch_seconds, 3),
+            'batch_rows_per_second': round(len(X) / batch_seconds, 1),
+            'batch_peak_memory_mb': round(batch_peak_mb, 1),
+            # ru_maxrss is in kilobytes on Linux
+            'process_peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    })
+    
+    benchmark = report['benchmark']
+    print(f"Training: {benchmark['train_seconds']:.2f}s, peak {benchmark['train_peak_memory_mb']:.1f} MB, "
+          f"model size {report['model_size_mb']:.2f} MB")
+    print(f"Single-row latency: p50 {benchmark['single_row_latency_ms']['p50']:.2f} ms, "
+          f"p95 {benchmark['single_row_latency_ms']['p95']:.2f} ms")
+    print(f"Batch inference: {benchmark['batch_rows_per_second']:.0f} rows/sec, "
+          f"peak {benchmark['batch_peak_memory_mb']:.1f} MB")
+    print(f"Test MSE: {report['mse']:.2f}, R²: {report['r2_score']:.3f}")
+    for item in report['feature_importance'][:5]:
+        print(f"  {item['feature']}: {item['importance']:.3f}")
+    
+    # Keep the metadata the registry wrote when the version was published
+    save_model_metadata(model_file, {**(load_model_metadata(model_file) or {}), **report})
+    return report
+
+
+def compare_estimators(estimators=None, n_samples=5000, output_dir=None, random_state=42):
+    """
+    Evaluate several estimators on the same synthetic dataset and tabulate the results.
+    
+    Returns:
+        Dict of estimator name to its evaluation report
+    """
+    reports = {}
+    for name in estimators or ESTIMATORS:
+        report = evaluate_model(n_samples, output_dir=output_dir, random_state=random_state, estimator=name)
+        if report:
+            reports[name] = report
+        print()
+    
+    print(f"{'Estimator':<24}{'Fit (s)':>10}{'Size (MB)':>11}{'Batch rows/s':>14}"
+          f"{'p50 (ms)':>10}{'RMSE':>8}{'R²':>8}")
+    for name, report in reports.items():
+        benchmark = report['benchmark']
+        print(f"{name:<24}{benchmark['train_seconds']:>10.2f}{report['model_size_mb']:>11.2f}"
+              f"{benchmark['batch_rows_per_second']:>14.0f}{benchmark['single_row_latency_ms']['p50']:>10.2f}"
+              f"{report['rmse']:>8.2f}{report['r2_score']:>8.3f}")
+    
+    return reports
 
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Train student performance prediction model')
-    parser.add_argument('--action', choices=['train', 'evaluate', 'sample'], 
+    parser.add_argument('--action', choices=['train', 'evaluate', 'compare', 'sample'], 
                        default='train', help='Action to perform')
+    parser.add_argument('--estimator', choices=list(ESTIMATORS),
+                       help='Estimator for train/evaluate (default: PERFORMANCE_ESTIMATOR setting)')
+    parser.add_argument('--estimators', nargs='+', choices=list(ESTIMATORS),
+                       help='Estimators for compare (default: all)')
+    parser.add_argument('--search', choices=list(STRATEGIES),
+                       help='Hyperparameter search strategy for train')
+    parser.add_argument('--budget', type=float, default=600, help='Search wall-clock budget in seconds')
+    parser.add_argument('--candidates', type=int, default=20, help='Configurations sampled by the search')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel search workers (-1 for all cores)')
+    parser.add_argument('--features', choices=['snapshots', 'live'], default='snapshots',
+                       help='Training features: point-in-time snapshots (falls back to live) or live data')
+    parser.add_argument('--lead-days', type=int, default=0,
+                       help='Use snapshots taken at least this many days before completion')
+    parser.add_argument('--samples', type=int, default=5000, help='Synthetic dataset size for evaluate')
+    parser.add_argument('--output-dir', help='Model directory for evaluate (default: ml/benchmarks)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic dataset')
     
     args = parser.parse_args()
     
     if args.action == 'train':
-        train_model()
+        search = None
+        if args.search:
+            search = {
+                'strategy': args.search,
+                'budget_seconds': args.budget,
+                'n_candidates': args.candidates,
+                'n_jobs': args.jobs,
+            }
+        train_model(args.estimator, search, features=args.features, lead_days=args.lead_days)
     elif args.action == 'evaluate':
-        evaluate_model()
+        evaluate_model(n_samples=args.samples, output_dir=args.output_dir, random_state=args.seed,
+                       estimator=args.estimator)
+    elif args.action == 'compare':
+        compare_estimators(args.estimators, n_samples=args.samples, output_dir=args.output_dir,
+                           random_state=args.seed)
     elif args.action == 'sample':
         generate_sample_data()
@@ -19,6 +19,7 @@ function AIPredictions() {
   const [loading, setLoading] = useState(false);
   const [coursesLoading, setCoursesLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [jobProgress, setJobProgress] = useState(null);
   const [expandedStudent, setExpandedStudent] = useState(null);
   const [filterRisk, setFilterRisk] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
@@ -50,7 +51,8 @@ function AIPredictions() {
       setPredictions(null);
       setSelectedCourse(courseId);
       setExpandedStudent(null);
-      const data = await apiClient.getAIPredictions(courseId);
+      setJobProgress(null);
+      const data = await apiClient.getAIPredictions(courseId, setJobProgress);
       setPredictions(data);
     } catch (err) {
       setError(err.message || 'Failed to generate predictions. Please check your AI service configuration.');
@@ -186,7 +188,10 @@ function AIPredictions() {
             <div className="inline-flex items-center space-x-3">
               <LoadingSpinner size="large" />
             </div>
-            <p className="mt-4 text-lg text-gray-600 dark:text-[var(--bp-text-muted)]">Analyzing student data...</p>
+            <p className="mt-4 text-lg text-gray-600 dark:text-[var(--bp-text-muted)]">
+              {jobProgress?.message || 'Analyzing student data...'}
+              {jobProgress?.progress > 0 && ` (${jobProgress.progress}%)`}
+            </p>
             <p className="mt-2 text-sm text-gray-400 dark:text-[var(--bp-text-subtle)]">
               This may take a moment as we process performance and attendance records
             </p>
@@ -10,6 +10,9 @@ const api = axios.create({
   },
 });
 
+// How often to poll a queued AI prediction job
+const AI_JOB_POLL_INTERVAL_MS = 1500;
+
 // Token management
 let authToken = localStorage.getItem('access_token');
 
@@ -474,10 +477,20 @@ class ApiClient {
   }
 
   // AI Predictions (Gemini)
-  async getAIPredictions(courseId) {
-    try {
-      const response = await api.get(`/performance/ai/predict/course/${courseId}/`);
-      return response.data;
+  // Predictions run as a background job on the server; queue one and poll
+  // its status until it finishes. onProgress receives each status update.
+  async getAIPredictions(courseId, onProgress) {
+    try {
+      let { data: job } = await api.post(`/performance/ai/predict/course/${courseId}/`);
+      while (job.status === 'queued' || job.status === 'running') {
+        if (onProgress) onProgress(job);
+        await new Promise((resolve) => setTimeout(resolve, AI_JOB_POLL_INTERVAL_MS));
+        ({ data: job } = await api.get(`/performance/ai/jobs/${job.job_id}/`));
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'AI prediction failed.');
+      }
+      return job.result;
     } catch (error) {
       throw this.handleError(error);
     }